@@ -0,0 +1,179 @@
+# 질문 서비스의 LLM / 문서 추출 backend 선택
+# 설정(LLM_BACKEND, PARSER_BACKEND)으로 구현을 고르고, 무거운 SDK(anthropic, openai, boto3)는 처음 호출할 때 import 한다
+# 진입점 question.py(anthropic, 이전 코드의 prompt 를 기본값으로), questionboto3.py(boto3) 는 이 설정을 정해 question2 를 띄운다
+import asyncio
+import json
+import logging
+import os
+import threading
+from types import SimpleNamespace
+
+import extractors
+from documents import DOC_MAX_CHARS, DOC_MAX_PAGES, DOC_MAX_TOKENS, ExtractionPool
+
+logger = logging.getLogger(__name__)
+
+# anthropic: Anthropic SDK(AsyncAnthropicBedrock), boto3: bedrock-runtime invoke_model
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'anthropic')
+# process: 별도 프로세스 풀에서 추출, inline: 같은 프로세스의 thread 에서 추출 (CPU 1개짜리 pod, 개발용)
+PARSER_BACKEND = os.getenv('PARSER_BACKEND', 'process')
+BEDROCK_ANTHROPIC_VERSION = 'bedrock-2023-05-31'
+
+
+class LazyClient:
+    # SDK client 를 처음 속성에 접근할 때 만들어 (import 포함) 그대로 위임
+    # anthropic/openai 는 pydantic 등 같은 의존성을 import 하므로, 기동 준비처럼 여러 thread 에서 동시에 만들면
+    # 부분 초기화된 모듈을 보게 되어 생성은 모든 LazyClient 가 한 번에 하나씩
+    _lock = threading.Lock()
+
+    def __init__(self, name, factory):
+        self.__dict__['name'] = name
+        self.__dict__['_factory'] = factory
+        self.__dict__['_client'] = None
+
+    @property
+    def loaded(self):
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    logger.info(f'{self.name} client 생성')
+                    self.__dict__['_client'] = self._factory()
+        return self._client
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
+
+    def __setattr__(self, attr, value):
+        # 테스트/부하 테스트에서 client 의 속성(messages 등)을 바꿔 끼울 때
+        setattr(self.get(), attr, value)
+
+
+def _namespace(data):
+    return json.loads(json.dumps(data), object_hook=lambda d: SimpleNamespace(**d))
+
+
+class BedrockRuntimeStream:
+    # invoke_model_with_response_stream 의 blocking event stream 을 Anthropic SDK 스트림처럼 async 로 순회
+    def __init__(self, response):
+        self.body = response['body']
+        self._events = iter(self.body)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            event = await asyncio.to_thread(next, self._events, None)
+            if event is None:
+                raise StopAsyncIteration
+            if 'chunk' in event:
+                return _namespace(json.loads(event['chunk']['bytes']))
+
+    async def close(self):
+        await asyncio.to_thread(self.body.close)
+
+
+class BedrockRuntimeMessages:
+    # bedrock-runtime invoke_model 을 Anthropic messages.create 형태로 (questionboto3 방식)
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, model, messages, max_tokens, system=None, stream=False, **kwargs):
+        body = {'anthropic_version': BEDROCK_ANTHROPIC_VERSION, 'max_tokens': max_tokens, 'messages': messages}
+        if system is not None:
+            body['system'] = system
+        body.update({key: value for key, value in kwargs.items() if value is not None})
+        if stream:
+            response = await asyncio.to_thread(
+                self.client.invoke_model_with_response_stream, modelId=model, body=json.dumps(body))
+            return BedrockRuntimeStream(response)
+        response = await asyncio.to_thread(self.client.invoke_model, modelId=model, body=json.dumps(body))
+        return _namespace(json.loads(response['body'].read()))
+
+
+class BedrockRuntimeClient:
+    def __init__(self, client):
+        self.messages = BedrockRuntimeMessages(client)
+
+
+def anthropic_bedrock_client(aws_access_key, aws_secret_key, aws_region):
+    from anthropic import AsyncAnthropicBedrock
+    return AsyncAnthropicBedrock(aws_access_key=aws_access_key, aws_secret_key=aws_secret_key, aws_region=aws_region)
+
+
+def boto3_bedrock_client(aws_access_key, aws_secret_key, aws_region):
+    import boto3
+    return BedrockRuntimeClient(boto3.client(
+        'bedrock-runtime',
+        aws_access_key_id=aws_access_key,
+        aws_secret_access_key=aws_secret_key,
+        region_name=aws_region,
+    ))
+
+
+LLM_BACKENDS = {
+    'anthropic': anthropic_bedrock_client,
+    'boto3': boto3_bedrock_client,
+}
+
+
+def llm_client(aws_access_key, aws_secret_key, aws_region, backend=LLM_BACKEND):
+    # AsyncLLM 에 넣을 Bedrock client (messages.create 인터페이스)
+    if backend not in LLM_BACKENDS:
+        logger.error(f'알 수 없는 LLM backend: {backend}, anthropic 사용')
+        backend = 'anthropic'
+    return LazyClient(f'bedrock:{backend}', lambda: LLM_BACKENDS[backend](aws_access_key, aws_secret_key, aws_region))
+
+
+def openai_client(api_key):
+    def create():
+        from openai import AsyncOpenAI
+        return AsyncOpenAI(api_key=api_key)
+    return LazyClient('openai', create)
+
+
+class InlineExtractionPool:
+    # ExtractionPool 과 같은 인터페이스로 현재 프로세스의 thread 에서 추출 (worker 프로세스 없음)
+    def __init__(self, max_pages=DOC_MAX_PAGES, max_chars=DOC_MAX_CHARS, max_tokens=DOC_MAX_TOKENS):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.pending = 0
+
+    def start(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+    async def warm(self):
+        await asyncio.to_thread(extractors.warm_up)
+
+    async def extract(self, ext, content):
+        self.pending += 1
+        try:
+            return await asyncio.to_thread(extractors.extract, ext, content, self.max_pages, self.max_chars,
+                                           self.max_tokens)
+        finally:
+            self.pending -= 1
+
+    def limits(self):
+        return f'{self.max_pages}-{self.max_chars}-{self.max_tokens}'
+
+    def stats(self):
+        return {'backend': 'inline', 'pending': self.pending}
+
+
+def extraction_pool(backend=PARSER_BACKEND):
+    if backend == 'inline':
+        return InlineExtractionPool()
+    if backend != 'process':
+        logger.error(f'알 수 없는 parser backend: {backend}, process 사용')
+    return ExtractionPool()
+
+
+def stats():
+    return {'llm': LLM_BACKEND, 'parser': PARSER_BACKEND}
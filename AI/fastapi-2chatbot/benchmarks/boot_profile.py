@@ -0,0 +1,180 @@
+# question2 기동 시간 프로파일
+# 1) import: 새 인터프리터에서 python -X importtime -c "import question2" 를 여러 번 실행해
+#    전체 import 시간과 패키지별(self 시간 합)/question2 가 직접 import 하는 모듈별(누적) 시간을 중앙값으로 정리
+# 2) warmup: 새 프로세스에서 app lifespan 을 실행해 요청을 받기 시작하는 시점과 /question/ready 가 true 가 되는 시점,
+#    준비 단계(client 생성, Redis 연결, 추출 worker 예열)별 시간을 측정 (Redis 는 fakeredis 또는 --redis-url)
+# FAST_BOOT=0/1 두 모드를 모두 측정해 JSON 으로 출력
+# 실행: python benchmarks/boot_profile.py [--runs 5] [--top 15] [--modes 0,1] [--output result.json]
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# question2 import 전에 필요한 설정 (외부 서비스로 나가지 않도록)
+ENV_DEFAULTS = {
+    'OPEN_API_KEY': 'boot-profile',
+    'AWS_REGION': 'ap-northeast-2',
+    'AWS_BEDROCK_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'boot-profile',
+    'AWS_SECRET_ACCESS_KEY': 'boot-profile',
+    'OTEL_ENDPOINT_URL': 'http://127.0.0.1:4317',
+}
+
+
+def child_env(fast_boot):
+    env = dict(os.environ)
+    for name, value in ENV_DEFAULTS.items():
+        env.setdefault(name, value)
+    env['FAST_BOOT'] = fast_boot
+    env['PYTHONPATH'] = BASE_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package" (들여쓰기 2칸 = 한 단계 깊이)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_profile(fast_boot):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import question2'],
+                            cwd=BASE_DIR, env=child_env(fast_boot), capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = parse_importtime(result.stderr)
+    total = next(cumulative for name, depth, _, cumulative in rows if name == 'question2')
+    packages = defaultdict(int)
+    direct = {}
+    # question2 가 직접 import 하는 모듈 (question2 보다 한 단계 깊은 줄)
+    q_depth = next(depth for name, depth, _, _ in rows if name == 'question2')
+    for name, depth, self_us, cumulative_us in rows:
+        packages[name.split('.')[0]] += self_us
+        if depth == q_depth + 1:
+            direct[name] = cumulative_us
+    return total, packages, direct
+
+
+def median_ms(samples):
+    return round(statistics.median(samples) / 1000, 1)
+
+
+def imports(fast_boot, runs, top):
+    totals = []
+    packages = defaultdict(list)
+    direct = defaultdict(list)
+    for _ in range(runs):
+        total, run_packages, run_direct = import_profile(fast_boot)
+        totals.append(total)
+        for name, value in run_packages.items():
+            packages[name].append(value)
+        for name, value in run_direct.items():
+            direct[name].append(value)
+
+    def ranked(values):
+        medians = {name: median_ms(samples + [0] * (runs - len(samples))) for name, samples in values.items()}
+        return dict(sorted(medians.items(), key=lambda item: -item[1])[:top])
+
+    return {
+        'import_ms': median_ms(totals),
+        'import_ms_min': round(min(totals) / 1000, 1),
+        'by_package_self_ms': ranked(packages),
+        'question2_imports_cumulative_ms': ranked(direct),
+    }
+
+
+def warmup(fast_boot, redis_url):
+    command = [sys.executable, os.path.abspath(__file__), '--child-warmup']
+    if redis_url:
+        command += ['--redis-url', redis_url]
+    result = subprocess.run(command, cwd=BASE_DIR, env=child_env(fast_boot), capture_output=True, text=True,
+                            timeout=300)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        return {'error': (result.stderr.strip().splitlines() or ['unknown'])[-1]}
+    return json.loads(lines[-1])
+
+
+def child_warmup(redis_url):
+    # 새 프로세스: import -> lifespan 시작 -> ready 까지 시간 (프로세스 시작 기준)
+    import logging
+    started = time.perf_counter()
+    import question2 as q
+    imported = time.perf_counter()
+    logging.disable(logging.WARNING)
+
+    if redis_url:
+        from redis import asyncio as aioredis
+        redis_client = aioredis.from_url(redis_url, decode_responses=True)
+    else:
+        import fakeredis.aioredis
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    q.redis_pool.client = redis_client
+    for holder in (q.report_jobs, q.session_store):
+        holder.redis_client = redis_client
+
+    async def run():
+        async with q.app.router.lifespan_context(q.app):
+            accepting = time.perf_counter()
+            while q.boot_state.finished is None:
+                await asyncio.sleep(0.005)
+            ready = time.perf_counter()
+            return accepting, ready
+
+    accepting, ready = asyncio.run(run())
+    print(json.dumps({
+        'import_ms': round((imported - started) * 1000, 1),
+        'accepting_ms': round((accepting - started) * 1000, 1),
+        'ready_ms': round((ready - started) * 1000, 1),
+        'boot': q.boot_state.stats(),
+    }))
+    sys.stdout.flush()
+    # OTel exporter 가 없는 collector 로 재시도하며 종료를 막지 않도록 바로 종료
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5, help='모드별 import 측정 횟수')
+    parser.add_argument('--top', type=int, default=15, help='표시할 패키지/모듈 수')
+    parser.add_argument('--modes', default='0,1', help='측정할 FAST_BOOT 값 (쉼표 구분)')
+    parser.add_argument('--no-warmup', action='store_true', help='lifespan 준비 시간 측정 생략')
+    parser.add_argument('--redis-url', default=None, help='지정하지 않으면 fakeredis')
+    parser.add_argument('--output', default=None, help='결과 JSON 파일 (없으면 stdout)')
+    parser.add_argument('--child-warmup', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_warmup:
+        child_warmup(args.redis_url)
+        return
+
+    result = {}
+    for mode in args.modes.split(','):
+        profile = imports(mode, args.runs, args.top)
+        if not args.no_warmup:
+            profile['warmup'] = warmup(mode, args.redis_url)
+        result[f'FAST_BOOT={mode}'] = profile
+        print(f'FAST_BOOT={mode} import {profile["import_ms"]} ms', file=sys.stderr)
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# 대화 메시지 구성(build_chat_messages) 마이크로 벤치마크
+# 실행: python benchmarks/conversation_bench.py [--max-turns 256] [--repeat 5]
+# turn 수를 두 배씩 늘리며 1회 구성 시간을 재고, turn 당 시간이 일정하면 O(turns)
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import build_chat_messages
+from history import Turn
+
+
+def make_turns(n, answer_chars):
+    answer = "가" * answer_chars
+    return [Turn(number=i, question=f"질문 {i}", answer=answer) for i in range(1, n + 1)]
+
+
+def bench(max_turns, repeat, answer_chars):
+    cover_letter = "자기소개서: " + "나" * 4000
+    results = []
+    n = 1
+    while n <= max_turns:
+        turns = make_turns(n, answer_chars)
+        timer = timeit.Timer(lambda: build_chat_messages(cover_letter, turns, "대답: 마지막"))
+        number, _ = timer.autorange()
+        best = min(timer.repeat(repeat=repeat, number=number)) / number
+        results.append({
+            "turns": n,
+            "messages": 2 * n + 1,
+            "usec": round(best * 1e6, 3),
+            "usec_per_turn": round(best * 1e6 / n, 3),
+        })
+        n *= 2
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-turns", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--answer-chars", type=int, default=1000)
+    args = parser.parse_args()
+
+    results = bench(args.max_turns, args.repeat, args.answer_chars)
+    # 가장 큰 입력과 중간 입력의 turn 당 시간 비율 (1 근처면 선형)
+    mid = results[len(results) // 2]
+    ratio = results[-1]["usec_per_turn"] / mid["usec_per_turn"]
+    print(json.dumps({"results": results, "per_turn_ratio_max_vs_mid": round(ratio, 3)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
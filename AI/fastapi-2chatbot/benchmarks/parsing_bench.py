@@ -0,0 +1,332 @@
+# 문서 텍스트 추출(parsing) 벤치마크
+# 생성한 PDF/DOCX/TXT 문서(페이지 수, 크기별)와 --hwp-dir 의 HWP 샘플로 아래 세 경로를 측정
+#   extract : extractors.extract (ExtractionPool worker 안에서 실행되는 추출 함수)
+#   parse   : DocumentParser.parse (메모리 S3, 캐시 없음, 추출은 같은 프로세스에서 실행해 IPC 비용 제외)
+#   django  : django-2chatbot coverletterAPI.parsing (Django 패키지가 없으면 건너뜀, HWP 미지원)
+# 문서별로 처리량(docs/s, MB/s), tracemalloc 할당 peak, 별도 프로세스에서 잰 peak RSS 증가량을 JSON 으로 출력
+# 실행: python benchmarks/parsing_bench.py [--pages 1,5,20,50] [--repeat 5] [--hwp-dir samples/] [--output result.json]
+# 추출 예산은 DOC_MAX_PAGES/DOC_MAX_CHARS/DOC_MAX_TOKENS 환경 변수 (0 이면 제한 없음)
+# HWP 는 생성할 수 없어 --hwp-dir 에 샘플 파일이 있을 때만 측정
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DJANGO_DIR = os.path.join(os.path.dirname(BASE_DIR), 'django-2chatbot', 'myproject')
+sys.path.insert(0, BASE_DIR)
+
+import documents
+import extractors
+from backends import InlineExtractionPool
+from s3 import S3Storage
+
+TARGETS = ('extract', 'parse', 'django')
+BUCKET = 'bench'
+
+# 자기소개서 한 페이지 분량 문장 (PDF 는 기본 Type1 글꼴만 쓰므로 ASCII)
+SENTENCE = ('I led the migration of our interview service to FastAPI and cut p95 latency by 40 percent '
+            'while keeping the Redis session model compatible. ')
+SENTENCE_KO = '저는 면접 서비스를 FastAPI 로 옮기면서 Redis 세션 구조를 유지한 채 p95 지연 시간을 40% 줄였습니다. '
+
+
+def page_text(index, chars):
+    text = f'Page {index + 1}. ' + SENTENCE * (chars // len(SENTENCE) + 1)
+    return text[:chars]
+
+
+def make_txt(pages, chars_per_page):
+    text = '\n'.join((SENTENCE_KO * (chars_per_page // len(SENTENCE_KO) + 1))[:chars_per_page] for _ in range(pages))
+    return text.encode('utf-8')
+
+
+def make_docx(pages, chars_per_page):
+    from docx import Document
+    doc = Document()
+    # 문단 하나를 약 400 글자로, 페이지당 문단 수로 분량 조절
+    for i in range(pages):
+        text = page_text(i, chars_per_page)
+        for start in range(0, len(text), 400):
+            doc.add_paragraph(text[start:start + 400])
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def make_pdf(pages, chars_per_page):
+    # reportlab 없이 최소 구조의 PDF 직접 작성 (페이지마다 Helvetica 텍스트 content stream)
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for i in range(pages):
+        text = page_text(i, chars_per_page)
+        lines = [text[start:start + 90] for start in range(0, len(text), 90)]
+        stream = 'BT /F1 9 Tf 11 TL 40 800 Td ' + ' '.join(f'({line}) Tj T*' for line in lines) + ' ET'
+        stream = stream.encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % content_id)
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % kid for kid in kids), len(kids))
+
+    buffer = io.BytesIO()
+    buffer.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(buffer.tell())
+        buffer.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+    xref = buffer.tell()
+    buffer.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        buffer.write(b'%010d 00000 n \n' % offset)
+    buffer.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return buffer.getvalue()
+
+
+GENERATORS = {'pdf': make_pdf, 'docx': make_docx, 'txt': make_txt}
+
+
+def make_corpus(directory, page_counts, chars_per_page, hwp_dir=None):
+    corpus = []
+    for ext, generate in GENERATORS.items():
+        for pages in page_counts:
+            path = os.path.join(directory, f'{ext}-{pages}p.{ext}')
+            with open(path, 'wb') as f:
+                f.write(generate(pages, chars_per_page))
+            corpus.append({'format': ext, 'name': os.path.basename(path), 'pages': pages, 'path': path})
+    if hwp_dir:
+        for name in sorted(os.listdir(hwp_dir)):
+            if name.lower().endswith('.hwp'):
+                path = os.path.join(directory, name)
+                shutil.copy(os.path.join(hwp_dir, name), path)
+                corpus.append({'format': 'hwp', 'name': name, 'pages': None, 'path': path})
+    for document in corpus:
+        document['bytes'] = os.path.getsize(document['path'])
+    return corpus
+
+
+class MemoryS3:
+    # S3Storage / coverletterAPI 에서 쓰는 boto3 S3 API 일부
+    def __init__(self):
+        self.objects = {}
+
+    def put(self, key, body):
+        self.objects[key] = body
+        return f's3://{BUCKET}/{key}'
+
+    def head_object(self, Bucket, Key):
+        return {'ETag': '', 'ContentLength': len(self.objects[Key])}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        body = self.objects[Key]
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+
+
+def load_django():
+    # coverletterAPI 가 있는 views 모듈을 import (설정/클라이언트는 환경 변수 기본값, 외부 연결 없음)
+    for name, value in {'OPEN_API_KEY': 'bench', 'AWS_REGION': 'ap-northeast-2',
+                        'AWS_BEDROCK_REGION': 'us-east-1'}.items():
+        os.environ.setdefault(name, value)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
+    sys.path.insert(0, DJANGO_DIR)
+    import django
+    django.setup()
+    from api import views
+    return views
+
+
+def make_target(target, document, content):
+    # 호출할 때마다 문서 하나를 처음부터 추출하는 함수 반환
+    ext = document['format']
+    if target == 'extract':
+        return lambda: extractors.extract(ext, content, documents.DOC_MAX_PAGES, documents.DOC_MAX_CHARS,
+                                          documents.DOC_MAX_TOKENS)[0]
+
+    s3 = MemoryS3()
+    url = s3.put(document['name'], content)
+    if target == 'parse':
+        parser = documents.DocumentParser(S3Storage(client=s3), extraction_pool=InlineExtractionPool())
+        loop = asyncio.new_event_loop()
+
+        def parse():
+            # 매번 새 LRU 로 캐시 적중 없이 다운로드 + 추출 경로를 측정
+            parser.lru = documents.TextLRU()
+            return loop.run_until_complete(parser.parse(url))
+        return parse
+
+    if ext == 'hwp':
+        return None
+    views = load_django()
+    views.s3_client = s3
+    api = views.coverletterAPI()
+    return lambda: api.parsing(url)
+
+
+def throughput(fn, size, repeat, min_sec):
+    # 최소 min_sec 동안 반복한 평균을 repeat 번 재서 가장 빠른 값 사용
+    fn()
+    best = None
+    for _ in range(repeat):
+        count = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_sec:
+                break
+        per_call = elapsed / count
+        best = per_call if best is None else min(best, per_call)
+    return {
+        'ms': round(best * 1000, 3),
+        'docs_per_sec': round(1 / best, 2),
+        'mb_per_sec': round(size / best / 1e6, 3),
+    }
+
+
+def allocations(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'alloc_peak_kb': round(peak / 1024, 1), 'alloc_retained_kb': round(current / 1024, 1)}
+
+
+def proc_status_kb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise ValueError(field)
+
+
+def reset_peak_rss():
+    # Linux: clear_refs 에 5 를 쓰면 VmHWM(peak RSS)이 현재 RSS 로 초기화됨
+    # 초기화할 수 없으면 ru_maxrss (프로세스 시작 이후 peak) 사용
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return proc_status_kb('VmRSS'), True
+    except (OSError, ValueError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return (rss // 1024 if sys.platform == 'darwin' else rss), False
+
+
+def peak_rss_kb(reset):
+    if reset:
+        return proc_status_kb('VmHWM')
+    # Linux 는 KB, macOS 는 byte 단위
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def child(target, document_json):
+    # 새 프로세스에서 추출 한 번의 peak RSS 증가량 측정 (라이브러리 import, 문서 로드, 함수 준비 후 기준)
+    document = json.loads(document_json)
+    with open(document['path'], 'rb') as f:
+        content = f.read()
+    extractors.warm_up()
+    fn = make_target(target, document, content)
+    before, reset = reset_peak_rss()
+    text = fn()
+    after = peak_rss_kb(reset)
+    print(json.dumps({'rss_base_kb': before, 'rss_peak_kb': after, 'rss_growth_kb': after - before,
+                      'chars': len(text or '')}))
+
+
+def peak_rss(target, document):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', target, json.dumps(document)],
+        capture_output=True, text=True, timeout=300,
+    )
+    if result.returncode != 0:
+        return {'rss_error': result.stderr.strip().splitlines()[-1:]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench(corpus, targets, repeat, min_sec, measure_rss):
+    results = []
+    skipped = {}
+    for target in targets:
+        for document in corpus:
+            with open(document['path'], 'rb') as f:
+                content = f.read()
+            try:
+                fn = make_target(target, document, content)
+            except Exception as e:
+                # Django 미설치 등: 대상 전체를 건너뜀
+                skipped[target] = f'{type(e).__name__}: {e}'
+                break
+            if fn is None:
+                continue
+            row = {'target': target, 'format': document['format'], 'name': document['name'],
+                   'pages': document['pages'], 'bytes': document['bytes'], 'chars': len(fn() or '')}
+            row.update(throughput(fn, document['bytes'], repeat, min_sec))
+            row.update(allocations(fn))
+            if measure_rss:
+                row.update(peak_rss(target, document))
+            results.append(row)
+            print(f'{target:8} {document["name"]:16} {row["ms"]:>10} ms', file=sys.stderr)
+    return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', default='1,5,20,50', help='생성할 문서 페이지 수 (쉼표 구분)')
+    parser.add_argument('--chars-per-page', type=int, default=2000)
+    parser.add_argument('--hwp-dir', default=None, help='HWP 샘플 파일 디렉터리')
+    parser.add_argument('--targets', default=','.join(TARGETS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-sec', type=float, default=0.2, help='측정 1회의 최소 반복 시간')
+    parser.add_argument('--no-rss', action='store_true', help='프로세스별 peak RSS 측정 생략')
+    parser.add_argument('--corpus-dir', default=None, help='생성 문서 보관 디렉터리 (없으면 임시 디렉터리)')
+    parser.add_argument('--output', default=None, help='결과 JSON 파일 (없으면 stdout)')
+    parser.add_argument('--child', nargs=2, metavar=('TARGET', 'DOCUMENT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 추출 실패 로그가 결과 JSON 과 섞이지 않도록
+    logging.disable(logging.ERROR)
+    if args.child:
+        child(*args.child)
+        return
+
+    directory = args.corpus_dir or tempfile.mkdtemp(prefix='parsing-bench-')
+    os.makedirs(directory, exist_ok=True)
+    try:
+        corpus = make_corpus(directory, [int(pages) for pages in args.pages.split(',')],
+                             args.chars_per_page, args.hwp_dir)
+        targets = [target for target in args.targets.split(',') if target in TARGETS]
+        results, skipped = bench(corpus, targets, args.repeat, args.min_sec, not args.no_rss)
+    finally:
+        if not args.corpus_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    output = json.dumps({
+        'config': {key: value for key, value in vars(args).items() if key != 'child'},
+        'max_pages': documents.DOC_MAX_PAGES,
+        'max_chars': documents.DOC_MAX_CHARS,
+        'max_tokens': documents.DOC_MAX_TOKENS,
+        'results': results,
+        'skipped': skipped,
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
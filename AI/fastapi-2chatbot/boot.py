@@ -0,0 +1,101 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# 1 이면 OTel exporter 설정과 client 준비를 import 시점이 아니라 lifespan 에서 동시에 실행하고,
+# 준비가 끝나기 전에 먼저 요청을 받을 수 있게 띄운다 (/question/ready 는 준비가 끝난 뒤 200)
+FAST_BOOT = os.getenv('FAST_BOOT', '0') == '1'
+# 준비 단계 하나의 최대 시간 (넘으면 실패로 기록하고 readiness 는 false 유지)
+BOOT_STEP_TIMEOUT_SEC = float(os.getenv('BOOT_STEP_TIMEOUT_SEC', '30'))
+# 실패한 단계를 백그라운드에서 다시 실행하는 간격 (실패할 때마다 두 배, 최대 BOOT_RETRY_MAX_SEC)
+BOOT_RETRY_SEC = float(os.getenv('BOOT_RETRY_SEC', '2'))
+BOOT_RETRY_MAX_SEC = float(os.getenv('BOOT_RETRY_MAX_SEC', '30'))
+
+
+class BootState:
+    # 기동 준비 단계(client 생성, 연결 확인, worker 예열)를 동시에 실행하고 단계별 소요 시간과 readiness 를 기록
+    # 단계는 이름 -> 함수, 함수는 coroutine 함수 또는 일반 함수(thread 에서 실행), False 를 돌려주면 실패
+    # 실패한 단계는 백그라운드에서 성공할 때까지 다시 실행하고, 모두 성공하면 ready (일시적인 장애로 pod 가 계속 503 이 되지 않게)
+    def __init__(self, timeout=BOOT_STEP_TIMEOUT_SEC, retry_sec=BOOT_RETRY_SEC, retry_max_sec=BOOT_RETRY_MAX_SEC):
+        self.timeout = timeout
+        self.retry_sec = retry_sec
+        self.retry_max_sec = retry_max_sec
+        self.ready = False
+        self.started = None
+        self.finished = None
+        self.steps = {}
+        self.errors = {}
+        self.retries = 0
+        self._retry_task = None
+
+    async def run(self, steps):
+        # 첫 실행 결과를 돌려주고, 실패한 단계가 있으면 재시도는 백그라운드로 계속
+        self.started = time.perf_counter()
+        failed = await self._run_steps(steps)
+        self.finished = time.perf_counter()
+        self.ready = not failed
+        level = logging.INFO if self.ready else logging.ERROR
+        logger.log(level, f'기동 준비 {"완료" if self.ready else "실패"} SEC:{self.finished - self.started:.3f} {self.steps}')
+        if failed:
+            self._retry_task = asyncio.create_task(self._retry(failed))
+        return self.ready
+
+    async def _run_steps(self, steps):
+        names = list(steps)
+        results = await asyncio.gather(*(self._step(name, steps[name]) for name in names))
+        return {name: steps[name] for name, ok in zip(names, results) if not ok}
+
+    async def _retry(self, failed):
+        delay = self.retry_sec
+        while failed:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max_sec)
+            self.retries += 1
+            logger.info(f'기동 준비 재시도 {self.retries}: {list(failed)}')
+            failed = await self._run_steps(failed)
+        self.ready = True
+        logger.info(f'기동 준비 완료 (재시도 {self.retries}회) {self.steps}')
+
+    async def stop(self):
+        task, self._retry_task = self._retry_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _step(self, name, fn):
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(fn):
+                result = await asyncio.wait_for(fn(), self.timeout)
+            else:
+                result = await asyncio.wait_for(asyncio.to_thread(fn), self.timeout)
+            ok = result is not False
+            if ok:
+                self.errors.pop(name, None)
+            else:
+                self.errors[name] = 'failed'
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            ok = False
+            self.errors[name] = f'timeout {self.timeout}s'
+        except Exception as e:
+            ok = False
+            self.errors[name] = f'{type(e).__name__}: {e}'
+            logger.error(f'기동 준비 실패 {name}: {e}')
+        self.steps[name] = round(time.perf_counter() - start, 3)
+        return ok
+
+    def stats(self):
+        return {
+            'ready': self.ready,
+            'fast_boot': FAST_BOOT,
+            'warmup_sec': round(self.finished - self.started, 3) if self.finished else None,
+            'retries': self.retries,
+            'steps': self.steps,
+            'errors': self.errors,
+        }
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+
+from conversation import build_chat_messages
+from llm import AsyncLLM
+from tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 질문 생성 prompt(system + 자기소개서 + 대화) 토큰 상한
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '8000'))
+# 원문 그대로 두는 최근 turn 수 (예산을 넘으면 1까지 줄임)
+CONTEXT_KEEP_TURNS = int(os.getenv('CONTEXT_KEEP_TURNS', '3'))
+# 예산의 이 비율을 넘으면 창 밖 turn 요약을 백그라운드로 미리 만들어 둠
+CONTEXT_PREFETCH_RATIO = float(os.getenv('CONTEXT_PREFETCH_RATIO', '0.7'))
+CONTEXT_SUMMARY_MODEL_ID = os.getenv('CONTEXT_SUMMARY_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv('CONTEXT_SUMMARY_MAX_TOKENS', '300'))
+CONTEXT_SUMMARY_CONCURRENCY = int(os.getenv('CONTEXT_SUMMARY_CONCURRENCY', '4'))
+CONTEXT_SUMMARY_TIMEOUT_SEC = float(os.getenv('CONTEXT_SUMMARY_TIMEOUT_SEC', '20'))
+# 요약 실패 시 원문에서 잘라 쓰는 글자 수
+SUMMARY_FALLBACK_CHARS = 200
+# 아직 없는 요약의 예상 토큰 (창 크기 계산용)
+SUMMARY_TOKENS_EST = 120
+MESSAGE_OVERHEAD_TOKENS = 8
+
+SYSTEM_SUMMARY = '''
+    역할:
+    면접 질문과 대답 한 쌍을 요약
+
+    지시사항:
+    1. 다음 꼬리 질문을 만드는 데 필요한 핵심(언급한 경험, 기술, 수치, 부족했던 점)만 남겨 두세 문장으로 요약해주세요.
+    2. 요약문만 한국어로 반환해주세요.'''
+
+
+def turn_tokens(question, answer):
+    return estimate_tokens(question) + estimate_tokens(answer) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+def summary_field(number):
+    return f'summary-{number}'
+
+
+def format_summary(summaries):
+    lines = [f'{number}. {summaries[number]}' for number in sorted(summaries)]
+    return '이전 면접 요약:\n' + '\n'.join(lines)
+
+
+class ContextManager:
+    # 질문 생성 메시지를 토큰 예산 안으로 유지
+    # 예산 안이면 전체 대화 그대로, 넘으면 최근 K turn 만 원문으로 두고 이전 turn 은 요약으로 대체
+    # turn 요약은 한 번만 만들어 itv_no 해시의 summary-n 에 저장
+    def __init__(self, llm_client, redis_client, budget=CONTEXT_TOKEN_BUDGET, keep_turns=CONTEXT_KEEP_TURNS,
+                 model=CONTEXT_SUMMARY_MODEL_ID, sessions=None, rate_limiter=None):
+        self.llm = AsyncLLM(llm_client, max_concurrency=CONTEXT_SUMMARY_CONCURRENCY, timeout=CONTEXT_SUMMARY_TIMEOUT_SEC,
+                            rate_limiter=rate_limiter)
+        self.redis_client = redis_client
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.model = model
+        # 요약도 면접 세션 해시에 쓰므로 SessionStore 가 있으면 그쪽으로 (TTL, 크기)
+        self.sessions = sessions
+        self._tasks = {}
+        self.counts = {'full': 0, 'compacted': 0, 'over_budget': 0, 'summarized': 0}
+
+    async def _store(self, itv_no, field, value):
+        if self.sessions is not None:
+            await self.sessions.store(itv_no, field, value)
+        else:
+            await self.redis_client.hset(itv_no, field, value)
+
+    async def build(self, history, prompt, system=None):
+        turns = history.turns
+        fixed = estimate_tokens(system) + estimate_tokens(history.cover_letter) + MESSAGE_OVERHEAD_TOKENS
+        sizes = [turn_tokens(turn.question, prompt if i == len(turns) - 1 else turn.answer)
+                 for i, turn in enumerate(turns)]
+        total = fixed + sum(sizes)
+        if total <= self.budget:
+            if total > self.budget * CONTEXT_PREFETCH_RATIO:
+                # 다음 turn 부터 압축될 수 있으므로 그때 창 밖에 있을 turn 요약을 미리 생성
+                self._prefetch(history, len(turns) + 1 - self.keep_turns)
+            self.counts['full'] += 1
+            return build_chat_messages(history.cover_letter, turns, prompt)
+
+        # 요약 예상 크기로 원문 turn 수를 정하고, 필요한 요약만 가져옴
+        keep = min(self.keep_turns, len(turns))
+        while keep > 1 and fixed + sum(sizes[-keep:]) + SUMMARY_TOKENS_EST * (len(turns) - keep) > self.budget:
+            keep -= 1
+        older, recent = turns[:-keep], turns[-keep:]
+        summaries = await self._summaries(history.itv_no, older)
+
+        # 요약까지 넣어도 넘으면 가장 오래된 요약부터 제외
+        used = fixed + sum(sizes[-keep:])
+        summary_tokens = {number: estimate_tokens(text) + 2 for number, text in summaries.items()}
+        while summaries and used + sum(summary_tokens.values()) > self.budget:
+            oldest = min(summaries)
+            summaries.pop(oldest)
+            summary_tokens.pop(oldest)
+        used += sum(summary_tokens.values())
+        if used > self.budget:
+            self.counts['over_budget'] += 1
+            logger.error(f'Context 토큰 예산 초과 itv_no: {history.itv_no} 예상:{used} 예산:{self.budget}')
+
+        # 다음 turn 에 창 밖으로 나갈 turn 요약을 미리 생성
+        self._prefetch(history, len(turns) - keep + 1)
+        self.counts['compacted'] += 1
+        logger.info(f'Context 압축 itv_no: {history.itv_no} 원문 {keep} turn, 요약 {len(summaries)} turn, 예상 토큰 {total} -> {used}')
+        return build_chat_messages(history.cover_letter, recent, prompt,
+                                   summary=format_summary(summaries) if summaries else None)
+
+    async def _summaries(self, itv_no, turns):
+        turns = [turn for turn in turns if turn.question or turn.answer]
+        if not turns:
+            return {}
+        stored = await self._load(itv_no, [turn.number for turn in turns])
+        summaries = {}
+        pending = {}
+        for turn in turns:
+            if stored.get(turn.number):
+                summaries[turn.number] = stored[turn.number]
+                continue
+            task = self._tasks.get((itv_no, turn.number))
+            pending[turn.number] = asyncio.shield(task) if task else self.summarize(itv_no, turn)
+        if pending:
+            results = await asyncio.gather(*pending.values())
+            summaries.update(zip(pending, results))
+        return summaries
+
+    async def _load(self, itv_no, numbers):
+        try:
+            values = await self.redis_client.hmget(itv_no, [summary_field(number) for number in numbers])
+        except Exception as e:
+            logger.error(f'Context 요약 조회 실패 itv_no: {itv_no}: {e}')
+            return {}
+        stored = {}
+        for number, value in zip(numbers, values):
+            if value is None:
+                continue
+            try:
+                stored[number] = json.loads(value)
+            except (TypeError, ValueError):
+                logger.error(f'Context 요약 디코딩 실패 itv_no: {itv_no} {number}')
+        return stored
+
+    def _prefetch(self, history, number):
+        # number 번째 turn 요약이 없으면 백그라운드로 생성 (그 이전 turn 은 앞선 요청에서 이미 처리됨)
+        if number < 1 or number > len(history.turns):
+            return
+        turn = history.turns[number - 1]
+        key = (history.itv_no, turn.number)
+        if key in self._tasks or not (turn.question or turn.answer):
+            return
+        task = asyncio.create_task(self._prefetch_one(history.itv_no, turn))
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+    async def _prefetch_one(self, itv_no, turn):
+        stored = await self._load(itv_no, [turn.number])
+        if stored.get(turn.number):
+            return stored[turn.number]
+        return await self.summarize(itv_no, turn)
+
+    async def summarize(self, itv_no, turn):
+        try:
+            message = await self.llm.create(
+                model=self.model,
+                max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+                temperature=0,
+                system=SYSTEM_SUMMARY,
+                messages=[{
+                    "role": "user",
+                    "content": [{"type": "text", "text": f"Question: {turn.question}\nAnswer: {turn.answer}"}],
+                }],
+            )
+            summary = message.content[0].text.strip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f'Context 요약 실패 itv_no: {itv_no} {turn.number}: {e}')
+            summary = ''
+        if not summary:
+            # 요약 실패 시 원문 앞부분 사용 (저장하지 않아 다음 turn 에 다시 시도)
+            return f'질문: {str(turn.question)[:SUMMARY_FALLBACK_CHARS]} / 대답: {str(turn.answer)[:SUMMARY_FALLBACK_CHARS]}'
+        self.counts['summarized'] += 1
+        try:
+            await self._store(itv_no, summary_field(turn.number), json.dumps(summary, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f'Context 요약 저장 실패 itv_no: {itv_no} {turn.number}: {e}')
+        return summary
+
+    def stats(self):
+        return {'budget': self.budget, 'keep_turns': self.keep_turns, 'in_flight': len(self._tasks), **self.counts}
@@ -0,0 +1,68 @@
+import os
+
+# Bedrock prompt caching: 요청마다 같은 앞부분(system, 자기소개서, 이전 대화)을 캐시 지점으로 표시
+# 기본은 끔 (기본 모델 claude-3-5-sonnet-20240620 은 prompt caching 을 지원하지 않아 cache_control 이 있으면 검증 오류)
+PROMPT_CACHE = os.getenv('PROMPT_CACHE', '0') == '1'
+# 켜더라도 cache_control 은 Bedrock prompt caching 을 지원하는 모델로 가는 요청에만 남김 (쉼표 구분 model id)
+PROMPT_CACHE_MODELS = tuple(filter(None, os.getenv(
+    'PROMPT_CACHE_MODELS',
+    'anthropic.claude-3-5-haiku-20241022-v1:0,anthropic.claude-3-7-sonnet-20250219-v1:0',
+).split(',')))
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def cache_supported(model):
+    # "us.anthropic..." 같은 cross-region inference profile id 도 같은 모델로 봄
+    return bool(model) and any(model == m or model.endswith('.' + m) for m in PROMPT_CACHE_MODELS)
+
+
+def _strip_cache(content):
+    if not isinstance(content, list):
+        return content
+    return [{k: v for k, v in block.items() if k != 'cache_control'} for block in content]
+
+
+def cache_request(kwargs):
+    # messages.create 인자에서, 캐시를 지원하지 않는 모델이면 cache_control 표시를 뺀 복사본
+    if cache_supported(kwargs.get('model')):
+        return kwargs
+    request = dict(kwargs)
+    if 'system' in request:
+        request['system'] = _strip_cache(request['system'])
+    if 'messages' in request:
+        request['messages'] = [{**message, 'content': _strip_cache(message['content'])}
+                               for message in request['messages']]
+    return request
+
+
+def text_block(text, cache=False):
+    block = {"type": "text", "text": text}
+    if cache:
+        block["cache_control"] = CACHE_CONTROL
+    return block
+
+
+def text_message(role, text, cache=False):
+    return {"role": role, "content": [text_block(text, cache)]}
+
+
+def system_prompt(text, cache_prefix=PROMPT_CACHE):
+    if not cache_prefix or not text:
+        return text
+    return [text_block(text, cache=True)]
+
+
+def build_chat_messages(cover_letter, turns, prompt, cache_prefix=PROMPT_CACHE, summary=None):
+    # 자기소개서(user) -> 질문(assistant) / 답변(user) 반복 -> 마지막 질문 뒤에는 이번 대답(prompt)
+    # turns 는 HistoryRepository 가 돌려준 이전 질문/답변 목록 (question_number - 1 개)
+    # 캐시 지점: 자기소개서(면접 내내 동일)와 이번 대답 직전의 질문(다음 turn 의 앞부분이 됨)
+    # system 과 합쳐 최대 3개로, Bedrock 의 요청당 4개 제한 안에 들어간다
+    # summary: 압축된 이전 turn 요약, 자기소개서 캐시 지점 뒤에 붙여 자기소개서 캐시는 그대로 적중
+    messages = [text_message("user", cover_letter, cache=cache_prefix)]
+    if summary:
+        messages[0]["content"].append(text_block(summary))
+    last = len(turns) - 1
+    for i, turn in enumerate(turns):
+        messages.append(text_message("assistant", turn.question, cache=cache_prefix and i == last))
+        messages.append(text_message("user", prompt if i == last else turn.answer))
+    return messages
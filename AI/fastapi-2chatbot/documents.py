@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import extractors
+
+logger = logging.getLogger(__name__)
+
+# 추출 로직이 바뀌면 올려서 이전 캐시를 무효화
+PARSER_VERSION = '2'
+DOC_CACHE_MAX_ENTRIES = int(os.getenv('DOC_CACHE_MAX_ENTRIES', '256'))
+DOC_CACHE_MAX_CHARS = int(os.getenv('DOC_CACHE_MAX_CHARS', str(32 * 1024 * 1024)))
+DOC_CACHE_TTL_SEC = int(os.getenv('DOC_CACHE_TTL_SEC', str(7 * 24 * 3600)))
+# 추출 비용이 큰 형식만 캐시 (STT 결과 txt 는 매번 새 파일이라 HEAD 왕복만 늘어남)
+CACHED_TYPES = ('pdf', 'docx', 'hwp')
+
+# 추출 전용 프로세스 풀 설정
+DOC_WORKERS = int(os.getenv('DOC_WORKERS', str(min(os.cpu_count() or 1, 4))))
+DOC_MAX_BYTES = int(os.getenv('DOC_MAX_BYTES', str(20 * 1024 * 1024)))
+DOC_MAX_PAGES = int(os.getenv('DOC_MAX_PAGES', '50'))
+DOC_TIMEOUT_SEC = float(os.getenv('DOC_TIMEOUT_SEC', '20'))
+# 문서에서 추출하는 최대 글자 수/추정 토큰 수 (prompt 에 넣을 수 있는 만큼만 읽음, 0 이면 제한 없음)
+DOC_MAX_CHARS = int(os.getenv('DOC_MAX_CHARS', '30000'))
+DOC_MAX_TOKENS = int(os.getenv('DOC_MAX_TOKENS', '6000'))
+
+
+def parse_s3_url(url):
+    if url.startswith('s3://'):
+        url = url[5:]  # "s3://" 부분 제거
+        parts = url.split('/', 1) # 한 번만 분할
+        bucket_name = parts[0]
+        key = parts[1] if len(parts) > 1 else ''
+    else:
+        logging.error('Unsupported URL format')
+        raise ValueError('Unsupported URL format')
+    return bucket_name, key
+
+def file_type(key):
+    ext = key.rsplit('.', 1)[-1].lower() if '.' in key else ''
+    if ext not in ('pdf', 'docx', 'txt', 'hwp'):
+        logging.error('Unsupported file type')
+        raise ValueError('Unsupported file type')
+    return ext
+
+
+class TextLRU:
+    # 프로세스 내 추출 텍스트 캐시 (항목 수와 전체 글자 수로 제한)
+    def __init__(self, max_entries=DOC_CACHE_MAX_ENTRIES, max_chars=DOC_CACHE_MAX_CHARS):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.size = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        text = self._items.get(key)
+        if text is not None:
+            self._items.move_to_end(key)
+        return text
+
+    def put(self, key, text):
+        if len(text) > self.max_chars:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._items[key] = text
+        self.size += len(text)
+        while len(self._items) > self.max_entries or self.size > self.max_chars:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _WorkerPool:
+    # ProcessPoolExecutor 한 세대와 그 세대에서 아직 기다리는 추출 요청 수
+    # worker pid 는 executor 내부 속성 대신 initializer 가 pid_queue 로 알려준 값을 씀
+    def __init__(self, workers):
+        context = multiprocessing.get_context('spawn')
+        self.pid_queue = context.Queue()
+        self._pids = set()
+        # fork 는 부모의 스레드(OTel exporter 등) 상태까지 복사하므로 spawn 사용
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=extractors.init_worker,
+            initargs=(self.pid_queue,),
+        )
+        self.live = 0
+        self.retired = False
+        self.terminated = False
+
+    def pids(self):
+        while True:
+            try:
+                self._pids.add(self.pid_queue.get_nowait())
+            except queue.Empty:
+                return set(self._pids)
+            except (OSError, ValueError):
+                return set(self._pids)
+
+    def kill(self):
+        # 멈춘 worker 를 포함해 이 세대의 worker 를 모두 종료
+        pids = self.pids()
+        if not pids:
+            logger.warning('문서 추출 worker pid 를 받지 못해 shutdown 만 요청 (멈춘 worker 가 남을 수 있음)')
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            except OSError as e:
+                logger.error(f'문서 추출 worker 종료 실패 pid: {pid}: {e}')
+
+
+class ExtractionPool:
+    # PDF/DOCX/HWP 추출을 별도 프로세스에서 실행해 event loop 와 다른 면접 요청을 막지 않는다
+    # 제한 시간을 넘긴 요청이 있으면 그 풀은 새 요청을 받지 않게 하고(새 풀 생성) 남은 요청이 끝난 뒤 종료해
+    # 멈춘 worker 때문에 같은 풀의 다른 추출까지 실패하지 않게 한다 (그 사이 프로세스 수는 최대 2배)
+    # worker 가 죽으면(BrokenProcessPool) 풀 전체가 쓸 수 없으므로 바로 종료하고 새 풀에서 한 번 재시도
+    def __init__(self, workers=DOC_WORKERS, timeout=DOC_TIMEOUT_SEC, max_pages=DOC_MAX_PAGES,
+                 max_chars=DOC_MAX_CHARS, max_tokens=DOC_MAX_TOKENS):
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.pending = 0
+        self.restarts = 0
+        self.timeouts = 0
+        self._pool = None
+        self._retired = set()
+
+    def start(self):
+        if self._pool is None:
+            self._pool = _WorkerPool(self.workers)
+        return self._pool.executor
+
+    async def warm(self):
+        # worker 프로세스를 모두 미리 띄움 (spawn + initializer 의 라이브러리 import), 첫 문서 요청이 그 비용을 내지 않게
+        # 동시에 넣은 작업 수만큼 프로세스가 생성됨
+        executor = self.start()
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.workers)))
+        return len(set(pids))
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+        for pool in list(self._retired):
+            self._terminate(pool)
+
+    def _retire(self, pool):
+        # 이 풀에는 더 이상 요청을 보내지 않음 (다음 요청부터 새 풀), 남은 요청이 끝나면 _terminate
+        if pool.retired:
+            return
+        pool.retired = True
+        self._retired.add(pool)
+        if self._pool is pool:
+            self._pool = None
+        self.restarts += 1
+        logger.error(f'문서 추출 프로세스 풀 교체 ({self.restarts}회), 진행 중 {pool.live}건이 끝나면 종료')
+
+    def _terminate(self, pool, kill=True):
+        # kill=False: worker 가 이미 죽은 풀 (BrokenProcessPool 이면 executor 가 남은 worker 를 정리하므로,
+        # 재사용됐을 수 있는 pid 에 signal 을 보내지 않음)
+        if pool.terminated:
+            return
+        pool.terminated = True
+        self._retired.discard(pool)
+        if kill:
+            pool.kill()
+        pool.executor.shutdown(wait=False, cancel_futures=True)
+        pool.pid_queue.close()
+
+    async def extract(self, ext, content):
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            for attempt in range(2):
+                executor = self.start()
+                pool = self._pool
+                pool.live += 1
+                try:
+                    future = loop.run_in_executor(executor, extractors.extract, ext, content, self.max_pages,
+                                                  self.max_chars, self.max_tokens)
+                    return await asyncio.wait_for(future, self.timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    logger.error(f'{ext.upper()} 추출 시간 초과 SEC:{self.timeout}')
+                    self._retire(pool)
+                    return '', None
+                except BrokenProcessPool:
+                    logger.error(f'{ext.upper()} 추출 worker 비정상 종료 (시도 {attempt + 1})')
+                    self._retire(pool)
+                    self._terminate(pool, kill=False)
+                finally:
+                    pool.live -= 1
+                    if pool.retired and pool.live == 0:
+                        self._terminate(pool)
+            return '', None
+        finally:
+            self.pending -= 1
+
+    def limits(self):
+        # 추출 결과를 바꾸는 설정 (캐시 키에 포함)
+        return f'{self.max_pages}-{self.max_chars}-{self.max_tokens}'
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_depth': max(self.pending - self.workers, 0),
+            'pending': self.pending,
+            'restarts': self.restarts,
+            'retired': len(self._retired),
+            'timeouts': self.timeouts,
+        }
+
+
+class DocumentParser:
+    # S3 문서 텍스트 추출 + 2단계 캐시 (프로세스 LRU -> Redis)
+    # 캐시 키는 파서 버전, 형식, S3 ETag (ETag 가 없으면 내용 sha256)
+    # ETag 로 적중하면 HEAD 한 번으로 끝나고 본문 다운로드와 추출을 모두 건너뛴다
+    # ETag 가 없으면 본문은 받아야 하지만, 내용 sha256 으로 적중하면 추출은 건너뛴다
+    def __init__(self, storage, redis_client=None, extraction_pool=None):
+        self.storage = storage
+        self.redis_client = redis_client
+        self.extraction_pool = extraction_pool or ExtractionPool()
+        self.lru = TextLRU()
+        self.hits = {'lru': 0, 'redis': 0, 'miss': 0}
+        self.truncated = 0
+
+    async def parse(self, url, budget=True):
+        # budget=False: 답변(STT 결과 txt)처럼 문서 예산(DOC_MAX_CHARS/DOC_MAX_TOKENS) 없이 전체를 읽음
+        # (txt 만 해당, 캐시하는 문서 형식은 캐시 키에 포함된 풀의 예산을 항상 적용)
+        bucket_name, key = parse_s3_url(url)
+        ext = file_type(key)
+        if ext not in CACHED_TYPES:
+            return await self._download_and_extract(bucket_name, key, ext, budget)
+
+        head = await self.storage.head(bucket_name, key)
+        etag = head.get('ETag', '').strip('"')
+        file_content = None
+        if not etag:
+            file_content = await self._download(bucket_name, key, head)
+        cache_key = self.cache_key(ext, etag or hashlib.sha256(file_content).hexdigest())
+        text = await self._cache_get(cache_key)
+        if text is not None:
+            return text
+
+        self.hits['miss'] += 1
+        if file_content is None:
+            file_content = await self._download(bucket_name, key, head)
+        text = await self._extract(key, ext, file_content)
+        await self._cache_put(cache_key, text)
+        return text
+
+    def cache_key(self, ext, digest):
+        return f'doctext:v{PARSER_VERSION}:{ext}:{self.extraction_pool.limits()}:{digest}'
+
+    async def _cache_get(self, cache_key):
+        text = self.lru.get(cache_key)
+        if text is not None:
+            self.hits['lru'] += 1
+            logger.info(f'문서 캐시 적중(LRU): {cache_key}')
+            return text
+        if self.redis_client is None:
+            return None
+        try:
+            text = await self.redis_client.get(cache_key)
+        except Exception as e:
+            logger.error(f'문서 캐시 조회 실패: {e}')
+            return None
+        if text is not None:
+            self.hits['redis'] += 1
+            logger.info(f'문서 캐시 적중(Redis): {cache_key}')
+            self.lru.put(cache_key, text)
+        return text
+
+    async def _cache_put(self, cache_key, text):
+        # 추출 실패(빈 문자열)는 캐시하지 않음
+        if not cache_key or not text:
+            return
+        self.lru.put(cache_key, text)
+        if self.redis_client is None:
+            return
+        try:
+            await self.redis_client.set(cache_key, text, ex=DOC_CACHE_TTL_SEC)
+        except Exception as e:
+            logger.error(f'문서 캐시 저장 실패: {e}')
+
+    async def _download(self, bucket_name, key, head=None):
+        # 크기 제한을 넘으면 본문을 받지 않고 ObjectTooLargeError (413)
+        return await self.storage.read(bucket_name, key, DOC_MAX_BYTES, head=head)
+
+    async def _download_and_extract(self, bucket_name, key, ext, budget=True):
+        file_content = await self._download(bucket_name, key)
+        return await self._extract(key, ext, file_content, budget)
+
+    async def _extract(self, key, ext, file_content, budget=True):
+        if ext == 'txt':
+            # 단순 디코딩이라 프로세스 간 복사 비용이 더 큼
+            logger.info('TXT Parsing')
+            pool = self.extraction_pool
+            max_chars, max_tokens = (pool.max_chars, pool.max_tokens) if budget else (0, 0)
+            text, meta = extractors.extract_text_from_txt(file_content, pool.max_pages, max_chars, max_tokens)
+        else:
+            # HWP 도 다른 형식과 같이 메모리의 bytes 를 그대로 넘김 (같은 크기/시간 제한 적용)
+            logger.info(f'{ext.upper()} Parsing')
+            text, meta = await self.extraction_pool.extract(ext, file_content)
+        if meta and meta['truncated']:
+            self.truncated += 1
+            logger.warning(f'문서 일부만 추출 {key}: {meta["reason"]} {meta["unit"]} {meta["read"]}/{meta["total"]}, '
+                           f'{meta["chars"]} 글자, 약 {meta["tokens"]} 토큰')
+        return text
+
+    def stats(self):
+        return {
+            'cache': {'entries': len(self.lru), 'chars': self.lru.size, **self.hits},
+            'truncated': self.truncated,
+            'extraction': self.extraction_pool.stats(),
+        }
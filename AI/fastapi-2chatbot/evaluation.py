@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+
+from pydantic import ValidationError
+
+from llm import AsyncLLM, usage_tokens
+from metrics import llm_metrics
+from structured import ReportOutput, loads_tolerant
+
+logger = logging.getLogger(__name__)
+
+# 답변별 평가와 Report 병합은 짧은 입력/출력이라 작은 모델로 충분
+EVAL_MODEL_ID = os.getenv('EVAL_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+EVAL_MAX_TOKENS = int(os.getenv('EVAL_MAX_TOKENS', '1024'))
+REPORT_MERGE_MAX_TOKENS = int(os.getenv('REPORT_MERGE_MAX_TOKENS', '2048'))
+# 백그라운드 평가가 질문 생성의 Bedrock 동시 실행 슬롯을 차지하지 않도록 별도 제한
+EVAL_MAX_CONCURRENCY = int(os.getenv('EVAL_MAX_CONCURRENCY', '8'))
+EVAL_TIMEOUT_SEC = float(os.getenv('EVAL_TIMEOUT_SEC', '60'))
+
+# Report 항목 (question.py system_report 의 출력 형식과 동일한 순서)
+CRITERIA = (
+    'relevant_experience',
+    'problem_solving',
+    'communication_skills',
+    'initiative',
+    'situation',
+    'task',
+    'action',
+    'result',
+)
+
+SYSTEM_EVALUATION = os.getenv('SYSTEM_EVALUATION', '''
+    역할:
+    면접 질문 하나와 그에 대한 면접 대상자의 대답 하나를 평가
+
+    지시사항:
+    1. 관련 경험, 문제 해결 능력, 의사소통 능력, 주도성과 STAR 기법(상황, 과제, 행동, 결과)에 따라 0~100 점수와 한두 문장의 설명을 넣어 평가해주세요.
+    2. 대답에서 확인할 수 없는 항목은 낮은 점수와 그 이유를 적어주세요.
+    3. 평가 내용은 사실만을 넣어야합니다. 모든 설명은 한국어로 작성합니다.
+
+    Output format: JSON
+    {
+    "relevant_experience": {"score": 0, "comment": ""},
+    "problem_solving": {"score": 0, "comment": ""},
+    "communication_skills": {"score": 0, "comment": ""},
+    "initiative": {"score": 0, "comment": ""},
+    "situation": {"score": 0, "comment": ""},
+    "task": {"score": 0, "comment": ""},
+    "action": {"score": 0, "comment": ""},
+    "result": {"score": 0, "comment": ""}
+    }''')
+
+SYSTEM_REPORT_MERGE = os.getenv('SYSTEM_REPORT_MERGE', '''
+    역할:
+    면접 답변별 평가를 모아 최종 Report 의 항목별 설명과 응원 문구를 작성
+
+    지시사항:
+    1. 입력은 질문 번호별 항목 점수와 설명입니다. 모든 답변에 대한 종합 평가로 항목별 설명을 두세 문장으로 작성해주세요.
+    2. 점수는 다시 계산하지 마세요. 평가 내용은 입력에 있는 사실만 넣어야합니다.
+    3. 마지막에 응원 문구를 작성해주세요. 모든 설명은 한국어로 작성합니다.
+
+    Output format: JSON
+    {
+    "relevant_experience": "",
+    "problem_solving": "",
+    "communication_skills": "",
+    "initiative": "",
+    "situation": "",
+    "task": "",
+    "action": "",
+    "result": "",
+    "encouragement": ""
+    }''')
+
+
+def evaluation_field(number):
+    return f'evaluation-{number}'
+
+
+def answer_digest(answer):
+    # 평가한 답변의 버전 (같은 번호의 답변이 다시 저장되면 이전 답변의 평가는 쓰지 않음)
+    return hashlib.sha1(str(answer).encode('utf-8')).hexdigest()[:16]
+
+
+def parse_json(message_content):
+    # 재요청 없이 로컬 복구까지만 (평가는 다음 Report 에서 다시 시도됨)
+    data, _ = loads_tolerant(message_content)
+    return data if isinstance(data, dict) else None
+
+
+def _score(value):
+    try:
+        return max(0, min(100, int(round(float(value)))))
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_evaluation(raw):
+    # 모델 출력에서 항목별 {score, comment} 만 남김 (점수가 없는 항목은 제외)
+    if not isinstance(raw, dict):
+        return None
+    evaluation = {}
+    for name in CRITERIA:
+        item = raw.get(name)
+        if not isinstance(item, dict):
+            continue
+        score = _score(item.get('score'))
+        if score is None:
+            continue
+        evaluation[name] = {'score': score, 'comment': str(item.get('comment') or '')}
+    return evaluation or None
+
+
+def average_scores(evaluations):
+    scores = {}
+    for name in CRITERIA:
+        values = [e[name]['score'] for e in evaluations.values() if name in e]
+        if values:
+            scores[name] = round(sum(values) / len(values))
+    return scores
+
+
+class AnswerEvaluator:
+    # 답변이 저장될 때마다 백그라운드로 평가해 itv_no 해시의 evaluation-n 에 (답변 digest 와 함께) 저장하고,
+    # /question/report 에서는 저장된 평가를 모아 점수는 평균, 설명은 짧은 요약 호출 한 번으로 병합한다
+    # 평가는 지금 저장된 답변과 digest 가 같은 것만 사용 (다시 저장된 답변의 이전 평가는 버림)
+    # sessions: SessionStore (평가 저장 때 세션 TTL 갱신 + 크기 정산), rate_limiter: 공유 RPM/TPM 제한
+    def __init__(self, llm_client, redis_client, model=EVAL_MODEL_ID, sessions=None, rate_limiter=None):
+        self.llm = AsyncLLM(llm_client, max_concurrency=EVAL_MAX_CONCURRENCY, timeout=EVAL_TIMEOUT_SEC,
+                            rate_limiter=rate_limiter)
+        self.redis_client = redis_client
+        self.model = model
+        self.sessions = sessions
+        self._tasks = {}
+        self.completed = 0
+        self.failed = 0
+
+    async def _store(self, itv_no, field, value):
+        if self.sessions is not None:
+            await self.sessions.store(itv_no, field, value)
+        else:
+            await self.redis_client.hset(itv_no, field, value)
+
+    def schedule(self, itv_no, number, question, answer):
+        key = (itv_no, number)
+        if not question or not answer:
+            return None
+        digest = answer_digest(answer)
+        running = self._tasks.get(key)
+        if running is not None and running[0] == digest:
+            return running[1]
+        task = asyncio.create_task(self.evaluate(itv_no, number, question, answer))
+        self._tasks[key] = (digest, task)
+
+        def done(_):
+            # 그 사이 다시 저장된 답변의 평가가 등록됐으면 그대로 둠
+            if self._tasks.get(key, (None, None))[1] is task:
+                del self._tasks[key]
+        task.add_done_callback(done)
+        return task
+
+    async def evaluate(self, itv_no, number, question, answer, is_disconnected=None):
+        start_time = time.perf_counter()
+        try:
+            message = await self.llm.create(
+                is_disconnected=is_disconnected,
+                model=self.model,
+                max_tokens=EVAL_MAX_TOKENS,
+                temperature=0,
+                system=SYSTEM_EVALUATION,
+                messages=[{
+                    "role": "user",
+                    "content": [{"type": "text", "text": f"Question: {question}\nAnswer: {answer}"}],
+                }],
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f'답변 평가 실패 itv_no: {itv_no} {number}: {e}')
+            return None
+        evaluation = normalize_evaluation(parse_json(message.content[0].text))
+        if evaluation is None:
+            self.failed += 1
+            logger.error(f'답변 평가 JSON 파싱 실패 itv_no: {itv_no} {number}')
+            return None
+        self.completed += 1
+        self._log_usage('evaluation', message.usage, time.perf_counter() - start_time, number)
+        try:
+            value = {'answer_digest': answer_digest(answer), 'evaluation': evaluation}
+            await self._store(itv_no, evaluation_field(number), json.dumps(value, ensure_ascii=False))
+        except Exception as e:
+            logger.error(f'답변 평가 저장 실패 itv_no: {itv_no} {number}: {e}')
+        return evaluation
+
+    async def load(self, itv_no, question_number, answers=None):
+        # answers: 답변 번호 -> 지금 저장된 답변, 주어지면 digest 가 다른(이전 답변의) 평가는 제외
+        fields = [evaluation_field(i) for i in range(1, question_number + 1)]
+        try:
+            values = self.redis_client.hmget(itv_no, fields)
+            if inspect.isawaitable(values):
+                values = await values
+        except Exception as e:
+            logger.error(f'답변 평가 조회 실패 itv_no: {itv_no}: {e}')
+            values = [None] * question_number
+        evaluations = {}
+        for number, value in enumerate(values, start=1):
+            if value is None:
+                continue
+            try:
+                stored = json.loads(value)
+            except (TypeError, ValueError):
+                logger.error(f'답변 평가 디코딩 실패 itv_no: {itv_no} {number}')
+                continue
+            if not isinstance(stored, dict) or not isinstance(stored.get('evaluation'), dict):
+                continue
+            if answers is not None and stored.get('answer_digest') != answer_digest(answers.get(number)):
+                logger.info(f'이전 답변의 평가 제외 itv_no: {itv_no} {number}')
+                continue
+            evaluations[number] = stored['evaluation']
+        return evaluations
+
+    async def collect(self, history, is_disconnected=None):
+        # 저장된 평가 + 진행 중인 백그라운드 평가 대기 + 아직 없는 답변(마지막 답변 등)은 지금 병렬 평가
+        answers = {turn.number: turn.answer for turn in history.turns}
+        evaluations = await self.load(history.itv_no, len(history.turns), answers)
+        pending = {}
+        for turn in history.turns:
+            if turn.number in evaluations or not turn.question or not turn.answer:
+                continue
+            running = self._tasks.get((history.itv_no, turn.number))
+            if running is None or running[0] != answer_digest(turn.answer):
+                task = self.evaluate(history.itv_no, turn.number, turn.question, turn.answer, is_disconnected)
+            else:
+                task = running[1]
+                # Report 요청이 끊겨도 백그라운드 평가는 계속 진행
+                task = asyncio.shield(task)
+            pending[turn.number] = task
+        if pending:
+            logger.info(f'Report 전 답변 평가 대기 {len(pending)}건 itv_no: {history.itv_no}')
+            results = await asyncio.gather(*pending.values())
+            for number, evaluation in zip(pending, results):
+                if evaluation:
+                    evaluations[number] = evaluation
+        return evaluations
+
+    async def merge(self, history, evaluations, is_disconnected=None):
+        # 평가가 없는 답변이 하나라도 있거나 요약을 읽지 못하면 None (호출한 쪽에서 전체 대화로 Report 생성)
+        missing = [turn.number for turn in history.turns
+                   if turn.question and turn.answer and turn.number not in evaluations]
+        if missing:
+            logger.error(f'평가 없는 답변 {missing} itv_no: {history.itv_no}, 병합하지 않음')
+            return None
+        scores = average_scores(evaluations)
+        if not scores:
+            return None
+        lines = []
+        for number in sorted(evaluations):
+            comments = ', '.join(
+                f"{name} {item['score']}: {item['comment']}" for name, item in evaluations[number].items()
+            )
+            lines.append(f"Question {number}: {comments}")
+        start_time = time.perf_counter()
+        message = await self.llm.create(
+            is_disconnected=is_disconnected,
+            model=self.model,
+            max_tokens=REPORT_MERGE_MAX_TOKENS,
+            temperature=1,
+            system=SYSTEM_REPORT_MERGE,
+            messages=[{
+                "role": "user",
+                "content": [{"type": "text", "text": "\n".join(lines)}],
+            }],
+        )
+        self._log_usage('report_merge', message.usage, time.perf_counter() - start_time, len(history.turns))
+        summary = parse_json(message.content[0].text)
+        if summary is None:
+            logger.error(f'Report 병합 JSON 파싱 실패 itv_no: {history.itv_no}')
+            return None
+
+        report = {}
+        for name in CRITERIA:
+            score = scores.get(name)
+            comment = summary.get(name) or ''
+            report[name] = f'{score}%, {comment}' if score is not None else comment
+        report['overall_score'] = str(round(sum(scores.values()) / len(scores)))
+        report['encouragement'] = summary.get('encouragement') or ''
+        # 설명/응원 문구가 빠진 병합 결과는 최종 Report 로 쓰지 않음
+        try:
+            return ReportOutput.model_validate(report).model_dump()
+        except ValidationError as e:
+            logger.error(f'Report 병합 결과 검증 실패 itv_no: {history.itv_no}: {e.errors()[:3]}')
+            return None
+
+    def _log_usage(self, endpoint, usage, duration, turn):
+        input_tokens, output_tokens, _, _ = usage_tokens(usage)
+        cost = llm_metrics.record(endpoint, self.model, usage, duration=duration, turn=turn)
+        logger.info(f'{endpoint} {turn} Bedrock cost:{cost} input:{input_tokens} output:{output_tokens}')
+
+    def stats(self):
+        return {
+            'in_flight': len(self._tasks),
+            'completed': self.completed,
+            'failed': self.failed,
+            'llm': self.llm.stats(),
+        }
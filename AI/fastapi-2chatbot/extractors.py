@@ -0,0 +1,180 @@
+# 문서 텍스트 추출 함수 (ExtractionPool 의 worker 프로세스에서 실행)
+# 프로세스 간에 넘길 수 있도록 모두 모듈 최상위 함수로 두고, 인자/반환값은 bytes, str, int, dict 만 사용
+# 페이지/문단 단위로 읽다가 글자 수/토큰 예산에 닿으면 멈춰, 비용이 업로드 크기가 아니라 실제로 쓰는 분량에 비례하게 함
+import codecs
+import io
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    # worker 시작 시 무거운 라이브러리를 미리 import 해서 첫 요청 지연을 줄임
+    import PyPDF2  # noqa: F401
+    import docx  # noqa: F401
+
+
+def init_worker(pids):
+    # ExtractionPool worker 초기화: pid 를 부모에 알리고(멈춘 worker 종료용) 라이브러리 미리 import
+    pids.put(os.getpid())
+    warm_up()
+
+
+def cut_to_tokens(text, max_tokens):
+    # estimate_tokens 기준으로 max_tokens 안에 들어가는 가장 긴 앞부분 (길이에 대해 이분 탐색)
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def collect(chunks, max_chars=0, max_tokens=0):
+    # 페이지/문단 generator 를 글자 수, 토큰 예산까지만 읽고 멈춤 (0 이면 제한 없음)
+    # 반환: (text, 읽은 단위 수, 마지막 단위를 잘랐는지)
+    parts = []
+    chars = tokens = read = 0
+    cut = False
+    for chunk in chunks:
+        read += 1
+        if max_chars and chars + len(chunk) > max_chars:
+            chunk = chunk[:max_chars - chars]
+            cut = True
+        chunk_tokens = estimate_tokens(chunk)
+        if max_tokens and tokens + chunk_tokens > max_tokens:
+            chunk = cut_to_tokens(chunk, max_tokens - tokens)
+            chunk_tokens = estimate_tokens(chunk)
+            cut = True
+        parts.append(chunk)
+        chars += len(chunk)
+        tokens += chunk_tokens
+        if cut or (max_chars and chars >= max_chars) or (max_tokens and tokens >= max_tokens):
+            break
+    return ''.join(parts), read, cut
+
+
+def extraction_meta(unit, read, total, text, cut, limit=None):
+    # 잘림 정보: 읽은 단위 수/전체 단위 수, 잘린 이유 (budget 또는 pages)
+    truncated = cut or (total is not None and read < total)
+    return {
+        'unit': unit,
+        'read': read,
+        'total': total,
+        'chars': len(text),
+        'tokens': estimate_tokens(text),
+        'truncated': truncated,
+        'reason': (limit or 'budget') if truncated else None,
+    }
+
+
+def iter_pdf_pages(pdf_reader, max_pages):
+    for i, page in enumerate(pdf_reader.pages):
+        if i >= max_pages:
+            break
+        yield page.extract_text()
+
+
+def extract_text_from_pdf(pdf_content, max_pages, max_chars=0, max_tokens=0):
+    from PyPDF2 import PdfReader
+    try:
+        pdf_reader = PdfReader(io.BytesIO(pdf_content))
+        total = len(pdf_reader.pages)
+        text, read, cut = collect(iter_pdf_pages(pdf_reader, max_pages), max_chars, max_tokens)
+        # 예산보다 페이지 제한에 먼저 걸린 경우
+        limit = 'pages' if not cut and read == max_pages < total else None
+        if limit:
+            logger.warning(f'PDF 페이지 제한 초과, {max_pages} 페이지까지만 추출')
+        return text, extraction_meta('pages', read, total, text, cut, limit)
+    except Exception:
+        logging.error('PDF File Parsing Error')
+        return '', None
+
+
+def iter_docx_paragraphs(doc):
+    # doc.paragraphs 는 전체 Paragraph 목록을 한 번에 만들므로 본문 w:p 요소를 하나씩 감싸서 사용
+    from docx.oxml.ns import qn
+    from docx.text.paragraph import Paragraph
+    for element in doc.element.body.iterchildren(qn('w:p')):
+        yield Paragraph(element, doc).text
+
+
+def extract_text_from_docx(docx_content, max_pages, max_chars=0, max_tokens=0):
+    # docx 는 페이지 정보가 없어 문단 단위로 예산 적용
+    from docx import Document
+    from docx.oxml.ns import qn
+    try:
+        doc = Document(io.BytesIO(docx_content))
+        text, read, cut = collect(iter_docx_paragraphs(doc), max_chars, max_tokens)
+        total = sum(1 for _ in doc.element.body.iterchildren(qn('w:p')))
+        return text, extraction_meta('paragraphs', read, total, text, cut)
+    except Exception:
+        logging.error('DOCX File Parsing Error')
+        return '', None
+
+
+def extract_text_from_txt(txt_content, max_pages, max_chars=0, max_tokens=0):
+    # 예산 안에 들어갈 수 있는 만큼의 bytes 만 디코딩 (UTF-8 한 글자는 최대 4 byte, 토큰당 최대 4 글자)
+    limits = [limit for limit in (max_chars * 4, max_tokens * 16) if limit]
+    head = txt_content[:min(limits)] if limits else txt_content
+    try:
+        # 잘린 위치의 불완전한 multibyte 문자는 버림
+        decoded = codecs.getincrementaldecoder('utf-8')().decode(head, final=len(head) == len(txt_content)).strip()
+    except Exception:
+        logging.error('TXT File Parsing Error')
+        return '', None
+    text, _, cut = collect([decoded], max_chars, max_tokens)
+    cut = cut or len(head) < len(txt_content)
+    return text, extraction_meta('bytes', len(head), len(txt_content), text, cut)
+
+
+def read_hwp_text(reader, hwp_content):
+    # HWPReader.load_data 는 파일 경로만 받으므로, 메모리의 bytes 를 olefile 로 열고
+    # 본문 섹션 해석만 HWPReader 에 맡긴다 (임시 파일 없음)
+    # _get_text 는 HWPReader 의 private method 라 requirements.txt 에 llama-index-readers-file 버전을 고정하고,
+    # 버전이 바뀌어 없어지면 public load_data 에 (요청마다 다른 이름의) 임시 파일을 넘긴다
+    import olefile
+    get_text = getattr(reader, '_get_text', None)
+    if get_text is None:
+        logging.warning('HWPReader._get_text 없음 (llama-index-readers-file 버전 확인), 임시 파일로 load_data 사용')
+        with tempfile.NamedTemporaryFile(suffix='.hwp') as hwp_file:
+            hwp_file.write(hwp_content)
+            hwp_file.flush()
+            return '\n'.join(document.text for document in reader.load_data(Path(hwp_file.name)))
+    with olefile.OleFileIO(io.BytesIO(hwp_content)) as load_file:
+        file_dirs = load_file.listdir()
+        if not reader.is_valid(file_dirs):
+            raise ValueError('Not Valid HwpFile')
+        return get_text(load_file, file_dirs)
+
+
+def extract_text_from_hwp(hwp_content, max_pages, max_chars=0, max_tokens=0):
+    # 섹션 해석은 HWPReader 내부에서 한 번에 이뤄져 예산은 추출 후 적용
+    from llama_index.readers.file import HWPReader
+    try:
+        text = read_hwp_text(HWPReader(), hwp_content)
+        text, _, cut = collect([text], max_chars, max_tokens)
+        return text, extraction_meta('document', 1, 1, text, cut)
+    except Exception as e:
+        logging.error(f'HWP File Parsing Error: {e}')
+        return '', None
+
+
+EXTRACTORS = {
+    'pdf': extract_text_from_pdf,
+    'docx': extract_text_from_docx,
+    'txt': extract_text_from_txt,
+    'hwp': extract_text_from_hwp,
+}
+
+
+def extract(ext, content, max_pages, max_chars=0, max_tokens=0):
+    # 반환: (text, 잘림 정보 dict, 추출 실패 시 None)
+    return EXTRACTORS[ext](content, max_pages, max_chars, max_tokens)
@@ -0,0 +1,72 @@
+import inspect
+import json
+import logging
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Turn:
+    number: int
+    question: object = None
+    answer: object = None
+
+
+@dataclass
+class InterviewHistory:
+    itv_no: str
+    cover_letter: object = None
+    turns: list = field(default_factory=list)
+
+    @property
+    def questions(self):
+        return [turn.question for turn in self.turns]
+
+    @property
+    def answers(self):
+        return [turn.answer for turn in self.turns]
+
+
+def _decode(value):
+    # 저장 형식은 store_history_redis 와 같은 JSON 문자열 (decode_responses 여부와 무관하게 처리)
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        logger.error(f'Redis History 디코딩 실패: {value!r:.80}')
+        return None
+
+
+class HistoryRepository:
+    # itv_no 해시에서 자기소개서와 question-1..n / answer-1..n 을 HMGET 한 번(네트워크 왕복 1회)으로 읽는다
+    # redis_client 는 redis.asyncio 클라이언트와 동기 redis.Redis 모두 가능
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def fields(question_number):
+        fields = ["coverletter"]
+        for i in range(1, question_number + 1):
+            fields.append(f"question-{i}")
+            fields.append(f"answer-{i}")
+        return fields
+
+    async def load(self, itv_no, question_number):
+        try:
+            values = self.redis_client.hmget(itv_no, self.fields(question_number))
+            if inspect.isawaitable(values):
+                values = await values
+        except Exception as e:
+            logger.error(f'Redis History 조회 실패 itv_no: {itv_no}: {e}')
+            values = [None] * (1 + 2 * question_number)
+        return self.decode(itv_no, values)
+
+    @staticmethod
+    def decode(itv_no, values):
+        decoded = [_decode(value) for value in values]
+        history = InterviewHistory(itv_no=itv_no, cover_letter=decoded[0])
+        for i in range(1, len(decoded), 2):
+            history.turns.append(Turn(number=i // 2 + 1, question=decoded[i], answer=decoded[i + 1]))
+        return history
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', '2'))
+# job 상태/결과 보관 시간
+REPORT_JOB_TTL_SEC = int(os.getenv('REPORT_JOB_TTL_SEC', '3600'))
+# 완료된 Report 캐시 (같은 면접 다시 보기)
+REPORT_CACHE_TTL_SEC = int(os.getenv('REPORT_CACHE_TTL_SEC', str(24 * 3600)))
+# running 상태로 이 시간 넘게 갱신이 없으면 worker 가 죽은 것으로 보고 다시 queue 에 넣음
+REPORT_JOB_STALE_SEC = int(os.getenv('REPORT_JOB_STALE_SEC', '300'))
+# running job 의 updated 를 갱신하는 주기 (stale 판단 시간보다 충분히 짧게)
+REPORT_JOB_HEARTBEAT_SEC = float(os.getenv('REPORT_JOB_HEARTBEAT_SEC', str(REPORT_JOB_STALE_SEC / 5)))
+# BLMOVE 대기 시간 (Redis socket timeout 보다 짧게)
+REPORT_QUEUE_BLOCK_SEC = float(os.getenv('REPORT_QUEUE_BLOCK_SEC', '1'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+# 생성은 끝났지만 Report 를 만들지 못함 (handler 결과가 is_empty)
+NO_REPORT = 'no_report'
+TERMINAL = (DONE, FAILED, NO_REPORT)
+
+# active 키가 아직 그 job 을 가리킬 때만 삭제
+DELETE_IF_EQUAL_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class ReportJobQueue:
+    # Report 생성 job queue (Redis list) + worker pool + 완료 Report 캐시
+    # submit 은 job id 를 바로 돌려주고, 어느 pod 의 worker 든 queue 에서 꺼내 handler(itv_no, question_number) 실행
+    # 결과는 job 해시에 저장되어 polling/SSE 로 조회
+    # 같은 면접의 job 은 active 키(SET NX)로 하나만 등록하고, 실행 중에는 heartbeat 로 updated 를 갱신해
+    # 오래 걸리는 job 이 다른 worker 에 다시 잡히지 않게 한다
+    # is_empty(result): Report 가 아닌 결과(생성 실패 응답)를 DONE 대신 NO_REPORT 로 구분
+    def __init__(self, redis_client, handler, workers=REPORT_WORKERS, prefix='report', is_empty=None):
+        self.redis_client = redis_client
+        self.handler = handler
+        self.is_empty = is_empty or (lambda result: False)
+        self.workers = workers
+        self.prefix = prefix
+        self.queue_key = f'{prefix}:queue'
+        self.processing_key = f'{prefix}:processing'
+        self._tasks = []
+        self.running = 0
+        self.counts = {'submitted': 0, 'cached': 0, 'done': 0, 'no_report': 0, 'failed': 0, 'requeued': 0}
+
+    def job_key(self, job_id):
+        return f'{self.prefix}:job:{job_id}'
+
+    def cache_key(self, itv_no, question_number):
+        return f'{self.prefix}:result:{itv_no}:{question_number}'
+
+    def active_key(self, itv_no, question_number):
+        return f'{self.prefix}:active:{itv_no}:{question_number}'
+
+    async def get_cached(self, itv_no, question_number):
+        try:
+            value = await self.redis_client.get(self.cache_key(itv_no, question_number))
+            return json.loads(value) if value is not None else None
+        except Exception as e:
+            logger.error(f'Report 캐시 조회 실패 itv_no: {itv_no}: {e}')
+            return None
+
+    async def store_cached(self, itv_no, question_number, report):
+        try:
+            await self.redis_client.set(self.cache_key(itv_no, question_number), json.dumps(report),
+                                        ex=REPORT_CACHE_TTL_SEC)
+        except Exception as e:
+            logger.error(f'Report 캐시 저장 실패 itv_no: {itv_no}: {e}')
+
+    async def submit(self, itv_no, question_number):
+        self.counts['submitted'] += 1
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        job = {'job_id': job_id, 'itv_no': itv_no, 'question_number': question_number,
+               'status': QUEUED, 'created': now, 'updated': now}
+        report = await self.get_cached(itv_no, question_number)
+        if report is not None:
+            self.counts['cached'] += 1
+            job.update(status=DONE, result=report)
+            await self._save(job)
+            return job
+
+        # 같은 면접의 job 이 이미 대기/실행 중이면 그 job 반환 (동시에 온 submit 중 SET NX 에 성공한 하나만 등록)
+        active_key = self.active_key(itv_no, question_number)
+        while not await self.redis_client.set(active_key, job_id, nx=True, ex=REPORT_JOB_TTL_SEC):
+            active = await self.redis_client.get(active_key)
+            if active is None:
+                continue
+            existing = await self.get(active)
+            if existing is not None and existing['status'] in (QUEUED, RUNNING):
+                return existing
+            # 끝났거나 사라진 job 의 active 키가 남아 있으면 지우고 다시 시도
+            await self.redis_client.eval(DELETE_IF_EQUAL_SCRIPT, 1, active_key, active)
+
+        await self._save(job)
+        await self.redis_client.lpush(self.queue_key, job_id)
+        logger.info(f'Report job 등록 {job_id} itv_no: {itv_no}')
+        return job
+
+    async def get(self, job_id):
+        value = await self.redis_client.get(self.job_key(job_id))
+        return json.loads(value) if value is not None else None
+
+    async def _save(self, job):
+        job['updated'] = time.time()
+        await self.redis_client.set(self.job_key(job['job_id']), json.dumps(job), ex=REPORT_JOB_TTL_SEC)
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _worker(self, index):
+        last_reap = 0
+        while True:
+            try:
+                if time.time() - last_reap > REPORT_JOB_STALE_SEC / 2:
+                    last_reap = time.time()
+                    await self._requeue_stale()
+                # 꺼낸 job 은 processing list 로 옮겨, 처리 중 pod 가 죽어도 다시 queue 로 돌릴 수 있게 함
+                job_id = await self.redis_client.blmove(
+                    self.queue_key, self.processing_key, REPORT_QUEUE_BLOCK_SEC, 'RIGHT', 'LEFT')
+                if job_id is None:
+                    continue
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Report worker {index} 오류: {e}')
+                await asyncio.sleep(1)
+
+    async def _run(self, job_id):
+        job = await self.get(job_id)
+        if job is None or job['status'] in (DONE, NO_REPORT):
+            await self.redis_client.lrem(self.processing_key, 0, job_id)
+            return
+        job['status'] = RUNNING
+        await self._save(job)
+        self.running += 1
+        start_time = time.perf_counter()
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            report = await self.handler(job['itv_no'], job['question_number'])
+        except Exception as e:
+            self.counts['failed'] += 1
+            logger.error(f'Report job 실패 {job_id}: {e}')
+            job.update(status=FAILED, error=str(e) or type(e).__name__)
+        else:
+            if self.is_empty(report):
+                self.counts['no_report'] += 1
+                logger.error(f'Report job Report 없음 {job_id} SEC:{time.perf_counter() - start_time}')
+                job.update(status=NO_REPORT, result=report)
+            else:
+                self.counts['done'] += 1
+                logger.info(f'Report job 완료 {job_id} SEC:{time.perf_counter() - start_time}')
+                job.update(status=DONE, result=report)
+        finally:
+            self.running -= 1
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+        await self._save(job)
+        await self.redis_client.eval(DELETE_IF_EQUAL_SCRIPT, 1,
+                                     self.active_key(job['itv_no'], job['question_number']), job_id)
+        await self.redis_client.lrem(self.processing_key, 0, job_id)
+
+    async def _heartbeat(self, job):
+        # 실행 중인 job 의 updated 갱신 (stale 로 보고 다시 queue 에 넣지 않도록)
+        while True:
+            await asyncio.sleep(REPORT_JOB_HEARTBEAT_SEC)
+            try:
+                await self._save(job)
+            except Exception as e:
+                logger.error(f'Report job heartbeat 실패 {job["job_id"]}: {e}')
+
+    async def _requeue_stale(self):
+        for job_id in await self.redis_client.lrange(self.processing_key, 0, -1):
+            job = await self.get(job_id)
+            if job is not None and job['status'] in TERMINAL:
+                await self.redis_client.lrem(self.processing_key, 0, job_id)
+                continue
+            if job is not None and time.time() - job['updated'] < REPORT_JOB_STALE_SEC:
+                continue
+            # LREM 이 1 이면 다른 pod 보다 먼저 가져간 것
+            if await self.redis_client.lrem(self.processing_key, 1, job_id):
+                if job is None:
+                    continue
+                self.counts['requeued'] += 1
+                logger.error(f'Report job 재등록 (갱신 없음) {job_id}')
+                job['status'] = QUEUED
+                await self._save(job)
+                await self.redis_client.lpush(self.queue_key, job_id)
+
+    async def stats(self):
+        try:
+            queued = await self.redis_client.llen(self.queue_key)
+        except Exception:
+            queued = None
+        return {'workers': len(self._tasks), 'running': self.running, 'queued': queued, **self.counts}
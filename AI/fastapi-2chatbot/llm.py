@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import os
+import re
+
+from conversation import cache_request
+
+logger = logging.getLogger(__name__)
+
+# 동시에 Bedrock으로 나가는 생성 요청 수와 요청당 제한 시간 (대기열 대기 시간 포함)
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
+LLM_TIMEOUT_SEC = float(os.getenv('LLM_TIMEOUT_SEC', '90'))
+# 클라이언트 연결 끊김 확인 주기
+LLM_DISCONNECT_POLL_SEC = float(os.getenv('LLM_DISCONNECT_POLL_SEC', '0.5'))
+
+# model 별 토큰 단가 (USD / 1M 토큰): 입력, 출력, 캐시 쓰기, 캐시 읽기
+# key 는 region/provider 접두어와 버전 접미어를 뺀 이름 (Bedrock model id 와 응답의 model 이 같은 key 가 되도록)
+# 목록에 없는 model 은 비용을 계산하지 않음 (LLM_PRICES='{"model": [입력, 출력, 캐시 쓰기, 캐시 읽기]}' 로 추가/변경)
+MODEL_PRICES = {
+    'claude-3-5-sonnet-20240620': (3, 15, 3.75, 0.3),
+    'claude-3-5-sonnet-20241022': (3, 15, 3.75, 0.3),
+    'claude-3-7-sonnet-20250219': (3, 15, 3.75, 0.3),
+    'claude-3-sonnet-20240229': (3, 15, 3.75, 0.3),
+    'claude-3-5-haiku-20241022': (0.8, 4, 1, 0.08),
+    'claude-3-haiku-20240307': (0.25, 1.25, 0.3, 0.03),
+    'gpt-4o': (2.5, 10, 0, 1.25),
+    'gpt-4o-mini': (0.15, 0.6, 0, 0.075),
+}
+MODEL_PRICES.update({name: tuple(price) for name, price in json.loads(os.getenv('LLM_PRICES', '{}')).items()})
+KRW_PER_USD = 1381
+
+
+def usage_tokens(usage):
+    # (input, output, cache read, cache write), input 에는 캐시된 토큰이 포함되지 않음
+    return (
+        getattr(usage, 'input_tokens', 0) or 0,
+        getattr(usage, 'output_tokens', 0) or 0,
+        getattr(usage, 'cache_read_input_tokens', 0) or 0,
+        getattr(usage, 'cache_creation_input_tokens', 0) or 0,
+    )
+
+
+def price_key(model):
+    # "us.anthropic.claude-3-haiku-20240307-v1:0" -> "claude-3-haiku-20240307"
+    name = re.sub(r'^([a-z]{2,4}\.)?anthropic\.', '', str(model or ''))
+    return re.sub(r'-v\d+(:\d+)?$', '', name)
+
+
+def usage_cost(model, input_tokens, output_tokens, cache_read_tokens=0, cache_write_tokens=0):
+    # KRW, 단가를 모르는 model 은 None (다른 model 단가로 추정하지 않음)
+    price = MODEL_PRICES.get(price_key(model))
+    if price is None:
+        return None
+    price_input, price_output, price_cache_write, price_cache_read = price
+    usd = (input_tokens * price_input + output_tokens * price_output
+           + cache_read_tokens * price_cache_read + cache_write_tokens * price_cache_write) / 1_000_000
+    return round(usd * KRW_PER_USD, 3)
+
+
+class LLMTimeoutError(Exception):
+    pass
+
+
+class LLMCancelledError(Exception):
+    pass
+
+
+class AsyncLLM:
+    def __init__(self, client, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT_SEC, rate_limiter=None):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # ratelimit.RateLimiter: pod 간 공유 RPM/TPM 제한 (동시 실행 슬롯을 잡기 전에 확인)
+        self.rate_limiter = rate_limiter
+        self.waiting = 0
+        self.in_flight = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def create(self, is_disconnected=None, timeout=None, **kwargs):
+        # is_disconnected: request.is_disconnected 처럼 연결 끊김을 알려주는 async 함수
+        timeout = self.timeout if timeout is None else timeout
+        call = asyncio.ensure_future(self._create(**kwargs))
+        try:
+            return await asyncio.wait_for(self._watch(call, is_disconnected), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f'Bedrock 생성 시간 초과 SEC:{timeout}')
+            raise LLMTimeoutError(f'LLM call exceeded {timeout}s')
+        finally:
+            # 시간 초과, 연결 끊김, 상위 태스크 취소 시 진행 중인 HTTP 요청도 함께 중단
+            call.cancel()
+
+    def stream(self, timeout=None, **kwargs):
+        # async with bedrock.stream(...) as stream: async for text in stream: ...
+        timeout = self.timeout if timeout is None else timeout
+        return LLMStream(self, timeout, kwargs)
+
+    async def _create(self, **kwargs):
+        kwargs = cache_request(kwargs)
+        reservation = await self.rate_limiter.acquire(kwargs) if self.rate_limiter else None
+        response = None
+        try:
+            await self._acquire()
+            try:
+                response = await self.client.messages.create(**kwargs)
+            finally:
+                self._release()
+        finally:
+            # 실패/취소되어도 예약한 토큰을 정산 (응답이 없으면 전부 반환)
+            if reservation is not None:
+                await self.rate_limiter.settle(reservation, getattr(response, 'usage', None))
+        return response
+
+    async def _acquire(self):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _watch(self, call, is_disconnected):
+        if is_disconnected is None:
+            return await call
+        while True:
+            done, _ = await asyncio.wait({call}, timeout=LLM_DISCONNECT_POLL_SEC)
+            if done:
+                return call.result()
+            if await is_disconnected():
+                logger.info('클라이언트 연결 끊김, Bedrock 생성 취소')
+                raise LLMCancelledError('client disconnected')
+
+    def stats(self):
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+        }
+
+
+class LLMStream:
+    # 생성된 텍스트 조각을 도착 순서대로 돌려주는 스트림. 전체 제한 시간은 대기열 대기와
+    # 모든 조각 수신을 합친 시간이고, 빠져나올 때(취소 포함) 동시 실행 슬롯과 HTTP 연결을 반납한다.
+    def __init__(self, llm, timeout, kwargs):
+        self.llm = llm
+        self.timeout = timeout
+        self.kwargs = cache_request(kwargs)
+        self.text = ''
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_input_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.first_token_sec = None
+        self._events = None
+        self._acquired = False
+        self._reservation = None
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        self._start = loop.time()
+        self._deadline = self._start + self.timeout
+        try:
+            if self.llm.rate_limiter is not None:
+                self._reservation = await self.llm.rate_limiter.acquire(
+                    self.kwargs, max_wait=min(self.llm.rate_limiter.max_wait, self._remaining()))
+            await asyncio.wait_for(self.llm._acquire(), self._remaining())
+            self._acquired = True
+            self._events = await asyncio.wait_for(
+                self.llm.client.messages.create(stream=True, **self.kwargs), self._remaining())
+        except asyncio.TimeoutError:
+            await self.__aexit__(None, None, None)
+            logger.error(f'Bedrock 스트림 시작 시간 초과 SEC:{self.timeout}')
+            raise LLMTimeoutError(f'LLM stream exceeded {self.timeout}s')
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if self._events is not None:
+                await self._events.close()
+        finally:
+            self._events = None
+            if self._acquired:
+                self._acquired = False
+                self.llm._release()
+            reservation, self._reservation = self._reservation, None
+            if reservation is not None:
+                await self.llm.rate_limiter.settle(reservation, self)
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        events = self._events.__aiter__()
+        while True:
+            try:
+                event = await asyncio.wait_for(events.__anext__(), self._remaining())
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                logger.error(f'Bedrock 스트림 시간 초과 SEC:{self.timeout}')
+                raise LLMTimeoutError(f'LLM stream exceeded {self.timeout}s')
+            if event.type == 'message_start':
+                usage = event.message.usage
+                self.input_tokens, _, self.cache_read_input_tokens, self.cache_creation_input_tokens = usage_tokens(usage)
+            elif event.type == 'content_block_delta' and event.delta.type == 'text_delta':
+                if self.first_token_sec is None:
+                    self.first_token_sec = asyncio.get_running_loop().time() - self._start
+                self.text += event.delta.text
+                yield event.delta.text
+            elif event.type == 'message_delta':
+                self.output_tokens = event.usage.output_tokens
+
+    def _remaining(self):
+        return max(self._deadline - asyncio.get_running_loop().time(), 0)
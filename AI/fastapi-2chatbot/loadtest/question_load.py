@@ -0,0 +1,271 @@
+# question2 앱 부하 테스트 (pod 하나가 감당하는 동시 면접 수 측정)
+# 자기소개서 -> chat N회 -> report 로 이어지는 면접 세션을 동시에 재생하고 endpoint 별 처리량과 p50/p95/p99 를 JSON 으로 출력
+# Bedrock 은 지연 시간/출력 토큰 분포를 설정할 수 있는 stub, Redis 는 fakeredis(또는 --redis-url), S3 는 메모리 stub 사용
+# 실행: python loadtest/question_load.py --sessions 50 --turns 5 --llm-latency-ms 800 [--output result.json]
+# 필요 패키지: requirements.txt + fakeredis, lupa (Redis Lua script)
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# question2 import 전에 필요한 설정 (외부 서비스로 나가지 않도록)
+for name, value in {
+    'OPEN_API_KEY': 'loadtest',
+    'AWS_REGION': 'ap-northeast-2',
+    'AWS_BEDROCK_REGION': 'us-east-1',
+    'SYSTEM_COVERLETTER': '자기소개서를 읽고 첫 면접 질문을 JSON {"question": ""} 으로 생성',
+    'SYSTEM_CHAT': '대답을 듣고 꼬리 질문을 JSON {"question": ""} 으로 생성',
+    'SYSTEM_REPORT': '면접 전체를 평가해 JSON 으로 Report 생성',
+    'OTEL_ENDPOINT_URL': 'http://127.0.0.1:4317',
+    'RATE_LIMIT_RPM': '0',
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def lognormal(mean, sigma):
+    # 평균이 mean 인 log-normal 표본 (sigma 는 log 공간 표준편차)
+    if mean <= 0:
+        return 0.0
+    return random.lognormvariate(math.log(mean) - sigma * sigma / 2, sigma)
+
+
+class StubBedrockMessages:
+    # 지연 시간 = 기본 지연(log-normal) + 출력 토큰 수 * 토큰당 시간, 응답 형식은 system prompt 로 구분
+    def __init__(self, latency_ms, latency_sigma, output_tokens, output_sigma, ms_per_token, error_rate):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.output_tokens = output_tokens
+        self.output_sigma = output_sigma
+        self.ms_per_token = ms_per_token
+        self.error_rate = error_rate
+        self.calls = 0
+
+    async def create(self, model, messages, max_tokens=1024, system=None, **kwargs):
+        import evaluation
+        import context
+
+        self.calls += 1
+        output_tokens = min(max_tokens, max(1, int(lognormal(self.output_tokens, self.output_sigma))))
+        delay_ms = lognormal(self.latency_ms, self.latency_sigma) + output_tokens * self.ms_per_token
+        await asyncio.sleep(delay_ms / 1000)
+        if random.random() < self.error_rate:
+            raise RuntimeError('stub bedrock error')
+
+        system_text = system if isinstance(system, str) or system is None else system[0]['text']
+        filler = '가' * output_tokens
+        if system_text == evaluation.SYSTEM_EVALUATION:
+            text = json.dumps({name: {'score': random.randint(40, 95), 'comment': filler[:40]}
+                               for name in evaluation.CRITERIA}, ensure_ascii=False)
+        elif system_text == evaluation.SYSTEM_REPORT_MERGE:
+            text = json.dumps({**{name: filler[:80] for name in evaluation.CRITERIA}, 'encouragement': '화이팅'},
+                              ensure_ascii=False)
+        elif system_text == context.SYSTEM_SUMMARY:
+            text = filler
+        elif system_text == os.environ['SYSTEM_REPORT']:
+            text = json.dumps({**{name: f'70%, {filler[:80]}' for name in evaluation.CRITERIA},
+                               'overall_score': '70', 'encouragement': '화이팅'}, ensure_ascii=False)
+        else:
+            text = json.dumps({'question': f'{filler} 질문입니다?'}, ensure_ascii=False)
+
+        input_tokens = sum(len(json.dumps(message['content'], ensure_ascii=False)) for message in messages) // 2
+        return SimpleNamespace(
+            model=model,
+            content=[SimpleNamespace(type='text', text=text)],
+            usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens),
+        )
+
+
+class StubBedrock:
+    def __init__(self, **kwargs):
+        self.messages = StubBedrockMessages(**kwargs)
+
+
+class MemoryS3:
+    # S3Storage 가 쓰는 boto3 S3 API 일부
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[(Bucket, Key)] = Body.encode() if isinstance(Body, str) else Body
+        return {}
+
+    def head_object(self, Bucket, Key):
+        body = self.objects[(Bucket, Key)]
+        return {'ETag': f'"{hash(body) & 0xffffffff:x}"', 'ContentLength': len(body)}
+
+    def get_object(self, Bucket, Key, **kwargs):
+        body = self.objects[(Bucket, Key)]
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return round(ordered[index] * 1000, 2)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client, endpoint, path, body):
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=body)
+            status = response.status_code
+        except Exception:
+            status = 'exception'
+            response = None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][str(status)] += 1
+        if status != 200:
+            self.errors[endpoint] += 1
+            return None
+        return response.json()
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'statuses': dict(self.statuses[endpoint]),
+                'throughput_rps': round(len(values) / elapsed, 3),
+                'p50_ms': percentile(values, 0.50),
+                'p95_ms': percentile(values, 0.95),
+                'p99_ms': percentile(values, 0.99),
+                'max_ms': round(max(values) * 1000, 2),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {'elapsed_sec': round(elapsed, 3), 'requests': total,
+                'throughput_rps': round(total / elapsed, 3), 'endpoints': endpoints}
+
+
+async def session(client, recorder, s3, index, args):
+    itv_no = f'loadtest-{index}-{random.getrandbits(32):08x}'
+    cover_key = f'{itv_no}/coverletter.txt'
+    s3.put_object(Bucket='loadtest', Key=cover_key, Body='자기소개서 ' + '나' * args.coverletter_chars)
+    result = await recorder.call(client, 'coverletter', '/question/coverletter', {
+        'coverletter_url': f's3://loadtest/{cover_key}', 'position': '백엔드 개발자', 'itv_no': itv_no})
+    if result is None:
+        return False
+    for turn in range(2, args.turns + 2):
+        await asyncio.sleep(lognormal(args.think_ms, 0.5) / 1000)
+        answer_key = f'{itv_no}/answer-{turn}.txt'
+        s3.put_object(Bucket='loadtest', Key=answer_key, Body='대답 ' + '다' * args.answer_chars)
+        result = await recorder.call(client, 'chat', '/question/chat', {
+            'answer_url': f's3://loadtest/{answer_key}', 'itv_no': itv_no, 'question_number': turn})
+        if result is None:
+            return False
+    result = await recorder.call(client, 'report', '/question/report', {
+        'itv_no': itv_no, 'question_number': args.turns + 1})
+    return result is not None
+
+
+async def run(args):
+    import httpx
+    import question2 as q
+
+    stub = StubBedrock(latency_ms=args.llm_latency_ms, latency_sigma=args.llm_latency_sigma,
+                       output_tokens=args.output_tokens, output_sigma=args.output_sigma,
+                       ms_per_token=args.ms_per_token, error_rate=args.llm_error_rate)
+    q.bedrock.client = stub
+    q.evaluator.llm.client = stub
+    q.context_manager.llm.client = stub
+
+    if args.redis_url:
+        from redis import asyncio as aioredis
+        redis_client = aioredis.from_url(args.redis_url, decode_responses=True)
+    else:
+        import fakeredis.aioredis
+        redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    for holder in (q.history_repository, q.document_parser, q.evaluator, q.singleflight,
+                   q.context_manager, q.rate_limiter, q.report_jobs, q.session_store):
+        holder.redis_client = redis_client
+    q.redis_pool.client = redis_client
+    q.redis_client = redis_client
+
+    s3 = MemoryS3()
+    q.s3_storage.client = s3
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    completed = 0
+
+    async def limited(index):
+        nonlocal completed
+        async with semaphore:
+            if await session(client, recorder, s3, index, args):
+                completed += 1
+
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=q.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=args.timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(i) for i in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+
+    result = recorder.summary(elapsed)
+    result.update({
+        'config': vars(args),
+        'sessions': {'started': args.sessions, 'completed': completed,
+                     'per_sec': round(completed / elapsed, 3)},
+        'llm_calls': stub.messages.calls,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=20, help='재생할 면접 세션 수')
+    parser.add_argument('--concurrency', type=int, default=20, help='동시에 진행하는 세션 수')
+    parser.add_argument('--turns', type=int, default=5, help='세션당 chat 횟수')
+    parser.add_argument('--think-ms', type=float, default=0, help='turn 사이 사용자 대기 시간 평균')
+    parser.add_argument('--coverletter-chars', type=int, default=3000)
+    parser.add_argument('--answer-chars', type=int, default=400)
+    parser.add_argument('--llm-latency-ms', type=float, default=800, help='stub LLM 기본 지연 평균')
+    parser.add_argument('--llm-latency-sigma', type=float, default=0.3)
+    parser.add_argument('--output-tokens', type=float, default=120, help='stub LLM 출력 토큰 평균')
+    parser.add_argument('--output-sigma', type=float, default=0.4)
+    parser.add_argument('--ms-per-token', type=float, default=10, help='출력 토큰당 생성 시간')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--redis-url', default=None, help='지정하지 않으면 fakeredis')
+    parser.add_argument('--timeout', type=float, default=180)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help='결과 JSON 파일 (없으면 stdout)')
+    args = parser.parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # 앱의 print/로그가 결과 JSON 과 섞이지 않도록 stderr 로
+    logging.disable(logging.WARNING)
+    with contextlib.redirect_stdout(sys.stderr):
+        result = asyncio.run(run(args))
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.stdout.flush()
+    # OTel exporter 가 없는 collector 로 재시도하며 종료를 막지 않도록 바로 종료
+    os._exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import logging
+
+from opentelemetry import metrics
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.sdk.resources import Resource
+
+from llm import usage_tokens, usage_cost
+
+logger = logging.getLogger(__name__)
+
+
+def otel_metrics_init(endpoint, export_interval_ms=15000):
+    # 로그와 같은 OTLP collector 로 metric 전송 (gRPC exporter 는 import 비용이 커서 설정할 때 import)
+    from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
+    reader = PeriodicExportingMetricReader(
+        OTLPMetricExporter(endpoint=endpoint),
+        export_interval_millis=export_interval_ms,
+    )
+    meter_provider = MeterProvider(resource=Resource.create({}), metric_readers=[reader])
+    metrics.set_meter_provider(meter_provider)
+    return meter_provider
+
+
+class LLMMetrics:
+    # LLM 호출별 지연 시간, 토큰, 비용 (endpoint, model, turn 속성)
+    # meter provider 설정 전에 만들어도 설정 이후 기록분부터 export 된다
+    def __init__(self, meter):
+        self.duration = meter.create_histogram(
+            'llm.generation.duration', unit='s', description='LLM 생성 요청 소요 시간')
+        self.first_token = meter.create_histogram(
+            'llm.generation.time_to_first_token', unit='s', description='Streaming 첫 토큰까지 걸린 시간')
+        self.input_tokens = meter.create_counter(
+            'llm.tokens.input', unit='{token}', description='캐시되지 않은 입력 토큰')
+        self.output_tokens = meter.create_counter(
+            'llm.tokens.output', unit='{token}', description='출력 토큰')
+        self.cached_tokens = meter.create_counter(
+            'llm.tokens.cached', unit='{token}', description='Prompt cache 읽기/쓰기 토큰 (cache 속성)')
+        self.cost = meter.create_counter(
+            'llm.cost', unit='KRW', description='model 별 토큰 단가 기준 예상 비용')
+        self.unpriced = meter.create_counter(
+            'llm.calls.unpriced', unit='{call}', description='단가를 몰라 비용을 계산하지 않은 호출')
+
+    def record(self, endpoint, model, usage, duration=None, turn=None, first_token_sec=None):
+        input_tokens, output_tokens, cache_read_tokens, cache_write_tokens = usage_tokens(usage)
+        cost = usage_cost(model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens)
+        attributes = {'endpoint': endpoint, 'model': model}
+        if turn is not None:
+            attributes['turn'] = str(turn)
+        try:
+            if duration is not None:
+                self.duration.record(duration, attributes)
+            if first_token_sec is not None:
+                self.first_token.record(first_token_sec, attributes)
+            self.input_tokens.add(input_tokens, attributes)
+            self.output_tokens.add(output_tokens, attributes)
+            self.cached_tokens.add(cache_read_tokens, {**attributes, 'cache': 'read'})
+            self.cached_tokens.add(cache_write_tokens, {**attributes, 'cache': 'write'})
+            if cost is not None:
+                self.cost.add(cost, attributes)
+            else:
+                self.unpriced.add(1, attributes)
+        except Exception as e:
+            # metric 기록 실패가 응답에 영향을 주지 않도록
+            logger.error(f'LLM metric 기록 실패: {e}')
+        return cost
+
+
+llm_metrics = LLMMetrics(metrics.get_meter(__name__))
+
+
+class SessionMetrics:
+    # Redis 에 남아 있는 면접 세션 전체 크기/수 (observable gauge, SessionStore 가 저장/정리 때 갱신한 마지막 값)
+    # 와 S3 보관 시점의 세션 크기 분포
+    def __init__(self, meter):
+        self.live_bytes = 0
+        self.live_sessions = 0
+        meter.create_observable_gauge(
+            'session.memory.live', callbacks=[self._observe_bytes], unit='By',
+            description='Redis 에 남아 있는 면접 세션 크기 합계 (field + value byte)')
+        meter.create_observable_gauge(
+            'session.count.live', callbacks=[self._observe_sessions], unit='{session}',
+            description='Redis 에 남아 있는 면접 세션 수')
+        self.archived_size = meter.create_histogram(
+            'session.archived.size', unit='By', description='S3 에 보관한 면접 세션 크기')
+
+    def _observe_bytes(self, options):
+        yield metrics.Observation(self.live_bytes)
+
+    def _observe_sessions(self, options):
+        yield metrics.Observation(self.live_sessions)
+
+    def record_live(self, live_bytes, live_sessions):
+        self.live_bytes = live_bytes
+        self.live_sessions = live_sessions
+
+    def record_archived(self, size):
+        try:
+            self.archived_size.record(size)
+        except Exception as e:
+            logger.error(f'세션 metric 기록 실패: {e}')
+
+
+session_metrics = SessionMetrics(metrics.get_meter(__name__))
+
+
+class RateLimitMetrics:
+    # Redis 오류로 RPM/TPM 제한을 확인하지 못하고 통과시킨 횟수 (model 속성)
+    def __init__(self, meter):
+        self.fail_open = meter.create_counter(
+            'ratelimit.fail_open', unit='{call}', description='Redis 오류로 제한 없이 통과시킨 rate limit 확인')
+
+    def record_fail_open(self, model):
+        try:
+            self.fail_open.add(1, {'model': model})
+        except Exception as e:
+            logger.error(f'rate limit metric 기록 실패: {e}')
+
+
+rate_limit_metrics = RateLimitMetrics(metrics.get_meter(__name__))
+
+
+class RedisPoolMetrics:
+    # Redis 연결 풀 사용량 (observable gauge, export 할 때 RedisPool.stats() 를 읽음)
+    def __init__(self, meter):
+        self.pools = []
+        for name, key, unit, description in (
+            ('redis.pool.in_use', 'in_use', '{connection}', '사용 중인 Redis 연결 수'),
+            ('redis.pool.idle', 'idle', '{connection}', '풀에서 쉬고 있는 Redis 연결 수'),
+            ('redis.pool.waiting', 'waiting', '{request}', 'Redis 연결을 기다리는 요청 수'),
+            ('redis.pool.utilization', 'utilization', '1', '최대 연결 수 대비 사용 중인 비율'),
+        ):
+            meter.create_observable_gauge(name, callbacks=[self._observer(key)], unit=unit, description=description)
+
+    def watch(self, pool):
+        self.pools.append(pool)
+
+    def _observer(self, key):
+        def observe(options):
+            for pool in self.pools:
+                try:
+                    value = pool.stats()[key]
+                except Exception as e:
+                    logger.error(f'Redis 풀 metric 읽기 실패: {e}')
+                    continue
+                yield metrics.Observation(value, {'host': str(pool.host)})
+        return observe
+
+
+redis_pool_metrics = RedisPoolMetrics(metrics.get_meter(__name__))
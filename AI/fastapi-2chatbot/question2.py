@@ -1,38 +1,40 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import asyncio
 from pydantic import BaseModel
-from openai import OpenAI
 from dotenv import load_dotenv
 import logging
-import io
-from PyPDF2 import PdfReader
-from docx import Document
-from llama_index.readers.file import HWPReader
-import boto3
 import json
-import redis
-from anthropic import AnthropicBedrock
+from llm import AsyncLLM, LLMTimeoutError, LLMCancelledError, usage_tokens
+from streaming import JSONFieldStream, sse_event
+from history import HistoryRepository
+from conversation import system_prompt
+from redis_pool import RedisPool
+from documents import DocumentParser, parse_s3_url
+import backends
+from s3 import S3Storage, ObjectTooLargeError
+from evaluation import AnswerEvaluator
+from metrics import otel_metrics_init, llm_metrics
+from structured import StructuredOutput, QuestionOutput, ReportOutput
+from singleflight import SingleFlight, FallbackResult, flight_key
+from context import ContextManager
+from router import build_router
+from ratelimit import RateLimiter, RateLimitExceededError, retry_after_header
+from jobs import ReportJobQueue
+from sessions import SessionStore
 from datetime import datetime
 
-from opentelemetry import trace
+from boot import BootState, FAST_BOOT
+
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-
-from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
 from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler 
 from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
 from opentelemetry.instrumentation.logging import LoggingInstrumentor
-from opentelemetry._logs import (
-    SeverityNumber,
-    get_logger,
-    get_logger_provider,
-    std_to_otel,
-    set_logger_provider
-)
+from opentelemetry._logs import set_logger_provider
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(os.path.join(BASE_DIR, ".env"))
@@ -57,6 +59,8 @@ def otel_logging_init():
     # default = WARNING
     
     # ------------ Opentelemetry loging initialization
+    # gRPC exporter 는 import 비용이 커서 설정할 때 import (FAST_BOOT 에서는 lifespan 에서 실행)
+    from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
     logger_provider = LoggerProvider(
         resource=Resource.create({})
     )
@@ -69,7 +73,48 @@ def otel_logging_init():
     otel_log_handler.setFormatter(logFormatter)
     logging.getLogger().addHandler(otel_log_handler)
 
-app = FastAPI()
+def otel_init():
+    otel_logging_init()
+    otel_metrics_init(otel_endpoint_url)
+
+def warmup_steps():
+    # 동시에 실행할 기동 준비 단계 (SDK import + client 생성, Redis 연결 확인, 추출 worker 예열)
+    steps = {
+        'redis': redis_pool.start,
+        's3': lambda: s3_storage.client,
+        'bedrock': bedrock_client.get,
+        'openai': stt_client.get,
+        'extraction': extraction_pool.warm,
+    }
+    if FAST_BOOT:
+        steps['otel'] = otel_init
+    return steps
+
+async def warm_up():
+    await boot_state.run(warmup_steps())
+    report_jobs.start()
+    session_store.start()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup = None
+    if FAST_BOOT:
+        # 준비를 기다리지 않고 먼저 요청을 받을 수 있게 하고, readiness 는 준비가 끝난 뒤 true
+        warmup = asyncio.create_task(warm_up())
+    else:
+        await warm_up()
+    yield
+    if warmup is not None:
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+    await boot_state.stop()
+    await report_jobs.stop()
+    await session_store.stop()
+    extraction_pool.shutdown()
+    s3_storage.close()
+    await redis_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -79,7 +124,9 @@ app.add_middleware(
 )
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-otel_logging_init()
+boot_state = BootState()
+if not FAST_BOOT:
+    otel_init()
 
 
 # 환경 변수 가져오기
@@ -93,32 +140,107 @@ AWS_BEDROCK_REGION = os.getenv('AWS_BEDROCK_REGION')
 SYSTEM_COVERLETTER = os.getenv('SYSTEM_COVERLETTER')
 SYSTEM_CHAT = os.getenv('SYSTEM_CHAT')
 SYSTEM_REPORT = os.getenv('SYSTEM_REPORT')
+BEDROCK_MODEL_ID = os.getenv('BEDROCK_MODEL_ID', "anthropic.claude-3-5-sonnet-20240620-v1:0")
 AWS_ELASTICACHE_REDIS_ENDPOINT = os.getenv('AWS_ELASTICACHE_REDIS_ENDPOINT')
 AWS_ELASTICACHE_REDIS_USER = os.getenv('AWS_ELASTICACHE_REDIS_USER')
 AWS_ELASTICACHE_REDIS_PASSWORD = os.getenv('AWS_ELASTICACHE_REDIS_PASSWORD')
+# Whisper 업로드 제한 (25MB)
+STT_MAX_BYTES = int(os.getenv('STT_MAX_BYTES', str(25 * 1024 * 1024)))
 
-client = OpenAI(
-    api_key = OPEN_API_KEY
-)
+# /question/answer 의 Whisper STT, LLM router 의 openai provider 용 (openai SDK 는 처음 호출할 때 import)
+stt_client = backends.openai_client(OPEN_API_KEY)
 
 assistant_id = ASSISTANT_ID
 chatbot_assistant_id = CHATBOT_ASSISTANT_ID
 
-s3_client = boto3.client(
-    's3',
+# 연결 풀 크기에 맞춘 S3 접근 (client 는 처음 쓸 때 생성, 크기 확인 후 chunk 단위로 읽기)
+s3_storage = S3Storage(
+    region_name= AWS_REGION,
     aws_access_key_id= AWS_ACCESS_KEY_ID,
     aws_secret_access_key= AWS_SECRET_ACCESS_KEY,
-    region_name= AWS_REGION
-)
-
-bedrock_client = AnthropicBedrock(
-    aws_access_key= AWS_ACCESS_KEY_ID,
-    aws_secret_key= AWS_SECRET_ACCESS_KEY,
-    aws_region= AWS_BEDROCK_REGION,
 )
 
 # redis_client = redis.Redis(host='192.168.56.200', port=6379, decode_responses=True)
-redis_client = redis.Redis(host=AWS_ELASTICACHE_REDIS_ENDPOINT, port=6379, ssl=True, decode_responses=True, username=AWS_ELASTICACHE_REDIS_USER, password=AWS_ELASTICACHE_REDIS_PASSWORD)
+# asyncio 클라이언트 + 크기 제한 연결 풀, 연결 확인/종료는 lifespan 에서
+redis_pool = RedisPool(host=AWS_ELASTICACHE_REDIS_ENDPOINT, port=6379, ssl=True, username=AWS_ELASTICACHE_REDIS_USER, password=AWS_ELASTICACHE_REDIS_PASSWORD)
+redis_client = redis_pool.client
+history_repository = HistoryRepository(redis_client)
+# 모든 replica 가 Redis 에서 나눠 쓰는 model 별 Bedrock RPM/TPM 제한
+rate_limiter = RateLimiter(redis_client)
+
+# LLM_BACKEND 로 고른 Bedrock client (anthropic SDK 또는 boto3 bedrock-runtime, 처음 호출할 때 생성)
+bedrock_client = backends.llm_client(AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_BEDROCK_REGION)
+# event loop를 막지 않는 Bedrock 호출 (동시 실행 수 제한, 요청별 timeout, 연결 끊김 시 취소)
+bedrock = AsyncLLM(bedrock_client, rate_limiter=rate_limiter)
+# 질문/Report 생성은 provider 별 지연 시간/오류율을 보고 빠른 쪽으로 (LLM_PROVIDERS, p95 초과 시 hedge)
+llm_router = build_router(bedrock, BEDROCK_MODEL_ID, stt_client)
+
+# PARSER_BACKEND: process(별도 프로세스 풀) 또는 inline
+extraction_pool = backends.extraction_pool()
+document_parser = DocumentParser(s3_storage, redis_client, extraction_pool)
+# 면접 세션(itv_no 해시) 수명: 저장할 때마다 TTL 갱신 + byte 정산, Report 완료 후 S3 보관 (SESSION_ARCHIVE_BUCKET)
+session_store = SessionStore(redis_client, s3_storage)
+# 답변별 평가 (답변 저장 시 백그라운드 실행, Report 에서 병합)
+evaluator = AnswerEvaluator(bedrock_client, redis_client, sessions=session_store, rate_limiter=rate_limiter)
+# 응답 JSON -> schema (로컬 복구, 깨진 부분만 재요청)
+structured = StructuredOutput(bedrock)
+# 재시도된 중복 생성 요청 합치기 (itv_no, turn, 요청 내용 기준)
+singleflight = SingleFlight(redis_client)
+# 긴 면접의 질문 생성 prompt 를 토큰 예산 안으로 (오래된 turn 은 요약)
+context_manager = ContextManager(bedrock_client, redis_client, sessions=session_store, rate_limiter=rate_limiter)
+# 비동기 Report job (Redis queue + worker pool) 과 완료 Report 캐시
+# Report 를 만들지 못했을 때의 응답 (job 은 done 이 아닌 no_report 상태로 끝남)
+NO_REPORT_RESPONSE = {'response': 'noanswer'}
+report_jobs = ReportJobQueue(redis_client, lambda itv_no, question_number: generate_report(itv_no, question_number),
+                             is_empty=lambda report: report == NO_REPORT_RESPONSE)
+REPORT_EVENTS_POLL_SEC = float(os.getenv('REPORT_EVENTS_POLL_SEC', '0.5'))
+
+@app.exception_handler(LLMTimeoutError)
+async def llm_timeout_handler(request: Request, exc: LLMTimeoutError):
+    return JSONResponse(status_code=504, content={'response': 'timeout'})
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_handler(request: Request, exc: RateLimitExceededError):
+    # 제한 시간 안에 차례가 오지 않을 요청은 기다리지 않고 바로 거절
+    return JSONResponse(status_code=429, content={'response': 'rate limited'}, headers=retry_after_header(exc))
+
+@app.exception_handler(LLMCancelledError)
+async def llm_cancelled_handler(request: Request, exc: LLMCancelledError):
+    # 클라이언트가 이미 연결을 끊었으므로 응답은 전달되지 않음
+    return JSONResponse(status_code=499, content={'response': 'cancelled'})
+
+@app.get("/question/ready", status_code=200)
+async def ready():
+    # readiness: 기동 준비(client 생성, Redis 연결, worker 예열)가 모두 끝나야 200
+    return JSONResponse(status_code=200 if boot_state.ready else 503, content=boot_state.stats())
+
+@app.get("/question/health", status_code=200)
+async def health():
+    redis_ok = await redis_pool.ping()
+    return JSONResponse(
+        status_code=200 if redis_ok else 503,
+        content={
+            'redis': bool(redis_ok),
+            'redis_pool': redis_pool.stats(),
+            'bedrock': bedrock.stats(),
+            'router': llm_router.stats(),
+            'rate_limit': rate_limiter.stats(),
+            'report_jobs': await report_jobs.stats(),
+            'sessions': session_store.stats(),
+            'boot': boot_state.stats(),
+            'backends': backends.stats(),
+            'documents': document_parser.stats(),
+            's3': s3_storage.stats(),
+            'evaluation': evaluator.stats(),
+            'structured': structured.stats(),
+            'singleflight': singleflight.stats(),
+            'context': context_manager.stats(),
+        },
+    )
+
+@app.exception_handler(ObjectTooLargeError)
+async def object_too_large_handler(request: Request, exc: ObjectTooLargeError):
+    return JSONResponse(status_code=413, content={'response': 'file too large'})
 
 class coverletterItem(BaseModel):
     coverletter_url: str
@@ -131,132 +253,83 @@ class chatItem(BaseModel):
 class reportItem(BaseModel):
     itv_no: str
     question_number: int
+class answerItem(BaseModel):
+    audio_url: str
+    user_uuid: str
+    itv_cnt: str
+    itv_no: str
+    question_number: int
+
+# 응답과 무관하게 끝까지 실행할 작업 (GC 되지 않도록 참조 유지)
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def log_bedrock_usage(usage, endpoint, elapsed_time=None, turn=None, first_token_sec=None, model=BEDROCK_MODEL_ID):
+    # 로그와 함께 OTel metric(지연 시간, 토큰, 비용) 기록
+    input_tokens, output_tokens, cache_read_tokens, cache_write_tokens = usage_tokens(usage)
+    cost = llm_metrics.record(
+        endpoint, model, usage,
+        duration=elapsed_time.total_seconds() if elapsed_time is not None else None,
+        turn=turn, first_token_sec=first_token_sec,
+    )
+    logger.info(f'Bedrock cost:{cost}')
+    logger.info(f'Bedrock cache read:{cache_read_tokens} write:{cache_write_tokens} input:{input_tokens} output:{output_tokens}')
 
 async def store_history_redis(hash_name,field,value):
     try:
-        # 질문 데이터를 JSON 문자열로 변환
-        value_json = json.dumps(value)
+        # 질문 데이터를 JSON 문자열로 변환 (한글을 \uXXXX 로 바꾸지 않아 저장 크기를 줄임)
+        value_json = json.dumps(value, ensure_ascii=False)
         
-        # Redis 리스트에 데이터 추가
-        redis_client.hset(hash_name,field,value_json)
+        # 세션 해시에 저장하면서 TTL 갱신 + 세션 크기 정산
+        await session_store.store(hash_name,field,value_json)
 
-        print("Data successfully stored in Redis.")
+        logger.debug(f'Redis 저장 itv_no: {hash_name} {field}')
     except Exception as e:
-        print(f"Error storing data in Redis: {e}")
+        logger.error(f'Redis 저장 실패 itv_no: {hash_name} {field}: {e}')
 
 async def get_history_redis(hash_name,field):
     try:
         # HGET 명령어를 사용하여 데이터 가져오기
-        value = redis_client.hget(hash_name, field)
+        value = await redis_client.hget(hash_name, field)
         
         if value:
             # 값이 JSON 문자열이면 파이썬 객체로 변환
-            value = json.loads(value.decode('utf-8'))
+            value = json.loads(value)
             return value
         else:
-            print(f"No data found in Redis for {hash_name} -> {field}")
+            logger.info(f'Redis 데이터 없음 itv_no: {hash_name} {field}')
             return None
     except Exception as e:
-        print(f"Error retrieving data from Redis: {e}")
+        logger.error(f'Redis 조회 실패 itv_no: {hash_name} {field}: {e}')
         return None
     
 async def getall_history_redis(hash_name):
     try:
         # HGETALL 명령어를 사용하여 데이터 가져오기
-        value = redis_client.hgetall(hash_name)
+        value = await redis_client.hgetall(hash_name)
         
         if value:
             # 값이 JSON 문자열이면 파이썬 객체로 변환
-            decoded_value = {k.decode('utf-8'): json.loads(v.decode('utf-8')) for k, v in value.items()}
+            decoded_value = {k: json.loads(v) for k, v in value.items()}
             return decoded_value
         else:
-            print(f"No data found in Redis for {hash_name}")
+            logger.info(f'Redis 데이터 없음 itv_no: {hash_name}')
             return None
     except Exception as e:
-        print(f"Error retrieving data from Redis: {e}")
+        logger.error(f'Redis 조회 실패 itv_no: {hash_name}: {e}')
         return None
-async def parsing(url):
-    async def extract_text_from_pdf(pdf_content):
-        try:
-            pdf_reader = PdfReader(io.BytesIO(pdf_content))
-            text = ''
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            return text
-        except:
-            logging.error('PDF File Parsing Error')
-            return ''
-    
-    async def extract_text_from_docx(docx_content):
-        try:
-            doc = Document(io.BytesIO(docx_content))
-            text = ''
-            for para in doc.paragraphs:
-                text += para.text
-            return text
-        except:
-            logging.error('DOCX File Parsing Error')
-            return ''
-    
-    async def extract_text_from_txt(txt_content):
-        try:
-            return txt_content.decode('utf-8')
-        except:
-            logging.error('TXT File Parsing Error')
-            return ''
-    
-    # async def extract_text_from_hwp(file_url):
-    #     reader = HWPReader()
-    #     documents = reader.load_data(file=file_url)
-    #     return documents[0].text
-        
-    async def extract_text_from_hwp(hwp_content):
-        doc = HWPReader()
-        encoded_text = ''
-        for para in doc.load_data(hwp_content).values():
-            encoded_text += para
-        decoded_text = encoded_text.decode('utf-16')
-        return decoded_text
-
-    async def parse_s3_url(url):
-        if url.startswith('s3://'):
-            url = url[5:]  # "s3://" 부분 제거
-            parts = url.split('/', 1) # 한 번만 분할
-            bucket_name = parts[0]
-            key = parts[1] if len(parts) > 1 else ''
-        else:
-            logging.error('Unsupported URL format')
-            raise ValueError('Unsupported URL format')      
-        return bucket_name, key
-    
-    bucket_name, key = await parse_s3_url(url)
-    file_obj = s3_client.get_object(Bucket=bucket_name, Key=key)
-    file_content = file_obj["Body"].read().strip()
-
-    if key.endswith('.pdf'):
-        logger.info('PDF Parsing')
-        text = await extract_text_from_pdf(file_content)
-    elif key.endswith('.docx'):
-        logger.info('DOCX Parsing')
-        text = await extract_text_from_docx(file_content)
-    elif key.endswith('.txt'):
-        logger.info('TXT Parsing')
-        text = await extract_text_from_txt(file_content)
-    elif key.endswith('.hwp'):
-        file_name = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".hwp"
-        bucket = bucket_name
-        key = key
-        s3_client.download_file(bucket, key, file_name)
-        text = await extract_text_from_hwp(file_name)
-        os.remove(file_name)
-    else:
-        logging.error('Unsupported file type')
-        raise ValueError('Unsupported file type')
-    return text
+async def parsing(url, budget=True):
+    # S3 문서를 텍스트로 변환 (추출 결과는 ETag 기준으로 LRU/Redis 캐시)
+    # 답변 STT 결과는 budget=False (자기소개서용 문서 예산으로 자르지 않고 전체를 평가/질문 생성에 사용)
+    return await document_parser.parse(url, budget)
 
 @app.post("/question/coverletter", status_code=200)
-async def coverletter(item: coverletterItem):
-    start_time1 = datetime.now()
+async def coverletter(item: coverletterItem, request: Request):
     coverletter_url = item.coverletter_url
     position = item.position
     itv_no = item.itv_no
@@ -264,7 +337,15 @@ async def coverletter(item: coverletterItem):
   
     if not coverletter_url :
         return {'response': 'coverletter_urls are missing'}
-    print(coverletter_url)
+    # 같은 자기소개서로 재시도된 요청은 진행 중인 생성에 합류하거나 저장된 결과를 받음
+    return await singleflight.run(
+        flight_key(itv_no, 'coverletter', 1, coverletter_url, position),
+        lambda is_disconnected: create_first_question(coverletter_url, position, itv_no, is_disconnected),
+        request.is_disconnected,
+    )
+
+async def create_first_question(coverletter_url, position, itv_no, is_disconnected=None):
+    start_time1 = datetime.now()
     logger.info(f'자기소개서 URL: {coverletter_url}, 직무: {position}')
     coverletter_text = await parsing(coverletter_url)
     end_time1 = datetime.now()
@@ -274,11 +355,11 @@ async def coverletter(item: coverletterItem):
 
     prompt = f"자기소개서: {coverletter_text}\n직무: {position}"
     start_time = datetime.now()
-    message = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
+    message = await llm_router.create(
+        is_disconnected=is_disconnected,
         max_tokens=4096,
         temperature=1,
-        system= SYSTEM_COVERLETTER,
+        system= system_prompt(SYSTEM_COVERLETTER),
         messages=[
             {
                 "role": "user",
@@ -291,30 +372,20 @@ async def coverletter(item: coverletterItem):
             }
         ]
     )
-    message_content = message.content[0].text
-    start_index = message_content.find('{')
-    end_index = message_content.rfind('}') + 1
-    response1_text = message_content[start_index:end_index]
+    response1_text = message.content[0].text
     
     end_time = datetime.now()
     elapsed_time = end_time - start_time
     logger.info(f'Bedrock 첫 질문 생성 SEC:{elapsed_time.total_seconds()}')
-    input_tokens = message.usage.input_tokens
-    output_tokens = message.usage.output_tokens
-    cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-    logger.info(f'Bedrock cost:{cost}')
-    print("Response Text:", response1_text)
+    log_bedrock_usage(message.usage, 'coverletter', elapsed_time, turn=1, model=getattr(message, 'model', BEDROCK_MODEL_ID))
+    logger.debug(f'Bedrock 응답: {response1_text}')
 
-    try:
-        response = json.loads(response1_text).get("question")
+    parsed = await structured.parse(QuestionOutput, response1_text, is_disconnected)
+    response = parsed.question if parsed else None
+    if response:
         await store_history_redis(itv_no,"coverletter",prompt)
         await store_history_redis(itv_no,"question-1",response)
-        print("Response:", response)
-
-    except json.JSONDecodeError as e:
-        logging.error('JSONDecodeError')
-        print("JSONDecodeError:", e)
-        response = None
+        logger.debug(f'첫 질문: {response}')
 
     if response:
         # tts, question = self.extract_question(response)
@@ -323,1408 +394,327 @@ async def coverletter(item: coverletterItem):
         coverletter = await get_history_redis(itv_no,"coverletter")
         initial_question = await get_history_redis(itv_no,"question-1")
         
-        print("Complete history from Redis:")
-        print(coverletter)
-        print(initial_question)
+        logger.debug(f'Redis 저장 확인 자기소개서: {coverletter}')
         logger.info(f'질문 생성 후 Redis 업데이트 SEC:{elapsed_time.total_seconds()}')
         logger.info(f'첫 질문: {initial_question}')
         return {'response': response}
     else:
         logger.error('질문 생성 실패')
-        return {'response': response1_text}
+        # 원문을 그대로 응답하되 single-flight 결과로 저장하지 않음
+        raise FallbackResult({'response': response1_text})
+
+async def prepare_chat(answer_text, itv_no, question_number):
+    await store_history_redis(itv_no,f"answer-{question_number-1}",answer_text)
+    logger.info('Redis 저장 완료')
+    logger.debug(f'답변: {answer_text}')
+    # 자기소개서와 이전 질문/답변을 한 번에 조회
+    history = await history_repository.load(itv_no, question_number - 1)
+    logger.info('이전 질문 및 답변 Redis에서 GET 완료')
+    # 방금 저장한 답변은 다음 질문 생성과 별개로 바로 평가 시작 (Report 에서는 병합만)
+    if history.turns:
+        evaluator.schedule(itv_no, question_number - 1, history.turns[-1].question, answer_text)
+    return history
 
 @app.post("/question/chat", status_code=200)
-async def chat(item: chatItem):
+async def chat(item: chatItem, request: Request):
     answer_url = item.answer_url
     itv_no = item.itv_no
     question_number = item.question_number 
     logger.info(f'질문 생성 API 호출 itv_no: {itv_no}')
-    
-    answer_text = await parsing(answer_url)
-    logger.info('STT File Parsing 완료')
-
-    # 질문과 답변 저장을 위한 리스트 초기화
-    questions = []
-    answers = []
-    await store_history_redis(itv_no,f"answer-{question_number-1}",answer_text)
-    logger.info('Redis 저장 완료')
-    print(answer_text)
-    # 반복문을 사용하여 질문과 답변 생성
-    cover_letter = await get_history_redis(itv_no, "coverletter")
 
-    for i in range(1, question_number):
-        question = await get_history_redis(itv_no, f"question-{i}")
-        answer = await get_history_redis(itv_no, f"answer-{i}")
-        questions.append(question)
-        answers.append(answer)
-
-        prompt = f"대답: {answer_text}"
-    logger.info('이전 질문 및 답변 Redis에서 GET 완료')
+    async def run(is_disconnected):
+        answer_text = await parsing(answer_url, budget=False)
+        logger.info('STT File Parsing 완료')
+        return await generate_question(itv_no, question_number, answer_text, is_disconnected)
+    # 같은 답변으로 재시도된 요청은 진행 중인 생성에 합류하거나 저장된 결과를 받음
+    return await singleflight.run(flight_key(itv_no, 'chat', question_number, answer_url), run, request.is_disconnected)
+
+async def generate_question(itv_no, question_number, answer_text, is_disconnected=None, endpoint='chat'):
+    # 이번 대답을 History 에 저장하고 다음 질문 생성 (/question/chat, /question/answer 공용, 생성 실패는 FallbackResult)
+    history = await prepare_chat(answer_text, itv_no, question_number)
+    prompt = f"대답: {answer_text}"
+    messages = await context_manager.build(history, prompt, SYSTEM_CHAT)
     
     ## 꼬리 질문 생성
     start_time = datetime.now()
-    if question_number ==2:
-        response2 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
+    message = await llm_router.create(
+        is_disconnected=is_disconnected,
         max_tokens=4096,
         temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
+        system= system_prompt(SYSTEM_CHAT),
+        messages=messages,
     )
-        print(response2)
-        message_content = response2.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response2_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response2.usage.input_tokens
-        output_tokens = response2.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost:{cost}')
+    logger.debug(f'Bedrock 응답: {message}')
+    response_text = message.content[0].text
+    
+    end_time = datetime.now()
+    elapsed_time = end_time - start_time
+    logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
+    log_bedrock_usage(message.usage, endpoint, elapsed_time, turn=question_number, model=getattr(message, 'model', BEDROCK_MODEL_ID))
 
+    logger.debug(f'Bedrock 응답 text: {response_text}')
+    parsed = await structured.parse(QuestionOutput, response_text, is_disconnected)
+    response = parsed.question if parsed else None
+    
+    await store_history_redis(itv_no,f"question-{question_number}",response)
 
-        print("Response Text:", response2_text)
-        try:
-            response = json.loads(response2_text).get("question")
-            # print("Response:", response)
+    if response:
+        # tts, question = self.extract_question(response)
+        logger.info(f'질문: {response}')
+        return {'response': response}
+    else:
+        logger.error('질문 생성 실패')
+        raise FallbackResult({'response': response_text})
 
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
+async def transcribe(audio_url):
+    # S3 음성 파일을 spooled 임시 파일로 받아 바로 Whisper 로 전달 (작으면 메모리, 크면 디스크)
+    bucket_name, key = parse_s3_url(audio_url)
+    audio = await s3_storage.spooled(bucket_name, key, STT_MAX_BYTES)
+    try:
+        transcript = await stt_client.audio.transcriptions.create(
+            model="whisper-1",
+            file=(os.path.basename(key), audio),
+            response_format="text"
+        )
+    finally:
+        audio.close()
+    return bucket_name, transcript
+
+async def store_transcript(bucket_name, key, transcript):
+    try:
+        await s3_storage.put(bucket_name, key, transcript)
+        logger.info(f'STT 결과 S3 저장 완료: {key}')
+    except Exception as e:
+        logger.error(f'STT 결과 S3 저장 실패: {key}: {e}')
 
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response2_text}
-        
-    elif question_number == 3:
-        response3 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
+@app.post("/question/answer", status_code=200)
+async def answer(item: answerItem, request: Request):
+    # 음성 S3 경로 -> STT -> History 저장 -> 다음 질문 생성을 한 번에 처리
+    # (/speech/stt 로 텍스트를 S3에 올리고 /question/chat 에서 다시 내려받던 왕복 제거)
+    itv_no = item.itv_no
+    question_number = item.question_number
+    logger.info(f'답변 처리 API 호출 itv_no: {itv_no}')
+    return await singleflight.run(
+        flight_key(itv_no, 'answer', question_number, item.audio_url),
+        lambda is_disconnected: process_answer(item, is_disconnected),
+        request.is_disconnected,
     )
-        print(response3)
-        message_content = response3.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response3_text = message_content[start_index:end_index]
-        
+
+async def process_answer(item, is_disconnected=None):
+    itv_no = item.itv_no
+    question_number = item.question_number
+    start_time = datetime.now()
+    bucket_name, answer_text = await transcribe(item.audio_url)
+    end_time = datetime.now()
+    elapsed_time = end_time - start_time
+    logger.info(f'STT SEC:{elapsed_time.total_seconds()}')
+
+    # 텍스트 원본은 /speech/stt 와 같은 경로 규칙으로 백그라운드 저장
+    date_file = str(start_time.timestamp()).replace('.','')
+    transcript_key = f'{item.user_uuid}/{item.itv_cnt}/{date_file}.txt'
+    run_in_background(store_transcript(bucket_name, transcript_key, answer_text))
+
+    try:
+        result = await generate_question(itv_no, question_number, answer_text, is_disconnected, 'answer')
+    except FallbackResult as e:
+        e.result['s3_file_path'] = f's3://{bucket_name}/{transcript_key}'
+        raise
+    result['s3_file_path'] = f's3://{bucket_name}/{transcript_key}'
+    return result
+
+@app.post("/question/chat/stream", status_code=200)
+async def chat_stream(item: chatItem):
+    # /question/chat 과 같은 입력으로, 생성되는 question 값을 SSE(delta 이벤트)로 바로 흘려보냄
+    answer_url = item.answer_url
+    itv_no = item.itv_no
+    question_number = item.question_number
+    logger.info(f'질문 생성 Stream API 호출 itv_no: {itv_no}')
+
+    answer_text = await parsing(answer_url, budget=False)
+    logger.info('STT File Parsing 완료')
+    history = await prepare_chat(answer_text, itv_no, question_number)
+    prompt = f"대답: {answer_text}"
+    messages = await context_manager.build(history, prompt, SYSTEM_CHAT)
+
+    async def events():
+        start_time = datetime.now()
+        extractor = JSONFieldStream("question")
+        try:
+            async with bedrock.stream(
+                model=BEDROCK_MODEL_ID,
+                max_tokens=4096,
+                temperature=1,
+                system= system_prompt(SYSTEM_CHAT),
+                messages=messages,
+            ) as stream:
+                async for text in stream:
+                    delta = extractor.feed(text)
+                    if delta:
+                        yield sse_event("delta", {"text": delta})
+        except LLMTimeoutError:
+            yield sse_event("error", {"response": "timeout"})
+            return
+        except RateLimitExceededError as e:
+            yield sse_event("error", {"response": "rate limited", "retry_after": e.retry_after})
+            return
+
         end_time = datetime.now()
         elapsed_time = end_time - start_time
+        logger.info(f'Bedrock 질문 생성 첫 토큰 SEC:{stream.first_token_sec}')
         logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        
-        try:
-            response = json.loads(response3_text).get("question")
-            # print("Response:", response)
+        log_bedrock_usage(stream, 'chat_stream', elapsed_time, turn=question_number, first_token_sec=stream.first_token_sec)
 
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
+        message_content = stream.text
+        if extractor.done:
+            # 이미 흘려보낸 값과 같아야 하므로 재요청 없이 스트림에서 읽은 값 사용
+            response = extractor.value
+        else:
+            parsed = await structured.parse(QuestionOutput, message_content)
+            response = parsed.question if parsed else None
 
+        await store_history_redis(itv_no,f"question-{question_number}",response)
         if response:
-            # tts, question = self.extract_question(response)
             logger.info(f'질문: {response}')
-            return {'response': response}
+            yield sse_event("done", {"response": response})
         else:
             logger.error('질문 생성 실패')
-            return {'response': response3_text}
+            yield sse_event("done", {"response": message_content})
 
-    elif question_number == 4:
-        response4 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-        print(response4)
-        message_content = response4.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response4_text = message_content[start_index:end_index]
 
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response4.usage.input_tokens
-        output_tokens = response4.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost :{cost}')
-        
-        try:
-            response = json.loads(response4_text).get("question")
-            # print("Response:", response)
+@app.post("/question/report", status_code=200)
+async def report(item: reportItem, request: Request):
+    itv_no = item.itv_no
+    question_number = int(item.question_number)
+    
+    logger.info( f'Report API 호출 itv_no: {itv_no}')
+    # combined_history =  await getall_history_redis(itv_no)
+    logger.debug(f'Report 요청 itv_no: {itv_no}, question_number: {question_number}')
+    # prompt = f"대답: {combined_history}"
+    # 질문과 답변 저장을 위한 리스트 초기화
+    # 같은 면접의 완료된 Report 는 다시 생성하지 않음
+    cached = await report_jobs.get_cached(itv_no, question_number)
+    if cached is not None:
+        logger.info(f'Report 캐시 적중 itv_no: {itv_no}')
+        return cached
+    return await generate_report(itv_no, question_number, request.is_disconnected)
+
+@app.post("/question/report/jobs", status_code=202)
+async def report_job(item: reportItem):
+    # 긴 Report 생성을 HTTP 연결과 분리: job id 를 바로 반환하고 worker 가 queue 에서 꺼내 생성
+    job = await report_jobs.submit(item.itv_no, int(item.question_number))
+    logger.info(f'Report job API 호출 itv_no: {item.itv_no} job: {job["job_id"]} {job["status"]}')
+    return job
+
+@app.get("/question/sessions/{itv_no}", status_code=200)
+async def session_status(itv_no: str):
+    # 면접 세션의 저장 크기(byte)와 남은 TTL
+    session = await session_store.describe(itv_no)
+    if not session['exists']:
+        return JSONResponse(status_code=404, content=session)
+    return session
+
+@app.get("/question/report/jobs/{job_id}", status_code=200)
+async def report_job_status(job_id: str):
+    job = await report_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={'response': 'job not found'})
+    return job
+
+@app.get("/question/report/jobs/{job_id}/events", status_code=200)
+async def report_job_events(job_id: str, request: Request):
+    # 상태가 바뀔 때마다 status 이벤트, 끝나면 done(결과), no_report(Report 생성 실패) 또는 error 이벤트
+    async def events():
+        status = None
+        while not await request.is_disconnected():
+            job = await report_jobs.get(job_id)
+            if job is None:
+                yield sse_event("error", {"response": "job not found"})
+                return
+            if job['status'] != status:
+                status = job['status']
+                yield sse_event("status", {"status": status})
+            if status == 'done':
+                yield sse_event("done", job['result'])
+                return
+            if status == 'no_report':
+                yield sse_event("no_report", job['result'])
+                return
+            if status == 'failed':
+                yield sse_event("error", {"response": job.get('error')})
+                return
+            await asyncio.sleep(REPORT_EVENTS_POLL_SEC)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
+async def finish_report(itv_no, question_number, report):
+    # 완료 Report 캐시 저장 후, 면접 세션은 백그라운드로 S3 에 보관하고 Redis 에는 짧은 TTL 만 남김
+    await report_jobs.store_cached(itv_no, question_number, report)
+    run_in_background(session_store.archive(itv_no, question_number, report))
 
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response4_text}
-        
-    elif question_number == 5:
-        response5 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
+async def generate_report(itv_no, question_number, is_disconnected=None):
+    # report 부분에 coverletter 사용 여부 확인
+    history = await history_repository.load(itv_no, question_number)
+    logger.info('Redis에서 History GET 완료')
+
+    # 답변별로 미리 계산된 평가를 모아 병합 (길이와 무관하게 짧은 요약 호출 한 번)
+    start_time = datetime.now()
+    evaluations = await evaluator.collect(history, is_disconnected)
+    if evaluations:
+        report = await evaluator.merge(history, evaluations, is_disconnected)
+        if report:
+            elapsed_time = datetime.now() - start_time
+            logger.info(f'Bedrock Report 병합 SEC:{elapsed_time.total_seconds()} 평가 {len(evaluations)}건')
+            await finish_report(itv_no, question_number, report)
+            return report
+    logger.error('답변별 평가 병합 불가, 전체 대화로 Report 생성')
+
+    message_text = ""
+    for turn in history.turns:
+        message_text += f"Question: {turn.question}, Answer: {turn.answer}\n"
+    # print("message_text : ",message_text)
+
+    ## 꼬리 질문 생성
+    start_time = datetime.now()
+    message = await llm_router.create(
+        is_disconnected=is_disconnected,
+        max_tokens=10000,
         temperature=1,
-        system= SYSTEM_CHAT,
+        system= system_prompt(SYSTEM_REPORT),
         messages=[
             {
                 "role": "user",
                 "content": [
                     {
                         "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[2],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[3],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
-    )
-        print(response5)
-        message_content = response5.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response5_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response5.usage.input_tokens
-        output_tokens = response5.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost :{cost}')
-        
-        try:
-            response = json.loads(response5_text).get("question")
-            # print("Response:", response)
-
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
-
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response5_text}
-    elif question_number == 6:
-        response6 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        top_k=500,
-        top_p= 1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[2],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[3],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[3],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[4],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
-    )
-        print(response6)
-        message_content = response6.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response6_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response6.usage.input_tokens
-        output_tokens = response6.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost :{cost}')
-        try:
-            response = json.loads(response6_text).get("question")
-            # print("Response:", response)
-
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
-
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response6_text}
-    elif question_number == 7:
-        response7 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[2],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[3],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[3],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[4],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[4],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[5],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
-    )
-        print(response7)
-        message_content = response7.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response7_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response7.usage.input_tokens
-        output_tokens = response7.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost:{cost}')
-        try:
-            response = json.loads(response7_text).get("question")
-            # print("Response:", response)
-
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
-
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response7_text}
-    elif question_number == 8:
-        response8 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[2],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[3],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[3],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[4],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[4],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[5],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[5],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[6],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
-    )
-        print(response8)
-        message_content = response8.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response8_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response8.usage.input_tokens
-        output_tokens = response8.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost:{cost}')
-        try:
-            response = json.loads(response8_text).get("question")
-            # print("Response:", response)
-
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
-
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response8_text}
-    elif question_number == 9:
-        response9 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[2],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[3],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[3],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[4],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[4],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[5],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[5],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[6],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[6],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[7],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
-    )
-        message_content = response9.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response9_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response9.usage.input_tokens
-        output_tokens = response9.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost:{cost}')
-        try:
-            response = json.loads(response9_text).get("question")
-            # print("Response:", response)
-
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
-
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response9_text}
-    elif question_number == 10:
-        response10 = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=4096,
-        temperature=1,
-        system= SYSTEM_CHAT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": cover_letter,
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[0],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[0],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[1],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[1],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[2],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[2],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[3],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[3],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[4],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[4],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[5],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[5],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[6],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[6],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[7],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": answers[7],
-                    }
-                ]
-            },
-            {
-                "role": "assistant",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": questions[8],
-                    }
-                ]
-            },
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": prompt,
-                    }
-                ]
-            }
-        ]
-    )
-        print(response10)
-        message_content = response10.content[0].text
-        start_index = message_content.find('{')
-        end_index = message_content.rfind('}') + 1
-        response10_text = message_content[start_index:end_index]
-        
-        end_time = datetime.now()
-        elapsed_time = end_time - start_time
-        logger.info(f'Bedrock 질문 생성 SEC:{elapsed_time.total_seconds()}')
-        input_tokens = response10.usage.input_tokens
-        output_tokens = response10.usage.output_tokens
-        cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-        logger.info(f'Bedrock cost:{cost}')
-        response10_text = response10.content[0].text
-        try:
-            response = json.loads(response10_text).get("question")
-            # print("Response:", response)
-
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            response = None
-        await store_history_redis(itv_no,f"question-{question_number}",response)
-        print("Complete history from Redis:")
-        print(response)
-
-        if response:
-            # tts, question = self.extract_question(response)
-            logger.info(f'질문: {response}')
-            return {'response': response}
-        else:
-            logger.error('질문 생성 실패')
-            return {'response': response10_text}
-        
-@app.post("/question/report", status_code=200)
-async def report(item: reportItem):
-    itv_no = item.itv_no
-    question_number = int(item.question_number)
-    
-    logger.info( f'Report API 호출 itv_no: {itv_no}')
-    # combined_history =  await getall_history_redis(itv_no)
-    print(itv_no)
-    print(question_number)
-    # prompt = f"대답: {combined_history}"
-    # 질문과 답변 저장을 위한 리스트 초기화
-    questions = []
-    answers = []
-    question_answer_pairs = []
-
-    # report 부분에 coverletter 사용 여부 확인
-    cover_letter = await get_history_redis(itv_no, "coverletter")
-    logger.info('Redis에서 History GET 완료')
-    
-    for i in range(1, question_number + 1):
-        question = await get_history_redis(itv_no, f"question-{i}")
-        answer = await get_history_redis(itv_no, f"answer-{i}")
-        questions.append(question)
-        answers.append(answer)
-        question_answer_pairs.append((question, answer))
-    # print("question_answer_pairs : ", question_answer_pairs)
-
-    message_text = ""
-    for question, answer in question_answer_pairs:
-        message_text += f"Question: {question}, Answer: {answer}\n"
-    # print("message_text : ",message_text)
-
-    ## 꼬리 질문 생성
-    start_time = datetime.now()
-    message = bedrock_client.messages.create(
-        model="anthropic.claude-3-5-sonnet-20240620-v1:0",
-        max_tokens=10000,
-        temperature=1,
-        system= SYSTEM_REPORT,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": message_text,
+                        "text": message_text,
                     }
                 ]
             }
         ]
     )
-    print(message)
-    message_content = message.content[0].text
-    start_index = message_content.find('{')
-    end_index = message_content.rfind('}') + 1
-    response_text = message_content[start_index:end_index]
+    logger.debug(f'Bedrock 응답: {message}')
+    response_text = message.content[0].text
     
     end_time = datetime.now()
     elapsed_time = end_time - start_time
     logger.info(f'Bedrock Report 생성 SEC:{elapsed_time.total_seconds()}')
-    input_tokens = message.usage.input_tokens
-    output_tokens = message.usage.output_tokens
-    cost = round((input_tokens * 0.000003 + output_tokens * 0.000015) * 1381, 3)
-    logger.info(f'Bedrock cost:{cost}')
-    response_text = message.content[0].text
-
-    try:
-        relevant_experience = json.loads(response_text).get("relevant_experience")
-        problem_solving = json.loads(response_text).get("problem_solving")
-        communication_skills = json.loads(response_text).get("communication_skills")
-        initiative = json.loads(response_text).get("initiative")
-        situation = json.loads(response_text).get("situation")
-        task = json.loads(response_text).get("task")
-        action = json.loads(response_text).get("action")
-        result = json.loads(response_text).get("result")
-        overall_score = json.loads(response_text).get("overall_score")
-        encouragement = json.loads(response_text).get("encouragement")
-        # print(relevant_experience)
-        
-        # print("Response:", response)
+    log_bedrock_usage(message.usage, 'report', elapsed_time, turn=question_number, model=getattr(message, 'model', BEDROCK_MODEL_ID))
 
-    except json.JSONDecodeError as e:
-        logger.error('JSONDecodeError')
-        print("JSONDecodeError:", e)
-        response = None
-        # noanswer = str(json.loads(response_text))
-
-    if response_text:
-        # tts, question = self.extract_question(response)
-        return {
-                'relevant_experience': relevant_experience,
-                'problem_solving': problem_solving,
-                'communication_skills': communication_skills,
-                'initiative': initiative,
-                'situation': situation,
-                'task': task,
-                'action': action,
-                'result': result,
-                'overall_score': overall_score,
-                'encouragement': encouragement
-                }
+    parsed = await structured.parse(ReportOutput, response_text, is_disconnected)
+    if parsed:
+        report = parsed.model_dump()
+        await finish_report(itv_no, question_number, report)
+        return report
     else:
-        return {'response': 'noanswer' }
+        return dict(NO_REPORT_RESPONSE)
 
 FastAPIInstrumentor.instrument_app(app)
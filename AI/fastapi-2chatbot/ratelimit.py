@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+from dataclasses import dataclass
+
+from tokens import estimate_tokens
+from llm import usage_tokens
+from metrics import rate_limit_metrics
+
+logger = logging.getLogger(__name__)
+
+# 모든 pod 가 공유하는 model 별 분당 요청 수/토큰 수 (0 이면 그 항목은 제한 없음, 기본은 둘 다 제한 없음)
+# 계정의 Bedrock quota 에 맞춰 명시적으로 설정 (Sonnet 예: RPM 50, TPM 400000)
+RATE_LIMIT_RPM = int(os.getenv('RATE_LIMIT_RPM', '0'))
+RATE_LIMIT_TPM = int(os.getenv('RATE_LIMIT_TPM', '0'))
+# model 별 quota: {"model id": [rpm, tpm]}, 여기 없는 model 은 위 기본값
+RATE_LIMITS = json.loads(os.getenv('RATE_LIMITS', '{}'))
+# 차례를 기다리는 최대 시간, 이 안에 자리가 나지 않을 것이 확실하면 바로 거절
+RATE_LIMIT_MAX_WAIT_SEC = float(os.getenv('RATE_LIMIT_MAX_WAIT_SEC', '10'))
+# 제한 없는 항목에 넣는 bucket 용량 (사실상 무제한)
+UNLIMITED = 10 ** 12
+# 출력 토큰은 미리 알 수 없어 이만큼 예약하고, 응답 후 실제 사용량과의 차이를 정산
+RATE_LIMIT_OUTPUT_TOKENS_EST = int(os.getenv('RATE_LIMIT_OUTPUT_TOKENS_EST', '500'))
+
+# RPM, TPM 두 bucket 을 한 번에 확인/차감 (원자적, 시간은 Redis 서버 기준)
+# ARGV: rpm 용량, tpm 용량, 요청 토큰 수, force(1 이면 확인 없이 차감, 음수면 반환)
+# 반환: {허용 여부, 기다려야 하는 ms}
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local caps = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local costs = {1, tonumber(ARGV[3])}
+local force = tonumber(ARGV[4])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or caps[i]
+    local ts = tonumber(state[2]) or now
+    local rate = caps[i] / 60000
+    tokens = math.min(caps[i], tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if force == 0 and tokens < costs[i] then
+        wait = math.max(wait, math.ceil((costs[i] - tokens) / rate))
+    end
+end
+if force == 1 then
+    costs[1] = 0
+end
+local allowed = 0
+if wait == 0 then
+    allowed = 1
+    for i = 1, 2 do
+        levels[i] = levels[i] - costs[i]
+    end
+end
+for i = 1, 2 do
+    redis.call('HSET', KEYS[i], 'tokens', levels[i], 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], 120000)
+end
+return {allowed, wait}
+"""
+
+
+class RateLimitExceededError(Exception):
+    def __init__(self, model, retry_after):
+        super().__init__(f'{model} rate limit, retry after {retry_after:.1f}s')
+        self.model = model
+        self.retry_after = retry_after
+
+
+@dataclass
+class Reservation:
+    model: str
+    tokens: int
+
+
+def request_tokens(kwargs):
+    # 입력(system + messages) 추정 토큰 + 출력 예약분
+    tokens = estimate_tokens(_text(kwargs.get('system')))
+    for message in kwargs.get('messages', ()):
+        tokens += estimate_tokens(_text(message.get('content')))
+    return tokens + min(kwargs.get('max_tokens') or 0, RATE_LIMIT_OUTPUT_TOKENS_EST)
+
+
+def _text(content):
+    if not content:
+        return ''
+    if isinstance(content, str):
+        return content
+    return ''.join(block.get('text', '') for block in content)
+
+
+class RateLimiter:
+    # Redis token bucket 으로 모든 replica 가 model 별 RPM/TPM 을 나눠 씀
+    # 자리가 날 때까지 deadline 안에서 기다리고, deadline 안에 불가능하면 RateLimitExceededError (429)
+    # Redis 장애 시에는 제한 없이 통과 (fail_open 으로 셈, 계속 늘면 제한이 동작하지 않는 상태)
+    # rpm/tpm 두 key 는 한 script 에서 쓰므로 {model} hash tag 로 같은 slot 에 둠 (Redis Cluster CROSSSLOT 방지)
+    def __init__(self, redis_client, rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM, limits=RATE_LIMITS,
+                 max_wait=RATE_LIMIT_MAX_WAIT_SEC, prefix='ratelimit'):
+        self.redis_client = redis_client
+        self.rpm = rpm
+        self.tpm = tpm
+        self.limits = limits
+        self.max_wait = max_wait
+        self.prefix = prefix
+        self.waiting = 0
+        self.counts = {'allowed': 0, 'delayed': 0, 'rejected': 0, 'fail_open': 0}
+
+    def limit(self, model):
+        # 둘 다 0 이면 (0, 0) = 제한 없음, 하나만 0 이면 그 항목만 무제한 용량
+        rpm, tpm = self.limits.get(model, (self.rpm, self.tpm))
+        if rpm <= 0 and tpm <= 0:
+            return 0, 0
+        return (rpm if rpm > 0 else UNLIMITED), (tpm if tpm > 0 else UNLIMITED)
+
+    async def acquire(self, kwargs, max_wait=None):
+        model = kwargs.get('model', '')
+        rpm, tpm = self.limit(model)
+        if rpm <= 0 or tpm <= 0:
+            return None
+        # 한 요청이 bucket 전체보다 크면 영원히 기다리게 되므로 용량으로 자름
+        tokens = min(request_tokens(kwargs), tpm)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.max_wait if max_wait is None else max_wait)
+        delayed = False
+        self.waiting += 1
+        try:
+            while True:
+                result = await self._eval(model, rpm, tpm, tokens, 0)
+                if result is None:
+                    return None
+                if result[0]:
+                    self.counts['delayed' if delayed else 'allowed'] += 1
+                    return Reservation(model, tokens)
+                wait = result[1] / 1000
+                remaining = deadline - loop.time()
+                if wait > remaining:
+                    self.counts['rejected'] += 1
+                    logger.error(f'Bedrock rate limit 초과 {model}: {wait:.1f}s 대기 필요 (남은 시간 {remaining:.1f}s)')
+                    raise RateLimitExceededError(model, wait)
+                delayed = True
+                # 여러 pod 가 같은 순간에 다시 시도하지 않도록 jitter
+                await asyncio.sleep(wait + random.uniform(0, min(wait, 0.2)))
+        finally:
+            self.waiting -= 1
+
+    async def settle(self, reservation, usage):
+        # 예약분과 실제 사용 토큰의 차이를 bucket 에 반영 (남으면 반환, 모자라면 추가 차감)
+        # 호출이 실패해 usage 가 없으면(None 또는 0) 예약한 토큰 전부 반환 (요청 수는 그대로)
+        if reservation is None:
+            return
+        input_tokens, output_tokens, cache_read_tokens, cache_write_tokens = usage_tokens(usage)
+        used = input_tokens + output_tokens + cache_read_tokens + cache_write_tokens
+        if used == reservation.tokens:
+            return
+        rpm, tpm = self.limit(reservation.model)
+        await self._eval(reservation.model, rpm, tpm, used - reservation.tokens, 1)
+
+    async def _eval(self, model, rpm, tpm, tokens, force):
+        keys = [f'{self.prefix}:{{{model}}}:rpm', f'{self.prefix}:{{{model}}}:tpm']
+        try:
+            allowed, wait = await self.redis_client.eval(TOKEN_BUCKET_SCRIPT, 2, *keys, rpm, tpm, tokens, force)
+            return int(allowed), int(wait)
+        except Exception as e:
+            self.counts['fail_open'] += 1
+            rate_limit_metrics.record_fail_open(model)
+            logger.error(f'Bedrock rate limit 확인 실패, 제한 없이 진행: {e}')
+            return None
+
+    def stats(self):
+        return {'rpm': self.rpm, 'tpm': self.tpm, 'waiting': self.waiting, **self.counts}
+
+
+def retry_after_header(exc):
+    return {'Retry-After': str(max(1, math.ceil(exc.retry_after)))}
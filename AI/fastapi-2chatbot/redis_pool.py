@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import os
+import weakref
+
+from redis import asyncio as aioredis
+from redis.asyncio.retry import Retry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+
+from metrics import redis_pool_metrics
+
+logger = logging.getLogger(__name__)
+
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '64'))
+# 풀이 가득 찼을 때 연결을 기다리는 최대 시간
+REDIS_POOL_TIMEOUT_SEC = float(os.getenv('REDIS_POOL_TIMEOUT_SEC', '5'))
+REDIS_SOCKET_TIMEOUT_SEC = float(os.getenv('REDIS_SOCKET_TIMEOUT_SEC', '5'))
+REDIS_HEALTH_CHECK_SEC = int(os.getenv('REDIS_HEALTH_CHECK_SEC', '30'))
+# 명령 단위 재시도 횟수 (지수 backoff)
+REDIS_RETRIES = int(os.getenv('REDIS_RETRIES', '3'))
+# 기동 시 첫 연결 재시도 횟수
+REDIS_CONNECT_ATTEMPTS = int(os.getenv('REDIS_CONNECT_ATTEMPTS', '5'))
+REDIS_BACKOFF_CAP_SEC = float(os.getenv('REDIS_BACKOFF_CAP_SEC', '5'))
+
+
+class CountingConnectionPool(aioredis.BlockingConnectionPool):
+    # 사용 중/대기 연결 수를 redis-py 내부 속성 대신 public method 를 감싸 직접 셈 (redis-py 버전이 바뀌어도 유지)
+    # waiting 은 연결을 기다리거나 새 연결을 여는 중인 요청 수
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._reset_counts()
+
+    def _reset_counts(self):
+        self.created = 0
+        self.waiting = 0
+        # get_connection 으로 내준 연결 (get_connection 안에서 연결 확인에 실패해 release 된 것은 포함하지 않음)
+        self._lent = weakref.WeakSet()
+
+    @property
+    def in_use(self):
+        return len(self._lent)
+
+    def reset(self):
+        super().reset()
+        self._reset_counts()
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.created += 1
+        return connection
+
+    async def get_connection(self, command_name, *keys, **options):
+        self.waiting += 1
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        finally:
+            self.waiting -= 1
+        self._lent.add(connection)
+        return connection
+
+    async def release(self, connection):
+        self._lent.discard(connection)
+        await super().release(connection)
+
+
+class RedisPool:
+    # 프로세스 전체가 공유하는 asyncio Redis 클라이언트와 크기 제한 연결 풀
+    # 객체 생성은 I/O 없이 끝나고, 연결 확인과 종료는 app lifespan 의 start()/close() 에서 한다
+    def __init__(self, host, port=6379, ssl=False, username=None, password=None,
+                 max_connections=REDIS_MAX_CONNECTIONS, pool_timeout=REDIS_POOL_TIMEOUT_SEC):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.pool = CountingConnectionPool(
+            host=host,
+            port=port,
+            username=username,
+            password=password,
+            connection_class=aioredis.SSLConnection if ssl else aioredis.Connection,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            socket_timeout=REDIS_SOCKET_TIMEOUT_SEC,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT_SEC,
+            health_check_interval=REDIS_HEALTH_CHECK_SEC,
+            retry=Retry(ExponentialBackoff(cap=REDIS_BACKOFF_CAP_SEC, base=0.1), REDIS_RETRIES),
+            retry_on_error=[ConnectionError, TimeoutError],
+            decode_responses=True,
+        )
+        self.client = aioredis.Redis(connection_pool=self.pool)
+        redis_pool_metrics.watch(self)
+
+    async def start(self):
+        delay = 0.5
+        for attempt in range(1, REDIS_CONNECT_ATTEMPTS + 1):
+            try:
+                await self.client.ping()
+                logger.info(f'Redis 연결 완료 {self.host}:{self.port}')
+                return True
+            except (ConnectionError, TimeoutError, OSError) as e:
+                logger.error(f'Redis 연결 실패 ({attempt}/{REDIS_CONNECT_ATTEMPTS}): {e}')
+                if attempt < REDIS_CONNECT_ATTEMPTS:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, REDIS_BACKOFF_CAP_SEC)
+        # 기동은 계속하고, 이후 명령은 명령 단위 재시도로 다시 연결을 시도한다
+        return False
+
+    async def close(self):
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+    async def ping(self):
+        try:
+            return await self.client.ping()
+        except Exception as e:
+            logger.error(f'Redis health check 실패: {e}')
+            return False
+
+    def stats(self):
+        in_use = self.pool.in_use
+        return {
+            'max_connections': self.max_connections,
+            'in_use': in_use,
+            'idle': max(0, self.pool.created - in_use),
+            'waiting': self.pool.waiting,
+            'utilization': round(in_use / self.max_connections, 3),
+        }
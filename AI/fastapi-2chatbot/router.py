@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from llm import AsyncLLM, LLMCancelledError
+from ratelimit import RateLimitExceededError
+
+logger = logging.getLogger(__name__)
+
+# 사용할 provider 순서 (쉼표 구분, 앞쪽이 기본). 예: "bedrock,openai"
+LLM_PROVIDERS = os.getenv('LLM_PROVIDERS', 'bedrock')
+OPENAI_MODEL_ID = os.getenv('OPENAI_MODEL_ID', 'gpt-4o')
+ROUTER_HEDGE = os.getenv('ROUTER_HEDGE', '1') == '1'
+# provider 별 최근 호출 통계 창 크기와, p95 를 믿기 위한 최소 표본 수
+ROUTER_WINDOW = int(os.getenv('ROUTER_WINDOW', '100'))
+ROUTER_MIN_SAMPLES = int(os.getenv('ROUTER_MIN_SAMPLES', '10'))
+# 표본이 부족할 때 hedge 요청을 보내기까지 기다리는 시간
+ROUTER_HEDGE_DEFAULT_SEC = float(os.getenv('ROUTER_HEDGE_DEFAULT_SEC', '15'))
+# 최근 오류율이 이 값을 넘으면 unhealthy (다른 provider 가 없을 때만 사용)
+ROUTER_MAX_ERROR_RATE = float(os.getenv('ROUTER_MAX_ERROR_RATE', '0.5'))
+# LLM_PROVIDERS 에 stub 을 넣었을 때의 가짜 provider 설정 (부하 테스트에서 느린/불안정한 provider 흉내)
+ROUTER_STUB_LATENCY_SEC = float(os.getenv('ROUTER_STUB_LATENCY_SEC', '0.5'))
+ROUTER_STUB_JITTER_SEC = float(os.getenv('ROUTER_STUB_JITTER_SEC', '0'))
+ROUTER_STUB_ERROR_RATE = float(os.getenv('ROUTER_STUB_ERROR_RATE', '0'))
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _flatten(content):
+    if isinstance(content, str):
+        return content
+    return '\n'.join(block.get('text', '') for block in content if block.get('type') == 'text')
+
+
+class OpenAIMessages:
+    # OpenAI chat.completions 를 Anthropic messages.create 형태로 맞춰 AsyncLLM 에 그대로 넣기 위한 어댑터
+    # (cache_control 같은 Bedrock 전용 표시는 무시)
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, model, messages, max_tokens, temperature=1, system=None, **kwargs):
+        chat_messages = []
+        if system:
+            chat_messages.append({"role": "system", "content": _flatten(system)})
+        for message in messages:
+            chat_messages.append({"role": message["role"], "content": _flatten(message["content"])})
+        completion = await self.client.chat.completions.create(
+            model=model,
+            messages=chat_messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        usage = completion.usage
+        return SimpleNamespace(
+            model=model,
+            content=[SimpleNamespace(type='text', text=completion.choices[0].message.content or '')],
+            usage=SimpleNamespace(
+                input_tokens=getattr(usage, 'prompt_tokens', 0),
+                output_tokens=getattr(usage, 'completion_tokens', 0),
+            ),
+        )
+
+
+class OpenAIClient:
+    def __init__(self, client):
+        self.messages = OpenAIMessages(client)
+
+
+class StubMessages:
+    # 테스트/부하 테스트용 가짜 provider (지연 시간, 오류율 설정 가능)
+    def __init__(self, latency=0.5, jitter=0.0, error_rate=0.0, text='{"question": "stub question"}'):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.text = text
+        self.calls = 0
+
+    async def create(self, model, messages, max_tokens=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        if random.random() < self.error_rate:
+            raise RuntimeError('stub provider error')
+        input_tokens = sum(len(_flatten(message["content"])) for message in messages) // 4
+        return SimpleNamespace(
+            model=model,
+            content=[SimpleNamespace(type='text', text=self.text)],
+            usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=len(self.text) // 4),
+        )
+
+
+class StubClient:
+    def __init__(self, **kwargs):
+        self.messages = StubMessages(**kwargs)
+
+
+class Provider:
+    # provider + model 하나와 최근 호출 통계 (성공 지연 시간, 성공/실패)
+    def __init__(self, name, llm, model, window=ROUTER_WINDOW):
+        self.name = name
+        self.llm = llm
+        self.model = model
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.hedged = 0
+        self.won = 0
+
+    @property
+    def key(self):
+        return f'{self.name}:{self.model}'
+
+    def record(self, latency=None, ok=True):
+        self.outcomes.append(ok)
+        if ok and latency is not None:
+            self.latencies.append(latency)
+
+    def p50(self):
+        if len(self.latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return _percentile(self.latencies, 0.5)
+
+    def p95(self):
+        if len(self.latencies) < ROUTER_MIN_SAMPLES:
+            return None
+        return _percentile(self.latencies, 0.95)
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def healthy(self):
+        return len(self.outcomes) < ROUTER_MIN_SAMPLES or self.error_rate() <= ROUTER_MAX_ERROR_RATE
+
+    def stats(self):
+        return {
+            'samples': len(self.latencies),
+            'p50': self.p50(),
+            'p95': self.p95(),
+            'error_rate': round(self.error_rate(), 3),
+            'healthy': self.healthy(),
+            'hedged': self.hedged,
+            'won': self.won,
+        }
+
+
+class LLMRouter:
+    # 생성 요청을 가장 빠른 healthy provider 로 보내고, 응답이 그 provider 의 p95 를 넘기면
+    # 다음 provider 로 hedge 요청을 한 번 더 보내 먼저 끝난 쪽을 쓰고 나머지는 취소한다
+    # 실패(예외)하면 다음 provider 로 넘김. 호출 인자는 AsyncLLM.create 와 같고 model 은 provider 설정을 사용
+    def __init__(self, providers, hedge=ROUTER_HEDGE):
+        self.providers = list(providers)
+        self.hedge = hedge
+
+    def ranked(self):
+        # healthy 우선, 표본이 충분한 것은 p50 순, 표본이 부족하면 설정 순서 (hedge 로 표본이 쌓임)
+        def rank(item):
+            order, provider = item
+            p50 = provider.p50()
+            return (not provider.healthy(), p50 if p50 is not None else float('inf'), order)
+        return [provider for _, provider in sorted(enumerate(self.providers), key=rank)]
+
+    async def create(self, is_disconnected=None, **kwargs):
+        kwargs.pop('model', None)
+        candidates = self.ranked()
+        last_error = None
+        while candidates:
+            primary = candidates.pop(0)
+            backup = candidates[0] if self.hedge and candidates else None
+            try:
+                response, winner = await self._race(primary, backup, is_disconnected, kwargs)
+            except (LLMCancelledError, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                last_error = e
+                logger.error(f'LLM provider 실패 {primary.key}: {e}')
+                continue
+            if winner is backup:
+                logger.info(f'LLM hedge 요청 승리 {backup.key}')
+            return response
+        raise last_error
+
+    async def _race(self, primary, backup, is_disconnected, kwargs):
+        first = asyncio.ensure_future(self._call(primary, is_disconnected, kwargs))
+        tasks = {first: primary}
+        try:
+            if backup is not None:
+                delay = primary.p95() or ROUTER_HEDGE_DEFAULT_SEC
+                done, _ = await asyncio.wait({first}, timeout=delay)
+                if not done:
+                    logger.info(f'LLM hedge 요청 {primary.key} -> {backup.key} ({delay:.2f}s 초과)')
+                    primary.hedged += 1
+                    tasks[asyncio.ensure_future(self._call(backup, is_disconnected, kwargs))] = backup
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        provider = tasks[task]
+                        provider.won += 1
+                        return task.result(), provider
+                    error = task.exception()
+                    if isinstance(error, LLMCancelledError):
+                        raise error
+            raise error
+        finally:
+            # 진 쪽(또는 남은 쪽) 호출 취소
+            for task in tasks:
+                task.cancel()
+
+    async def _call(self, provider, is_disconnected, kwargs):
+        start = time.perf_counter()
+        try:
+            response = await provider.llm.create(is_disconnected=is_disconnected, model=provider.model, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except LLMCancelledError:
+            raise
+        except RateLimitExceededError:
+            # 우리 쪽 제한으로 보내지 않은 요청이라 provider 의 오류율/지연 시간에 넣지 않음
+            raise
+        except Exception:
+            provider.record(ok=False)
+            raise
+        provider.record(time.perf_counter() - start)
+        return response
+
+    def stats(self):
+        return {provider.key: provider.stats() for provider in self.providers}
+
+
+def stub_options():
+    return {'latency': ROUTER_STUB_LATENCY_SEC, 'jitter': ROUTER_STUB_JITTER_SEC, 'error_rate': ROUTER_STUB_ERROR_RATE}
+
+
+def build_router(bedrock, bedrock_model, openai_client=None, names=LLM_PROVIDERS, stub=None):
+    # LLM_PROVIDERS 설정 순서대로 provider 구성 (bedrock 은 기존 AsyncLLM 을 그대로 사용)
+    # stub: StubMessages 설정 (없으면 ROUTER_STUB_* 환경 변수)
+    providers = []
+    for name in [name.strip() for name in names.split(',') if name.strip()]:
+        if name == 'bedrock':
+            providers.append(Provider('bedrock', bedrock, bedrock_model))
+        elif name == 'openai' and openai_client is not None:
+            providers.append(Provider('openai', AsyncLLM(OpenAIClient(openai_client)), OPENAI_MODEL_ID))
+        elif name == 'stub':
+            providers.append(Provider('stub', AsyncLLM(StubClient(**(stub or stub_options()))), 'stub'))
+        else:
+            logger.error(f'알 수 없는 LLM provider: {name}')
+    if not providers:
+        providers.append(Provider('bedrock', bedrock, bedrock_model))
+    return LLMRouter(providers)
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# S3 연결 풀 크기 = S3 전용 thread 수 (동시에 나가는 요청이 풀보다 많아 연결을 기다리거나 버리지 않도록 같게 맞춤)
+S3_MAX_CONNECTIONS = int(os.getenv('S3_MAX_CONNECTIONS', '32'))
+S3_CONNECT_TIMEOUT_SEC = float(os.getenv('S3_CONNECT_TIMEOUT_SEC', '5'))
+S3_READ_TIMEOUT_SEC = float(os.getenv('S3_READ_TIMEOUT_SEC', '30'))
+S3_RETRIES = int(os.getenv('S3_RETRIES', '3'))
+# 본문을 나눠 읽는 크기
+S3_CHUNK_BYTES = int(os.getenv('S3_CHUNK_BYTES', str(256 * 1024)))
+# spooled 읽기에서 이 크기까지는 메모리, 넘으면 임시 파일
+S3_SPOOL_MEMORY_BYTES = int(os.getenv('S3_SPOOL_MEMORY_BYTES', str(4 * 1024 * 1024)))
+
+
+class ObjectTooLargeError(Exception):
+    pass
+
+
+class S3Storage:
+    # 문서/음성/STT 결과용 S3 접근
+    # boto3 client 는 처음 쓸 때 만들고, 연결 풀 크기만큼의 전용 thread 에서만 호출해 풀을 기다리는 요청이 없게 한다
+    # 본문을 받기 전에 크기(HEAD 또는 GET 응답 헤더의 ContentLength)를 확인해 제한을 넘는 객체는 거절 (ObjectTooLargeError)
+    # 본문은 chunk 단위로 크기를 미리 잡은 버퍼(read) 또는 spooled 임시 파일(spooled)에 받아 복사본이 쌓이지 않게 한다
+    def __init__(self, region_name=None, aws_access_key_id=None, aws_secret_access_key=None,
+                 max_connections=S3_MAX_CONNECTIONS, client=None):
+        self.region_name = region_name
+        self.aws_access_key_id = aws_access_key_id
+        self.aws_secret_access_key = aws_secret_access_key
+        self.max_connections = max_connections
+        self._client = client
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix='s3')
+        self.in_flight = 0
+        self.counts = {'requests': 0, 'rejected': 0, 'errors': 0, 'bytes_read': 0}
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    from botocore.config import Config
+                    self._client = boto3.client(
+                        's3',
+                        aws_access_key_id=self.aws_access_key_id,
+                        aws_secret_access_key=self.aws_secret_access_key,
+                        region_name=self.region_name,
+                        config=Config(
+                            max_pool_connections=self.max_connections,
+                            connect_timeout=S3_CONNECT_TIMEOUT_SEC,
+                            read_timeout=S3_READ_TIMEOUT_SEC,
+                            retries={'max_attempts': S3_RETRIES, 'mode': 'standard'},
+                        ),
+                    )
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.counts['requests'] += 1
+        try:
+            return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+        except Exception:
+            self.counts['errors'] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def head(self, bucket_name, key):
+        return await self._run(lambda: self.client.head_object(Bucket=bucket_name, Key=key))
+
+    async def put(self, bucket_name, key, body):
+        return await self._run(lambda: self.client.put_object(Body=body, Bucket=bucket_name, Key=key))
+
+    def check_size(self, key, size, max_bytes):
+        if max_bytes and size is not None and size > max_bytes:
+            self.counts['rejected'] += 1
+            logger.error(f'S3 객체 크기 제한 초과: {key} ({size} bytes > {max_bytes})')
+            raise ObjectTooLargeError(f'{key} exceeds {max_bytes} bytes')
+
+    async def read(self, bucket_name, key, max_bytes=0, head=None):
+        # 본문 전체를 bytearray 하나로 (ContentLength 만큼 한 번에 잡고 chunk 를 이어 씀)
+        # 캐시 확인 등으로 이미 받은 HEAD 응답이 있으면 그것으로 먼저 거절하고,
+        # 없으면 HEAD 왕복 없이 GET 응답 헤더로 본문을 읽기 전에 확인
+        if head is not None:
+            self.check_size(key, head.get('ContentLength'), max_bytes)
+        return await self._run(self._read_into_buffer, bucket_name, key, max_bytes)
+
+    def _read_into_buffer(self, bucket_name, key, max_bytes):
+        file_obj = self.client.get_object(Bucket=bucket_name, Key=key)
+        body = file_obj['Body']
+        try:
+            # HEAD 이후 객체가 바뀐 경우도 GET 응답 크기로 다시 확인
+            size = file_obj.get('ContentLength')
+            self.check_size(key, size, max_bytes)
+            buffer = bytearray(size or 0)
+            view = memoryview(buffer)
+            offset = 0
+            while True:
+                chunk = body.read(S3_CHUNK_BYTES)
+                if not chunk:
+                    break
+                end = offset + len(chunk)
+                self.check_size(key, end, max_bytes)
+                if end <= len(buffer):
+                    view[offset:end] = chunk
+                else:
+                    # ContentLength 가 없거나 실제 본문이 더 긴 경우
+                    view.release()
+                    del buffer[offset:]
+                    buffer += chunk
+                    view = memoryview(buffer)
+                offset = end
+            view.release()
+            del buffer[offset:]
+            self.counts['bytes_read'] += offset
+            return buffer
+        finally:
+            body.close()
+
+    async def spooled(self, bucket_name, key, max_bytes=0):
+        # 본문을 SpooledTemporaryFile 로 (작으면 메모리, 크면 디스크), 파일처럼 넘길 곳(STT 업로드 등)에 사용
+        head = await self.head(bucket_name, key)
+        self.check_size(key, head.get('ContentLength'), max_bytes)
+        return await self._run(self._read_into_spool, bucket_name, key, max_bytes)
+
+    def _read_into_spool(self, bucket_name, key, max_bytes):
+        file_obj = self.client.get_object(Bucket=bucket_name, Key=key)
+        body = file_obj['Body']
+        spool = tempfile.SpooledTemporaryFile(max_size=S3_SPOOL_MEMORY_BYTES)
+        try:
+            size = 0
+            while True:
+                chunk = body.read(S3_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                self.check_size(key, size, max_bytes)
+                spool.write(chunk)
+            self.counts['bytes_read'] += size
+            spool.seek(0)
+            return spool
+        except BaseException:
+            spool.close()
+            raise
+        finally:
+            body.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            'max_connections': self.max_connections,
+            'in_flight': self.in_flight,
+            'queued': max(self.in_flight - self.max_connections, 0),
+            **self.counts,
+        }
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import os
+
+from metrics import session_metrics
+
+logger = logging.getLogger(__name__)
+
+# 면접 세션(itv_no 해시: 자기소개서, 질문/답변, 평가, 요약) 보관 시간, 저장할 때마다 다시 이 시간으로 갱신
+SESSION_TTL_SEC = int(os.getenv('SESSION_TTL_SEC', str(24 * 3600)))
+# Report 완료 후 S3 에 보관한 세션을 Redis 에 남겨 두는 시간 (Report 재요청 등)
+SESSION_ARCHIVED_TTL_SEC = int(os.getenv('SESSION_ARCHIVED_TTL_SEC', '3600'))
+# 보관할 S3 bucket (없으면 보관하지 않고 TTL 로만 만료)
+SESSION_ARCHIVE_BUCKET = os.getenv('SESSION_ARCHIVE_BUCKET', '')
+SESSION_ARCHIVE_PREFIX = os.getenv('SESSION_ARCHIVE_PREFIX', 'interview-sessions/')
+# 만료된 세션의 크기를 합계에서 빼는 주기와 한 번에 처리할 수
+SESSION_SWEEP_SEC = float(os.getenv('SESSION_SWEEP_SEC', '60'))
+SESSION_SWEEP_BATCH = int(os.getenv('SESSION_SWEEP_BATCH', '500'))
+# 세션 크기 key 는 세션 TTL 보다 이만큼 더 남김 (sweeper 가 크기를 읽을 시간, 정리를 놓쳐도 key 는 결국 만료)
+SESSION_SIZE_GRACE_SEC = int(os.getenv('SESSION_SIZE_GRACE_SEC', '3600'))
+
+# 필드 저장 + TTL 갱신 + 세션 크기 정산을 한 번에 (원자적, 시간은 Redis 서버 기준)
+# KEYS: 세션 해시, 세션 크기 (둘 다 같은 hash slot, Redis Cluster 에서도 한 script 로 실행 가능)
+# ARGV: ttl, 크기 key 추가 보관 시간, field1, value1, field2, value2, ...
+# 크기는 field + value 의 byte 수 (Redis 내부 overhead 제외), 만료 후 다시 만들어진 세션은 이전 크기를 버리고 새로 셈
+# 반환: {세션 크기, 전체 크기에 더할 값, 만료 시각}
+STORE_SCRIPT = """
+local ttl = tonumber(ARGV[1])
+local delta = 0
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    delta = -(tonumber(redis.call('GET', KEYS[2])) or 0)
+end
+for i = 3, #ARGV, 2 do
+    local old = redis.call('HSTRLEN', KEYS[1], ARGV[i])
+    if redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1]) == 0 then
+        delta = delta - #ARGV[i] - old
+    end
+    delta = delta + #ARGV[i] + #ARGV[i + 1]
+end
+redis.call('EXPIRE', KEYS[1], ttl)
+local now = tonumber(redis.call('TIME')[1])
+local size = redis.call('INCRBY', KEYS[2], delta)
+redis.call('EXPIRE', KEYS[2], ttl + tonumber(ARGV[2]))
+return {size, delta, now + ttl}
+"""
+
+# 만료 시각이 지난 세션 정리: 아직 남아 있으면(다른 경로로 TTL 갱신) 새 만료 시각을 돌려주고,
+# 없으면 세션 크기 기록을 지우고 그 크기를 돌려줌 (여러 pod 가 동시에 실행해도 한 pod 만 크기를 받음)
+# KEYS: 세션 해시, 세션 크기
+# ARGV: 크기 key 추가 보관 시간
+# 반환: {뺄 byte 수 (남아 있으면 -1), 새 만료 시각 (TTL 이 없으면 -1, 지웠으면 0)}
+FORGET_SCRIPT = """
+local ttl = redis.call('TTL', KEYS[1])
+if ttl > 0 then
+    redis.call('EXPIRE', KEYS[2], ttl + tonumber(ARGV[1]))
+    return {-1, tonumber(redis.call('TIME')[1]) + ttl}
+end
+if ttl == -1 then
+    return {-1, -1}
+end
+local size = tonumber(redis.call('GET', KEYS[2])) or 0
+redis.call('DEL', KEYS[2])
+return {size, 0}
+"""
+
+
+class SessionStore:
+    # itv_no 해시(면접 세션)의 수명 관리
+    # 저장할 때마다 TTL 을 SESSION_TTL_SEC 로 갱신하고 세션별/전체 byte 수를 Redis 에 정산 (모든 pod 공유)
+    # Report 가 끝나면 세션 전체를 S3 에 JSON 으로 보관하고 Redis 에는 짧은 TTL 만 남김
+    # 만료는 Redis 가 하고, sweeper 가 주기적으로 만료된 세션의 크기를 합계에서 뺀다
+    # Redis Cluster: script 는 세션 해시와 같은 slot 의 키({itv_no} hash tag)만 쓰고,
+    # 전체 크기와 만료 시각 zset 은 slot 이 달라 script 뒤에 따로 갱신 (그 사이 pod 가 죽으면 합계가 조금 어긋날 수 있음)
+    # 세션 크기 key 도 세션 TTL + size_grace 로 만료되므로, sweeper 가 놓친 세션의 key 가 남지 않음
+    # 만료 시각은 pod 시계가 아니라 Redis TIME 기준
+    def __init__(self, redis_client, s3_storage=None, ttl=SESSION_TTL_SEC, archived_ttl=SESSION_ARCHIVED_TTL_SEC,
+                 archive_bucket=SESSION_ARCHIVE_BUCKET, archive_prefix=SESSION_ARCHIVE_PREFIX, prefix='session',
+                 size_grace=SESSION_SIZE_GRACE_SEC):
+        self.redis_client = redis_client
+        self.s3_storage = s3_storage
+        self.ttl = ttl
+        self.archived_ttl = archived_ttl
+        self.size_grace = size_grace
+        self.archive_bucket = archive_bucket
+        self.archive_prefix = archive_prefix
+        self.prefix = prefix
+        self.expires_key = f'{prefix}:expires'
+        self.total_key = f'{prefix}:bytes:total'
+        self._task = None
+        self.live_bytes = 0
+        self.live_sessions = 0
+        self.counts = {'stored': 0, 'archived': 0, 'archive_failed': 0, 'expired': 0}
+
+    def size_key(self, itv_no):
+        # 세션 해시 이름(itv_no) 전체를 hash tag 로 써서 세션 해시와 같은 slot 에 둠
+        return f'{{{itv_no}}}:{self.prefix}:bytes'
+
+    def _keys(self, itv_no):
+        return [itv_no, self.size_key(itv_no)]
+
+    async def _now(self):
+        seconds, _ = await self.redis_client.time()
+        return int(seconds)
+
+    async def store(self, itv_no, field, value):
+        # value 는 이미 인코딩된 문자열 (JSON)
+        return await self.store_many(itv_no, {field: value})
+
+    async def store_many(self, itv_no, mapping):
+        args = [self.ttl, self.size_grace]
+        for field, value in mapping.items():
+            args += [field, value]
+        size, delta, expires_at = await self.redis_client.eval(STORE_SCRIPT, 2, *self._keys(itv_no), *args)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.incrby(self.total_key, delta)
+            pipe.zadd(self.expires_key, {itv_no: expires_at})
+            total, _ = await pipe.execute()
+        self.counts['stored'] += 1
+        self.live_bytes = int(total)
+        session_metrics.record_live(self.live_bytes, self.live_sessions)
+        return int(size)
+
+    async def size(self, itv_no):
+        value = await self.redis_client.get(self.size_key(itv_no))
+        return int(value) if value is not None else 0
+
+    async def describe(self, itv_no):
+        size, ttl = await asyncio.gather(self.size(itv_no), self.redis_client.ttl(itv_no))
+        return {'itv_no': itv_no, 'bytes': size, 'ttl': ttl if ttl >= 0 else None, 'exists': ttl != -2}
+
+    def archive_key(self, itv_no):
+        return f'{self.archive_prefix}{itv_no}.json'
+
+    async def archive(self, itv_no, question_number, report=None):
+        # Report 완료 후: 세션 전체 + Report 를 S3 에 보관하고, 성공하면 Redis TTL 을 archived_ttl 로 줄임
+        if not self.archive_bucket or self.s3_storage is None:
+            return None
+        try:
+            values = await self.redis_client.hgetall(itv_no)
+            if not values:
+                return None
+            fields = {}
+            for name, value in values.items():
+                try:
+                    fields[name] = json.loads(value)
+                except (TypeError, ValueError):
+                    fields[name] = value
+            size, now = await asyncio.gather(self.size(itv_no), self._now())
+            document = {
+                'itv_no': itv_no,
+                'question_number': question_number,
+                'archived_at': now,
+                'bytes': size,
+                'fields': fields,
+                'report': report,
+            }
+            key = self.archive_key(itv_no)
+            body = json.dumps(document, ensure_ascii=False).encode('utf-8')
+            await self.s3_storage.put(self.archive_bucket, key, body)
+            # 세션 해시와 zset 은 slot 이 달라 transaction 없이 (만료 시각은 먼저 읽은 Redis TIME 기준)
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.expire(itv_no, self.archived_ttl)
+                pipe.zadd(self.expires_key, {itv_no: now + self.archived_ttl})
+                await pipe.execute()
+        except Exception as e:
+            self.counts['archive_failed'] += 1
+            logger.error(f'면접 세션 보관 실패 itv_no: {itv_no}: {e}')
+            return None
+        self.counts['archived'] += 1
+        session_metrics.record_archived(size)
+        logger.info(f'면접 세션 보관 완료 itv_no: {itv_no} s3://{self.archive_bucket}/{key} {size} bytes')
+        return key
+
+    async def sweep(self):
+        # 만료 시각이 지난 세션을 정리하고 전체 크기/세션 수를 다시 읽음
+        freed = 0
+        names = await self.redis_client.zrangebyscore(self.expires_key, '-inf', await self._now(),
+                                                      start=0, num=SESSION_SWEEP_BATCH)
+        for name in names:
+            size, expires_at = await self.redis_client.eval(FORGET_SCRIPT, 2, *self._keys(name), self.size_grace)
+            size, expires_at = int(size), int(expires_at)
+            if expires_at > 0:
+                await self.redis_client.zadd(self.expires_key, {name: expires_at})
+                continue
+            await self.redis_client.zrem(self.expires_key, name)
+            if size >= 0:
+                await self.redis_client.decrby(self.total_key, size)
+                self.counts['expired'] += 1
+                freed += size
+        total, sessions = await asyncio.gather(self.redis_client.get(self.total_key),
+                                               self.redis_client.zcard(self.expires_key))
+        self.live_bytes = int(total or 0)
+        self.live_sessions = sessions
+        session_metrics.record_live(self.live_bytes, self.live_sessions)
+        if freed:
+            logger.info(f'만료 면접 세션 정리 {freed} bytes, 남은 세션 {sessions}개 {self.live_bytes} bytes')
+        return freed
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweeper())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _sweeper(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'면접 세션 정리 오류: {e}')
+            await asyncio.sleep(SESSION_SWEEP_SEC)
+
+    def stats(self):
+        return {
+            'ttl': self.ttl,
+            'archived_ttl': self.archived_ttl,
+            'archive': bool(self.archive_bucket),
+            'live_bytes': self.live_bytes,
+            'live_sessions': self.live_sessions,
+            **self.counts,
+        }
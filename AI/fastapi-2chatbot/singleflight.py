@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# lock 은 생성 제한 시간(LLM_TIMEOUT_SEC)과 문서 parsing 을 합친 것보다 길게
+SINGLEFLIGHT_LOCK_MS = int(os.getenv('SINGLEFLIGHT_LOCK_MS', '150000'))
+# 재시도가 같은 결과를 받을 수 있는 시간
+SINGLEFLIGHT_RESULT_TTL_SEC = int(os.getenv('SINGLEFLIGHT_RESULT_TTL_SEC', '300'))
+SINGLEFLIGHT_POLL_SEC = float(os.getenv('SINGLEFLIGHT_POLL_SEC', '0.25'))
+
+# 자기가 잡은 lock 일 때만 해제
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class FallbackResult(Exception):
+    # 생성 실패 시 대신 돌려주는 응답(검증되지 않은 원문 등): 이 요청에는 result 로 응답하지만
+    # 결과 캐시에 저장하지 않고 합류한 요청과도 공유하지 않음 (재시도는 다시 생성)
+    def __init__(self, result):
+        super().__init__('fallback result')
+        self.result = result
+
+
+def flight_key(itv_no, endpoint, turn, *parts):
+    # 면접/turn 단위 키 + 요청 내용 digest (같은 turn 이라도 다른 답변이면 새로 생성)
+    digest = hashlib.sha256('\x00'.join(str(part) for part in parts).encode()).hexdigest()[:16]
+    return f'{itv_no}:{endpoint}:{turn}:{digest}'
+
+
+class _Flight:
+    def __init__(self, future, is_disconnected):
+        self.future = future
+        self.watchers = [is_disconnected]
+
+    async def is_disconnected(self):
+        # 합류한 요청이 모두 끊겼을 때만 생성 취소 (재시도는 보통 첫 요청이 끊긴 뒤에 옴)
+        for check in self.watchers:
+            if check is None or not await check():
+                return False
+        return True
+
+
+class SingleFlight:
+    # 같은 키의 중복 요청(front 재시도, mesh 재시도)을 생성 한 번으로 합침
+    # 같은 프로세스: 진행 중인 Future 에 합류 / 다른 pod: Redis lock(SET NX PX) 확인 후 결과 캐시를 기다림
+    # 성공한 결과만 저장/공유, 예외나 FallbackResult 는 저장하지 않고 lock 만 풀어 다음 요청이 다시 생성
+    def __init__(self, redis_client, prefix='singleflight', lock_ms=SINGLEFLIGHT_LOCK_MS,
+                 result_ttl=SINGLEFLIGHT_RESULT_TTL_SEC):
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.lock_ms = lock_ms
+        self.result_ttl = result_ttl
+        self._flights = {}
+        self.counts = {'leader': 0, 'joined': 0, 'cached': 0, 'waited': 0, 'fallback': 0}
+
+    async def run(self, key, fn, is_disconnected=None):
+        # fn(is_disconnected): coroutine 함수, 결과는 JSON 으로 저장 가능한 값 (실패 응답은 FallbackResult 로 raise)
+        # fn 이 받는 is_disconnected 는 이 키에 합류한 모든 요청이 끊겼을 때 True
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.counts['joined'] += 1
+            logger.info(f'single-flight 진행 중인 생성에 합류: {key}')
+            future = flight.future
+            flight.watchers.append(is_disconnected)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.done():
+                    raise
+            except Exception:
+                pass
+            # 먼저 온 요청이 끊기거나 실패하면 이 요청이 직접 생성
+            logger.error(f'single-flight 선행 요청 실패, 다시 생성: {key}')
+
+        while True:
+            result = await self._cached(key)
+            if result is not None:
+                self.counts['cached'] += 1
+                logger.info(f'single-flight 저장된 결과 반환: {key}')
+                return result
+            token = await self._acquire(key)
+            if token is not None or key in self._flights:
+                break
+            # 다른 pod 가 생성 중, lock 이 풀릴 때까지 결과를 기다림
+            if not await self._wait_remote(key):
+                break
+        if key in self._flights:
+            await self._release(key, token)
+            return await self.run(key, fn, is_disconnected)
+
+        future = asyncio.get_running_loop().create_future()
+        flight = _Flight(future, is_disconnected)
+        self._flights[key] = flight
+        self.counts['leader'] += 1
+        try:
+            result = await fn(flight.is_disconnected)
+            await self._store(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except FallbackResult as e:
+            self.counts['fallback'] += 1
+            logger.error(f'single-flight 생성 실패 응답, 저장하지 않음: {key}')
+            future.set_exception(e)
+            future.exception()
+            return e.result
+        except Exception as e:
+            future.set_exception(e)
+            # 합류한 요청이 없을 때 "exception was never retrieved" 경고 방지
+            future.exception()
+            raise
+        finally:
+            self._flights.pop(key, None)
+            await self._release(key, token)
+
+    def _lock_key(self, key):
+        return f'{self.prefix}:lock:{key}'
+
+    def _result_key(self, key):
+        return f'{self.prefix}:result:{key}'
+
+    async def _cached(self, key):
+        try:
+            value = await self.redis_client.get(self._result_key(key))
+            return json.loads(value) if value is not None else None
+        except Exception as e:
+            logger.error(f'single-flight 결과 조회 실패: {e}')
+            return None
+
+    async def _store(self, key, result):
+        try:
+            await self.redis_client.set(self._result_key(key), json.dumps(result), ex=self.result_ttl)
+        except Exception as e:
+            logger.error(f'single-flight 결과 저장 실패: {e}')
+
+    async def _acquire(self, key):
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis_client.set(self._lock_key(key), token, nx=True, px=self.lock_ms)
+        except Exception as e:
+            # Redis 장애 시에는 중복 제거 없이 생성 (요청 실패보다 나음)
+            logger.error(f'single-flight lock 실패: {e}')
+            return ''
+        return token if acquired else None
+
+    async def _release(self, key, token):
+        if not token:
+            return
+        try:
+            await self.redis_client.eval(RELEASE_SCRIPT, 1, self._lock_key(key), token)
+        except Exception as e:
+            logger.error(f'single-flight lock 해제 실패: {e}')
+
+    async def _wait_remote(self, key):
+        # lock 이 풀리면 True (결과 확인 후 필요하면 다시 lock 시도), 제한 시간을 넘기면 False
+        self.counts['waited'] += 1
+        logger.info(f'single-flight 다른 인스턴스의 생성 대기: {key}')
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_ms / 1000
+        while loop.time() < deadline:
+            await asyncio.sleep(SINGLEFLIGHT_POLL_SEC)
+            try:
+                if not await self.redis_client.exists(self._lock_key(key)):
+                    return True
+            except Exception as e:
+                logger.error(f'single-flight lock 확인 실패: {e}')
+                return False
+        return False
+
+    def stats(self):
+        return {'in_flight': len(self._flights), **self.counts}
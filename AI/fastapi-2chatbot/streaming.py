@@ -0,0 +1,139 @@
+import json
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class JSONFieldStream:
+    # Bedrock이 보내는 텍스트 조각을 받아 최상위 JSON 문자열 필드 하나(예: question)의 값을
+    # 도착하는 대로 디코딩해서 돌려준다. 첫 '{' 이전의 설명 문구나 다른 필드는 건너뛴다.
+    def __init__(self, field):
+        self.field = field
+        self.value = ''
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._string = ''
+        self._last_key = None
+        self._after_colon = False
+        self._in_value = False
+        self._pending = ''  # 조각 경계에서 잘린 escape 시퀀스 (\uXXXX 등)
+
+    def feed(self, chunk):
+        out = []
+        i = 0
+        n = len(chunk)
+        while i < n and not self.done:
+            if self._in_value:
+                i = self._feed_value(chunk, i, out)
+                continue
+            ch = chunk[i]
+            i += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    if self._depth == 1:
+                        self._string += ch
+                elif ch == '\\':
+                    self._escape = True
+                    if self._depth == 1:
+                        self._string += ch
+                elif ch == '"':
+                    self._in_string = False
+                    if self._expect_key:
+                        self._last_key = self._decode_key(self._string)
+                        self._expect_key = False
+                else:
+                    if self._depth == 1:
+                        self._string += ch
+                continue
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+            if ch == '"':
+                if self._depth == 1 and self._after_colon and self._last_key == self.field:
+                    self._in_value = True
+                    self._after_colon = False
+                    continue
+                self._in_string = True
+                self._string = ''
+                self._after_colon = False
+            elif ch in '{[':
+                self._depth += 1
+                self._after_colon = False
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    self.done = True
+            elif ch == ':' and self._depth == 1:
+                self._after_colon = True
+            elif ch == ',' and self._depth == 1:
+                self._expect_key = True
+                self._last_key = None
+            elif not ch.isspace():
+                self._after_colon = False
+        text = ''.join(out)
+        self.value += text
+        return text
+
+    def _feed_value(self, chunk, i, out):
+        n = len(chunk)
+        while i < n:
+            ch = chunk[i]
+            if self._pending:
+                self._pending += ch
+                i += 1
+                decoded = self._decode_pending()
+                if decoded is not None:
+                    out.append(decoded)
+                continue
+            if ch == '\\':
+                self._pending = ch
+                i += 1
+                continue
+            if ch == '"':
+                self._in_value = False
+                self.done = True
+                return i + 1
+            # 일반 문자는 연속 구간을 한 번에 복사
+            j = i
+            while j < n and chunk[j] not in '\\"':
+                j += 1
+            out.append(chunk[i:j])
+            i = j
+        return i
+
+    def _decode_pending(self):
+        seq = self._pending
+        if len(seq) < 2:
+            return None
+        if seq[1] != 'u':
+            self._pending = ''
+            return _ESCAPES.get(seq[1], seq[1])
+        # \uXXXX, 서로게이트 쌍이면 \uXXXX\uXXXX 12글자가 모일 때까지 대기
+        if len(seq) < 6:
+            return None
+        code = int(seq[2:6], 16)
+        if 0xD800 <= code < 0xDC00:
+            if len(seq) < 12:
+                return None
+            low = int(seq[8:12], 16)
+            self._pending = ''
+            return chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00))
+        self._pending = ''
+        return chr(code)
+
+    @staticmethod
+    def _decode_key(raw):
+        try:
+            return json.loads(f'"{raw}"')
+        except json.JSONDecodeError:
+            return raw
+
+
+def sse_event(event, data):
+    payload = json.dumps(data, ensure_ascii=False)
+    return f'event: {event}\ndata: {payload}\n\n'
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+logger = logging.getLogger(__name__)
+
+# JSON 이 깨졌을 때 깨진 부분만 다시 보내 고치는 작은 모델 호출 (전체 prompt 재생성 대신)
+STRUCTURED_REPAIR_MODEL_ID = os.getenv('STRUCTURED_REPAIR_MODEL_ID', 'anthropic.claude-3-haiku-20240307-v1:0')
+STRUCTURED_MAX_REASKS = int(os.getenv('STRUCTURED_MAX_REASKS', '1'))
+STRUCTURED_REPAIR_MAX_TOKENS = int(os.getenv('STRUCTURED_REPAIR_MAX_TOKENS', '4096'))
+STRUCTURED_REPAIR_TIMEOUT_SEC = float(os.getenv('STRUCTURED_REPAIR_TIMEOUT_SEC', '30'))
+
+SYSTEM_REPAIR = '''
+    역할:
+    깨진 JSON 을 주어진 필드 형식에 맞는 올바른 JSON 으로 고침
+
+    지시사항:
+    1. 입력의 내용(문장, 점수)은 바꾸지 말고 JSON 문법만 고쳐주세요.
+    2. 설명 없이 JSON 하나만 반환해주세요.
+
+    Output fields: '''
+
+
+class QuestionOutput(BaseModel):
+    # /question/coverletter, /question/chat
+    model_config = ConfigDict(extra='ignore')
+    question: str = Field(min_length=1)
+
+
+class ReportOutput(BaseModel):
+    # /question/report ("%, 설명" 형식 문자열, 숫자로 오면 문자열로 변환)
+    # QuestionOutput 처럼 모든 항목 필수: 빠진 항목이 있으면 재요청하고, 그래도 없으면 실패로 처리 (캐시/보관하지 않음)
+    model_config = ConfigDict(extra='ignore')
+    relevant_experience: str = Field(min_length=1)
+    problem_solving: str = Field(min_length=1)
+    communication_skills: str = Field(min_length=1)
+    initiative: str = Field(min_length=1)
+    situation: str = Field(min_length=1)
+    task: str = Field(min_length=1)
+    action: str = Field(min_length=1)
+    result: str = Field(min_length=1)
+    overall_score: str = Field(min_length=1)
+    encouragement: str = Field(min_length=1)
+
+    @field_validator('*', mode='before')
+    @classmethod
+    def to_text(cls, value):
+        if isinstance(value, (int, float)):
+            return str(value)
+        return value
+
+
+def json_fragment(message_content):
+    # 첫 '{' 부터 마지막 '}' 까지, 닫히지 않았으면(토큰 제한으로 잘림) 끝까지
+    start_index = message_content.find('{')
+    if start_index < 0:
+        return ''
+    end_index = message_content.rfind('}') + 1
+    if end_index <= start_index:
+        return message_content[start_index:]
+    return message_content[start_index:end_index]
+
+
+def _strip_trailing_comma(out):
+    i = len(out) - 1
+    while i >= 0 and out[i] in ' \t\r\n':
+        i -= 1
+    if i >= 0 and out[i] == ',':
+        del out[i]
+
+
+def repair_json(fragment):
+    # 모델이 자주 내는 JSON 문법 오류만 고침:
+    # 문자열 안의 줄바꿈/탭, 닫는 괄호 앞의 쉼표, 잘려서 닫히지 않은 문자열과 괄호
+    out = []
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in fragment:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == '\n':
+                ch = '\\n'
+            elif ch == '\r':
+                ch = '\\r'
+            elif ch == '\t':
+                ch = '\\t'
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+        out.append(ch)
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    _strip_trailing_comma(out)
+    while stack:
+        out.append(stack.pop())
+    return ''.join(out)
+
+
+def loads_tolerant(message_content):
+    # (dict 또는 None, 사용한 단계) 단계: 'fast' | 'repaired' | None
+    fragment = json_fragment(message_content)
+    if not fragment:
+        return None, None
+    try:
+        return json.loads(fragment), 'fast'
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(fragment)), 'repaired'
+    except json.JSONDecodeError:
+        return None, None
+
+
+def _validate(schema, data):
+    if not isinstance(data, dict):
+        return None
+    try:
+        return schema.model_validate(data)
+    except ValidationError as e:
+        logger.error(f'{schema.__name__} 검증 실패: {e.errors()[:3]}')
+        return None
+
+
+class StructuredOutput:
+    # LLM 응답 -> pydantic schema (빠른 parse -> 로컬 repair -> 깨진 부분만 재요청, 재요청 횟수 제한)
+    def __init__(self, llm, model=STRUCTURED_REPAIR_MODEL_ID, max_reasks=STRUCTURED_MAX_REASKS):
+        self.llm = llm
+        self.model = model
+        self.max_reasks = max_reasks
+        self.counts = {'fast': 0, 'repaired': 0, 'reasked': 0, 'failed': 0}
+
+    async def parse(self, schema, message_content, is_disconnected=None):
+        data, stage = loads_tolerant(message_content)
+        result = _validate(schema, data)
+        if result is not None:
+            self.counts[stage] += 1
+            if stage == 'repaired':
+                logger.info(f'{schema.__name__} JSON 로컬 복구')
+            return result
+
+        fragment = json_fragment(message_content) or message_content
+        for attempt in range(self.max_reasks):
+            logger.error(f'{schema.__name__} JSON 파싱 실패, 재요청 ({attempt + 1}/{self.max_reasks})')
+            try:
+                fixed = await self._reask(schema, fragment, is_disconnected)
+            except Exception as e:
+                logger.error(f'{schema.__name__} JSON 재요청 실패: {e}')
+                break
+            data, _ = loads_tolerant(fixed)
+            result = _validate(schema, data)
+            if result is not None:
+                self.counts['reasked'] += 1
+                return result
+            fragment = json_fragment(fixed) or fixed
+
+        self.counts['failed'] += 1
+        logger.error(f'{schema.__name__} JSON 파싱 최종 실패')
+        return None
+
+    async def _reask(self, schema, fragment, is_disconnected):
+        fields = json.dumps({name: "" for name in schema.model_fields}, ensure_ascii=False)
+        message = await self.llm.create(
+            is_disconnected=is_disconnected,
+            timeout=STRUCTURED_REPAIR_TIMEOUT_SEC,
+            model=self.model,
+            # 고친 JSON 은 입력과 길이가 비슷함
+            max_tokens=min(STRUCTURED_REPAIR_MAX_TOKENS, max(256, len(fragment))),
+            temperature=0,
+            system=SYSTEM_REPAIR + fields,
+            messages=[{"role": "user", "content": [{"type": "text", "text": fragment}]}],
+        )
+        return message.content[0].text
+
+    def stats(self):
+        return dict(self.counts)
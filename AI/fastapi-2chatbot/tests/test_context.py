@@ -0,0 +1,119 @@
+# ContextManager 테스트: 예산 안/밖 메시지 구성, turn 요약 저장/재사용, 요약 실패 시 원문 대체
+import asyncio
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context import ContextManager, summary_field
+from conversation import build_chat_messages
+from history import InterviewHistory, Turn
+from tokens import estimate_tokens
+
+
+class FakeMessages:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    async def create(self, **kwargs):
+        text = kwargs['messages'][0]['content'][0]['text']
+        self.calls.append(text)
+        if self.fail:
+            raise RuntimeError('bedrock')
+        question = text.split('\n')[0].removeprefix('Question: ')
+        return SimpleNamespace(content=[SimpleNamespace(text=f'{question} 요약')], usage=None)
+
+
+def make_history(turn_count, answer_chars=400):
+    turns = [Turn(number=i, question=f'질문{i}', answer='가' * answer_chars) for i in range(1, turn_count + 1)]
+    return InterviewHistory(itv_no='itv1', cover_letter='자기소개서', turns=turns)
+
+
+def make_manager(budget, keep_turns=2, fail=False):
+    messages = FakeMessages(fail)
+    manager = ContextManager(SimpleNamespace(messages=messages), fakeredis.aioredis.FakeRedis(decode_responses=True),
+                             budget=budget, keep_turns=keep_turns)
+    return manager, messages
+
+
+async def drain(manager):
+    await asyncio.gather(*list(manager._tasks.values()), return_exceptions=True)
+
+
+def message_tokens(messages):
+    return sum(estimate_tokens(block['text']) for message in messages for block in message['content'])
+
+
+def test_under_budget_keeps_full_history():
+    async def main():
+        manager, llm = make_manager(budget=100000)
+        history = make_history(3)
+        messages = await manager.build(history, '이번 대답', system='system')
+        await drain(manager)
+        return manager, llm, history, messages
+
+    manager, llm, history, messages = asyncio.run(main())
+    assert messages == build_chat_messages(history.cover_letter, history.turns, '이번 대답')
+    assert manager.counts['full'] == 1 and llm.calls == []
+
+
+def test_over_budget_summarizes_older_turns_once():
+    async def main():
+        manager, llm = make_manager(budget=1500)
+        history = make_history(5)
+        first = await manager.build(history, '이번 대답')
+        await drain(manager)
+        calls = len(llm.calls)
+        stored = await manager.redis_client.hgetall('itv1')
+        second = await manager.build(history, '이번 대답')
+        await drain(manager)
+        return manager, llm, first, second, calls, stored
+
+    manager, llm, first, second, calls, stored = asyncio.run(main())
+    # 자기소개서 + 요약, 최근 2 turn 의 질문/대답
+    assert len(first) == 1 + 2 * 2
+    summary = first[0]['content'][1]['text']
+    assert '1. 질문1 요약' in summary and '3. 질문3 요약' in summary
+    assert [message['content'][0]['text'] for message in first[1::2]] == ['질문4', '질문5']
+    assert first[-1]['content'][0]['text'] == '이번 대답'
+    assert message_tokens(first) <= 1500
+    # 요약은 한 번만 만들고 세션 해시에 JSON 으로 저장 (다음 turn 에 창 밖으로 나갈 turn 4 는 미리 생성)
+    assert json.loads(stored[summary_field(1)]) == '질문1 요약'
+    assert summary_field(4) in stored
+    assert len(llm.calls) == calls == 4
+    assert second == first
+    assert manager.counts['compacted'] == 2 and manager.counts['over_budget'] == 0
+
+
+def test_tight_budget_keeps_one_turn_and_drops_oldest_summaries():
+    async def main():
+        manager, llm = make_manager(budget=70, keep_turns=3)
+        messages = await manager.build(make_history(8), '이번 대답')
+        await drain(manager)
+        return manager, messages
+
+    manager, messages = asyncio.run(main())
+    assert len(messages) == 1 + 2
+    assert message_tokens(messages) <= 70
+    summary = messages[0]['content'][1]['text'] if len(messages[0]['content']) > 1 else ''
+    assert '1. 질문1 요약' not in summary and '7. 질문7 요약' in summary
+
+
+def test_failed_summary_falls_back_to_truncated_text_without_storing():
+    async def main():
+        manager, llm = make_manager(budget=1500, fail=True)
+        messages = await manager.build(make_history(4, answer_chars=500), '이번 대답')
+        await drain(manager)
+        return manager, messages, await manager.redis_client.hgetall('itv1')
+
+    manager, messages, stored = asyncio.run(main())
+    summary = messages[0]['content'][1]['text']
+    assert '질문: 질문1 / 대답: ' + '가' * 200 in summary
+    assert '가' * 201 not in summary
+    assert stored == {}
+    assert manager.counts['summarized'] == 0
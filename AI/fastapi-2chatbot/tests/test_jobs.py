@@ -0,0 +1,172 @@
+# ReportJobQueue 테스트: BLMOVE worker 처리, 중복 submit, heartbeat, processing list 의 stale job 재등록
+import asyncio
+import json
+import os
+import sys
+import time
+
+import fakeredis.aioredis
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs
+from jobs import ReportJobQueue
+
+
+async def wait_for(queue, job_id, statuses=jobs.TERMINAL, timeout=3):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = await queue.get(job_id)
+        if job is not None and job['status'] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f'job {job_id} 가 {statuses} 상태가 되지 않음')
+
+
+async def put_processing(queue, job_id, status, updated):
+    job = {'job_id': job_id, 'itv_no': job_id, 'question_number': 1,
+           'status': status, 'created': updated, 'updated': updated}
+    await queue.redis_client.set(queue.job_key(job_id), json.dumps(job))
+    await queue.redis_client.lpush(queue.processing_key, job_id)
+
+
+def test_requeue_stale_processing_entries(monkeypatch):
+    monkeypatch.setattr(jobs, 'REPORT_JOB_STALE_SEC', 60)
+
+    async def main():
+        async def handler(itv_no, question_number):
+            return {}
+
+        queue = ReportJobQueue(fakeredis.aioredis.FakeRedis(decode_responses=True), handler)
+        now = time.time()
+        await put_processing(queue, 'stale', jobs.RUNNING, now - 120)
+        await put_processing(queue, 'fresh', jobs.RUNNING, now)
+        await put_processing(queue, 'done', jobs.DONE, now - 120)
+        # job 해시는 TTL 로 사라지고 processing 항목만 남은 경우
+        await queue.redis_client.lpush(queue.processing_key, 'missing')
+        await queue._requeue_stale()
+        client = queue.redis_client
+        return (queue, await client.lrange(queue.processing_key, 0, -1),
+                await client.lrange(queue.queue_key, 0, -1), await queue.get('stale'))
+
+    queue, processing, queued, stale = asyncio.run(main())
+    assert processing == ['fresh']
+    assert queued == ['stale']
+    assert stale['status'] == jobs.QUEUED
+    assert queue.counts['requeued'] == 1
+
+
+def test_requeued_job_is_run_by_worker(monkeypatch):
+    monkeypatch.setattr(jobs, 'REPORT_QUEUE_BLOCK_SEC', 0.05)
+
+    async def main():
+        calls = []
+
+        async def handler(itv_no, question_number):
+            calls.append(itv_no)
+            return {'overall_score': '90'}
+
+        queue = ReportJobQueue(fakeredis.aioredis.FakeRedis(decode_responses=True), handler, workers=1)
+        await put_processing(queue, 'stale', jobs.RUNNING, time.time() - 2 * jobs.REPORT_JOB_STALE_SEC)
+        queue.start()
+        try:
+            job = await wait_for(queue, 'stale', (jobs.DONE,))
+        finally:
+            await queue.stop()
+        return calls, job, await queue.redis_client.llen(queue.processing_key)
+
+    calls, job, processing = asyncio.run(main())
+    assert calls == ['stale']
+    assert job['result'] == {'overall_score': '90'}
+    assert processing == 0
+
+
+def test_submit_deduplicates_and_caches(monkeypatch):
+    monkeypatch.setattr(jobs, 'REPORT_QUEUE_BLOCK_SEC', 0.05)
+
+    async def main():
+        release = asyncio.Event()
+        calls = []
+
+        async def handler(itv_no, question_number):
+            calls.append(itv_no)
+            await release.wait()
+            return {'overall_score': '70'}
+
+        queue = ReportJobQueue(fakeredis.aioredis.FakeRedis(decode_responses=True), handler, workers=2)
+        queue.start()
+        try:
+            first, second = await asyncio.gather(queue.submit('itv1', 5), queue.submit('itv1', 5))
+            await wait_for(queue, first['job_id'], (jobs.RUNNING,))
+            release.set()
+            done = await wait_for(queue, first['job_id'])
+            await queue.store_cached('itv1', 5, done['result'])
+            cached = await queue.submit('itv1', 5)
+        finally:
+            await queue.stop()
+        return queue, first, second, cached, calls
+
+    queue, first, second, cached, calls = asyncio.run(main())
+    assert first['job_id'] == second['job_id']
+    assert calls == ['itv1']
+    assert cached['status'] == jobs.DONE and cached['result'] == {'overall_score': '70'}
+    assert queue.counts['cached'] == 1
+
+
+def test_heartbeat_keeps_long_job_from_requeue(monkeypatch):
+    monkeypatch.setattr(jobs, 'REPORT_QUEUE_BLOCK_SEC', 0.05)
+    monkeypatch.setattr(jobs, 'REPORT_JOB_STALE_SEC', 0.3)
+    monkeypatch.setattr(jobs, 'REPORT_JOB_HEARTBEAT_SEC', 0.05)
+
+    async def main():
+        calls = []
+
+        async def handler(itv_no, question_number):
+            calls.append(itv_no)
+            await asyncio.sleep(1)
+            return {'overall_score': '80'}
+
+        queue = ReportJobQueue(fakeredis.aioredis.FakeRedis(decode_responses=True), handler, workers=2)
+        queue.start()
+        try:
+            job = await queue.submit('itv1', 5)
+            await wait_for(queue, job['job_id'], (jobs.RUNNING,))
+            await asyncio.sleep(0.6)
+            await queue._requeue_stale()
+            done = await wait_for(queue, job['job_id'])
+        finally:
+            await queue.stop()
+        return queue, calls, done
+
+    queue, calls, done = asyncio.run(main())
+    assert calls == ['itv1']
+    assert done['status'] == jobs.DONE
+    assert queue.counts['requeued'] == 0
+
+
+def test_failed_and_empty_results_release_active_key(monkeypatch):
+    monkeypatch.setattr(jobs, 'REPORT_QUEUE_BLOCK_SEC', 0.05)
+
+    async def main():
+        results = [RuntimeError('bedrock'), {'error': 'Report 생성 실패'}]
+
+        async def handler(itv_no, question_number):
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        queue = ReportJobQueue(fakeredis.aioredis.FakeRedis(decode_responses=True), handler, workers=1,
+                               is_empty=lambda result: 'error' in result)
+        queue.start()
+        try:
+            failed = await wait_for(queue, (await queue.submit('itv1', 5))['job_id'])
+            empty = await wait_for(queue, (await queue.submit('itv1', 5))['job_id'])
+        finally:
+            await queue.stop()
+        return queue, failed, empty
+
+    queue, failed, empty = asyncio.run(main())
+    assert failed['status'] == jobs.FAILED and failed['error'] == 'bedrock'
+    assert empty['status'] == jobs.NO_REPORT and empty['job_id'] != failed['job_id']
+    assert queue.counts['failed'] == 1 and queue.counts['no_report'] == 1
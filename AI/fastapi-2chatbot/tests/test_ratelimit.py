@@ -0,0 +1,127 @@
+# RateLimiter 테스트: Redis token bucket (fakeredis 가 Lua script 실행) 의 허용/대기/거절, 정산, 장애 시 통과
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+import pytest
+from redis.crc import key_slot
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ratelimit import RateLimiter, RateLimitExceededError, request_tokens
+
+MODEL = 'anthropic.claude-3-5-sonnet-20240620-v1:0'
+
+
+def request(text='hi', max_tokens=3):
+    return {'model': MODEL, 'messages': [{'role': 'user', 'content': text}], 'max_tokens': max_tokens}
+
+
+def limiter(client=None, **kwargs):
+    kwargs.setdefault('max_wait', 0)
+    return RateLimiter(client or fakeredis.aioredis.FakeRedis(decode_responses=True), limits={}, **kwargs)
+
+
+async def tpm_level(rate_limiter):
+    return float(await rate_limiter.redis_client.hget(f'ratelimit:{{{MODEL}}}:tpm', 'tokens'))
+
+
+def test_unlimited_by_default_without_redis_calls():
+    class NoRedis:
+        async def eval(self, *args):
+            raise AssertionError('should not be called')
+
+    rate_limiter = limiter(NoRedis(), rpm=0, tpm=0)
+    assert asyncio.run(rate_limiter.acquire(request())) is None
+
+
+def test_rejects_when_rpm_is_spent():
+    async def main():
+        rate_limiter = limiter(rpm=2, tpm=0)
+        reservations = [await rate_limiter.acquire(request()) for _ in range(2)]
+        with pytest.raises(RateLimitExceededError) as error:
+            await rate_limiter.acquire(request())
+        return rate_limiter, reservations, error.value
+
+    rate_limiter, reservations, error = asyncio.run(main())
+    assert all(reservation is not None for reservation in reservations)
+    # 2 RPM: 요청 하나가 다시 차는 데 30초
+    assert 29 <= error.retry_after <= 30
+    assert rate_limiter.counts == {'allowed': 2, 'delayed': 0, 'rejected': 1, 'fail_open': 0}
+
+
+def test_waits_for_tokens_within_deadline():
+    async def main():
+        rate_limiter = limiter(rpm=0, tpm=600, max_wait=2)
+        # bucket 전체(600)를 한 번에 사용 -> 다음 요청(4 토큰)은 초당 10 토큰씩 차는 동안 대기
+        await rate_limiter.acquire(request('a' * 2400))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        reservation = await rate_limiter.acquire(request())
+        return rate_limiter, reservation, loop.time() - start
+
+    rate_limiter, reservation, waited = asyncio.run(main())
+    assert reservation.tokens == request_tokens(request())
+    assert 0.3 <= waited < 2
+    assert rate_limiter.counts['delayed'] == 1
+
+
+def test_settle_refunds_failed_call_and_charges_extra_usage():
+    async def main():
+        rate_limiter = limiter(rpm=0, tpm=100000)
+        reservation = await rate_limiter.acquire(request(max_tokens=500))
+        reserved = await tpm_level(rate_limiter)
+        await rate_limiter.settle(reservation, None)
+        refunded = await tpm_level(rate_limiter)
+        reservation = await rate_limiter.acquire(request(max_tokens=500))
+        usage = SimpleNamespace(input_tokens=1000, output_tokens=1000)
+        await rate_limiter.settle(reservation, usage)
+        charged = await tpm_level(rate_limiter)
+        return reservation.tokens, reserved, refunded, charged
+
+    tokens, reserved, refunded, charged = asyncio.run(main())
+    assert 100000 - reserved == pytest.approx(tokens, abs=5)
+    # 실패한 호출은 예약분 전부 반환 (refill 오차 몇 토큰 허용)
+    assert refunded == pytest.approx(100000, abs=5)
+    # 예약보다 많이 쓴 만큼 추가 차감
+    assert refunded - charged == pytest.approx(2000, abs=5)
+
+
+def test_settle_skips_when_usage_matches_reservation():
+    class CountingRedis(fakeredis.aioredis.FakeRedis):
+        evals = 0
+
+        async def eval(self, *args):
+            CountingRedis.evals += 1
+            return await super().eval(*args)
+
+    async def main():
+        rate_limiter = limiter(CountingRedis(decode_responses=True), rpm=10, tpm=10000)
+        reservation = await rate_limiter.acquire(request())
+        await rate_limiter.settle(reservation, SimpleNamespace(input_tokens=reservation.tokens, output_tokens=0))
+
+    asyncio.run(main())
+    assert CountingRedis.evals == 1
+
+
+def test_redis_error_fails_open_and_is_counted():
+    class BrokenRedis:
+        async def eval(self, *args):
+            raise ConnectionError('down')
+
+    rate_limiter = limiter(BrokenRedis(), rpm=1, tpm=0)
+    assert asyncio.run(rate_limiter.acquire(request())) is None
+    assert rate_limiter.counts['fail_open'] == 1 and rate_limiter.counts['allowed'] == 0
+
+
+def test_bucket_keys_share_a_cluster_slot():
+    async def main():
+        rate_limiter = limiter(rpm=5, tpm=1000)
+        await rate_limiter.acquire(request())
+        return sorted(await rate_limiter.redis_client.keys('*'))
+
+    keys = asyncio.run(main())
+    assert keys == [f'ratelimit:{{{MODEL}}}:rpm', f'ratelimit:{{{MODEL}}}:tpm']
+    assert len({key_slot(key.encode()) for key in keys}) == 1
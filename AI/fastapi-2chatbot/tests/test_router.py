@@ -0,0 +1,117 @@
+# LLM router 테스트: 지연 시간/오류율을 설정한 stub provider 로 순위, hedge, 장애 전환 확인
+# 실행: AI/fastapi-2chatbot 에서 python -m pytest tests
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import router
+from llm import AsyncLLM
+from ratelimit import RateLimitExceededError
+from router import LLMRouter, Provider, StubClient, build_router
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def stub_provider(name, **kwargs):
+    return Provider(name, AsyncLLM(StubClient(text=name, **kwargs)), name)
+
+
+def ask(llm_router):
+    return asyncio.run(llm_router.create(messages=MESSAGES, max_tokens=10))
+
+
+@pytest.fixture(autouse=True)
+def fast_router(monkeypatch):
+    monkeypatch.setattr(router, 'ROUTER_MIN_SAMPLES', 3)
+    monkeypatch.setattr(router, 'ROUTER_HEDGE_DEFAULT_SEC', 0.05)
+
+
+def test_prefers_configured_order_without_samples():
+    slow = stub_provider('slow', latency=0.02)
+    fast = stub_provider('fast', latency=0.0)
+    llm_router = LLMRouter([slow, fast], hedge=False)
+    assert llm_router.ranked() == [slow, fast]
+    assert ask(llm_router).content[0].text == 'slow'
+
+
+def test_ranks_by_observed_p50():
+    slow = stub_provider('slow', latency=0.02)
+    fast = stub_provider('fast', latency=0.0)
+    llm_router = LLMRouter([slow, fast], hedge=False)
+    for _ in range(3):
+        slow.record(0.02)
+        fast.record(0.001)
+    assert llm_router.ranked() == [fast, slow]
+    assert ask(llm_router).content[0].text == 'fast'
+
+
+def test_unhealthy_provider_goes_last():
+    flaky = stub_provider('flaky', latency=0.0)
+    steady = stub_provider('steady', latency=0.0)
+    for _ in range(3):
+        flaky.record(0.001)
+        flaky.record(ok=False)
+        flaky.record(ok=False)
+        steady.record(0.01)
+    assert not flaky.healthy()
+    assert LLMRouter([flaky, steady]).ranked() == [steady, flaky]
+
+
+def test_hedges_slow_primary_and_cancels_loser():
+    slow = stub_provider('slow', latency=1.0)
+    fast = stub_provider('fast', latency=0.0)
+    llm_router = LLMRouter([slow, fast], hedge=True)
+    assert ask(llm_router).content[0].text == 'fast'
+    assert slow.hedged == 1 and fast.won == 1
+    # 취소된 primary 는 지연 시간/오류 표본에 남지 않음
+    assert not slow.outcomes
+    assert len(fast.latencies) == 1
+
+
+def test_no_hedge_when_primary_is_fast_enough():
+    primary = stub_provider('primary', latency=0.0)
+    backup = stub_provider('backup', latency=0.0)
+    assert ask(LLMRouter([primary, backup], hedge=True)).content[0].text == 'primary'
+    assert primary.hedged == 0
+    assert backup.llm.client.messages.calls == 0
+
+
+def test_fails_over_to_next_provider():
+    broken = stub_provider('broken', latency=0.0, error_rate=1.0)
+    working = stub_provider('working', latency=0.0)
+    llm_router = LLMRouter([broken, working], hedge=False)
+    assert ask(llm_router).content[0].text == 'working'
+    assert broken.error_rate() == 1.0
+    assert working.error_rate() == 0.0
+
+
+def test_raises_last_error_when_all_providers_fail():
+    llm_router = LLMRouter([stub_provider('a', latency=0.0, error_rate=1.0),
+                            stub_provider('b', latency=0.0, error_rate=1.0)])
+    with pytest.raises(RuntimeError, match='stub provider error'):
+        ask(llm_router)
+
+
+def test_rate_limit_is_not_counted_as_provider_failure():
+    class Limited:
+        async def acquire(self, kwargs):
+            raise RateLimitExceededError('limited', 1.0)
+
+    limited = stub_provider('limited', latency=0.0)
+    limited.llm.rate_limiter = Limited()
+    with pytest.raises(RateLimitExceededError):
+        ask(LLMRouter([limited], hedge=False))
+    assert not limited.outcomes
+
+
+def test_build_router_stub_from_config(monkeypatch):
+    monkeypatch.setattr(router, 'ROUTER_STUB_LATENCY_SEC', 0.25)
+    monkeypatch.setattr(router, 'ROUTER_STUB_ERROR_RATE', 0.1)
+    stub = build_router(None, 'bedrock-model', names='stub').providers[0].llm.client.messages
+    assert (stub.latency, stub.error_rate) == (0.25, 0.1)
+    stub = build_router(None, 'bedrock-model', names='stub', stub={'latency': 0.0}).providers[0].llm.client.messages
+    assert (stub.latency, stub.error_rate) == (0.0, 0.0)
@@ -0,0 +1,130 @@
+# SessionStore 테스트: 필드 덮어쓰기/만료/재생성에 걸친 byte 정산, sweeper, 크기 key TTL, S3 보관
+import asyncio
+import json
+import os
+import sys
+
+import fakeredis.aioredis
+from redis.crc import key_slot
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import SessionStore
+
+
+def field_bytes(fields):
+    return sum(len(name.encode()) + len(value.encode()) for name, value in fields.items())
+
+
+def store(**kwargs):
+    return SessionStore(fakeredis.aioredis.FakeRedis(decode_responses=True), **kwargs)
+
+
+async def total(sessions):
+    return int(await sessions.redis_client.get(sessions.total_key) or 0)
+
+
+def test_size_tracks_new_and_overwritten_fields():
+    async def main():
+        sessions = store()
+        await sessions.store('itv1', 'coverletter', '자기소개서')
+        await sessions.store_many('itv1', {'question-1': 'Q1?', 'answer-1': '답변'})
+        await sessions.store('itv1', 'question-1', '더 긴 질문입니다?')
+        await sessions.store('itv2', 'coverletter', 'x' * 100)
+        fields = await sessions.redis_client.hgetall('itv1')
+        return sessions, fields, await sessions.size('itv1'), await sessions.size('itv2'), await total(sessions)
+
+    sessions, fields, size1, size2, all_bytes = asyncio.run(main())
+    assert size1 == field_bytes(fields)
+    assert size2 == len('coverletter') + 100
+    assert all_bytes == size1 + size2
+    assert sessions.live_bytes == all_bytes
+
+
+def test_sweep_subtracts_expired_sessions_once():
+    async def main():
+        sessions = store(ttl=1)
+        await sessions.store('itv1', 'coverletter', 'a' * 10)
+        keep = store(ttl=3600)
+        keep.redis_client = sessions.redis_client
+        await keep.store('itv2', 'coverletter', 'b' * 20)
+        await asyncio.sleep(2.1)
+        freed = await sessions.sweep()
+        again = await keep.sweep()
+        return sessions, freed, again, await total(sessions), await sessions.redis_client.exists(sessions.size_key('itv1'))
+
+    sessions, freed, again, remaining, size_key_left = asyncio.run(main())
+    assert freed == len('coverletter') + 10
+    assert again == 0
+    assert remaining == len('coverletter') + 20
+    assert size_key_left == 0
+    assert sessions.live_sessions == 1 and sessions.counts['expired'] == 1
+
+
+def test_recreated_session_drops_previous_size_before_sweep():
+    async def main():
+        sessions = store()
+        await sessions.store('itv1', 'coverletter', 'a' * 50)
+        # sweeper 가 돌기 전에 세션이 만료되고 다시 만들어진 경우
+        await sessions.redis_client.delete('itv1')
+        await sessions.store('itv1', 'coverletter', 'ab')
+        return await sessions.size('itv1'), await total(sessions)
+
+    assert asyncio.run(main()) == (len('coverletter') + 2, len('coverletter') + 2)
+
+
+def test_sweep_keeps_sessions_whose_ttl_was_extended():
+    async def main():
+        sessions = store()
+        await sessions.store('itv1', 'coverletter', 'abc')
+        await sessions.redis_client.zadd(sessions.expires_key, {'itv1': 0})
+        freed = await sessions.sweep()
+        score = await sessions.redis_client.zscore(sessions.expires_key, 'itv1')
+        now, _ = await sessions.redis_client.time()
+        return freed, score - now, await total(sessions)
+
+    freed, remaining_ttl, all_bytes = asyncio.run(main())
+    assert freed == 0
+    assert remaining_ttl > 3600
+    assert all_bytes == len('coverletter') + 3
+
+
+def test_size_key_expires_after_session_with_grace():
+    async def main():
+        sessions = store(ttl=100, size_grace=50)
+        await sessions.store('itv1', 'coverletter', 'abc')
+        client = sessions.redis_client
+        return await client.ttl('itv1'), await client.ttl(sessions.size_key('itv1'))
+
+    assert asyncio.run(main()) == (100, 150)
+
+
+def test_script_keys_share_the_session_slot():
+    sessions = store()
+    for itv_no in ('12345', 'itv-7'):
+        assert key_slot(itv_no.encode()) == key_slot(sessions.size_key(itv_no).encode())
+
+
+def test_archive_writes_session_and_shortens_ttl():
+    class FakeS3:
+        def __init__(self):
+            self.objects = {}
+
+        async def put(self, bucket, key, body):
+            self.objects[(bucket, key)] = body
+
+    async def main():
+        s3 = FakeS3()
+        sessions = store(s3_storage=s3, archive_bucket='archive', archived_ttl=60)
+        await sessions.store('itv1', 'question-1', json.dumps('질문', ensure_ascii=False))
+        key = await sessions.archive('itv1', 1, {'overall_score': '80'})
+        client = sessions.redis_client
+        now, _ = await client.time()
+        score = await client.zscore(sessions.expires_key, 'itv1')
+        return s3, key, await client.ttl('itv1'), score - now
+
+    s3, key, ttl, remaining = asyncio.run(main())
+    document = json.loads(s3.objects[('archive', key)])
+    assert document['fields'] == {'question-1': '질문'}
+    assert document['report'] == {'overall_score': '80'}
+    assert ttl == 60 and 59 <= remaining <= 60
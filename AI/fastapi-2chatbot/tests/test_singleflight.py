@@ -0,0 +1,122 @@
+# SingleFlight 테스트: 같은 프로세스 합류, 다른 인스턴스의 lock 대기, 성공 결과만 저장, lock 해제 script
+import asyncio
+import os
+import sys
+
+import fakeredis.aioredis
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import singleflight
+from singleflight import RELEASE_SCRIPT, FallbackResult, SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(singleflight, 'SINGLEFLIGHT_POLL_SEC', 0.01)
+
+
+def redis():
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+class Generator:
+    def __init__(self, result=None, error=None, delay=0.05):
+        self.result = result if result is not None else {'response': 'q'}
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self, is_disconnected):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_concurrent_requests_share_one_generation():
+    async def main():
+        flights = SingleFlight(redis())
+        generate = Generator()
+        results = await asyncio.gather(*(flights.run('k', generate) for _ in range(3)))
+        return flights, generate, results
+
+    flights, generate, results = asyncio.run(main())
+    assert results == [{'response': 'q'}] * 3
+    assert generate.calls == 1
+    assert flights.counts['leader'] == 1 and flights.counts['joined'] == 2
+
+
+def test_result_is_cached_and_lock_released():
+    async def main():
+        client = redis()
+        flights = SingleFlight(client)
+        generate = Generator()
+        await flights.run('k', generate)
+        locks = await client.keys('singleflight:lock:*')
+        again = await flights.run('k', generate)
+        return locks, flights, generate, again
+
+    locks, flights, generate, again = asyncio.run(main())
+    assert locks == []
+    assert again == {'response': 'q'}
+    assert generate.calls == 1 and flights.counts['cached'] == 1
+
+
+def test_other_instance_waits_for_lock_and_reads_result():
+    async def main():
+        client = redis()
+        first, second = SingleFlight(client), SingleFlight(client)
+        generate_first, generate_second = Generator(delay=0.1), Generator()
+        leader = asyncio.ensure_future(first.run('k', generate_first))
+        await asyncio.sleep(0.02)
+        follower = await second.run('k', generate_second)
+        return await leader, follower, generate_second.calls, second.counts
+
+    leader, follower, second_calls, counts = asyncio.run(main())
+    assert leader == follower == {'response': 'q'}
+    assert second_calls == 0
+    assert counts['waited'] == 1 and counts['cached'] == 1
+
+
+def test_fallback_is_returned_but_not_cached():
+    async def main():
+        client = redis()
+        flights = SingleFlight(client)
+        failing = Generator(error=FallbackResult({'response': 'raw text'}))
+        fallback = await flights.run('k', failing)
+        locks = await client.keys('singleflight:lock:*')
+        generate = Generator()
+        retried = await flights.run('k', generate)
+        return fallback, locks, retried, generate.calls, flights.counts
+
+    fallback, locks, retried, calls, counts = asyncio.run(main())
+    assert fallback == {'response': 'raw text'}
+    assert locks == []
+    assert retried == {'response': 'q'} and calls == 1
+    assert counts['fallback'] == 1
+
+
+def test_exception_releases_lock_without_caching():
+    async def main():
+        client = redis()
+        flights = SingleFlight(client)
+        with pytest.raises(RuntimeError):
+            await flights.run('k', Generator(error=RuntimeError('boom')))
+        return await client.keys('*')
+
+    assert asyncio.run(main()) == []
+
+
+def test_release_script_only_deletes_own_lock():
+    async def main():
+        client = redis()
+        await client.set('lock', 'mine')
+        other = await client.eval(RELEASE_SCRIPT, 1, 'lock', 'theirs')
+        still_there = await client.get('lock')
+        own = await client.eval(RELEASE_SCRIPT, 1, 'lock', 'mine')
+        return other, still_there, own, await client.exists('lock')
+
+    assert asyncio.run(main()) == (0, 'mine', 1, 0)
@@ -0,0 +1,73 @@
+# JSONFieldStream 테스트: 조각 경계가 escape/서로게이트 쌍 중간에 걸려도 json.loads 와 같은 값을 내는지 확인
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streaming import JSONFieldStream, sse_event
+
+RESPONSE = ('설명 문구 {"note": "a \\"q\\" {x}", "meta": {"question": "nested"}, '
+            '"question": "줄\\n바꿈 \\"인용\\" \\\\ \\/ \\t탭 \\u00e9 \\ud83d\\ude00 끝", "after": "x"} 꼬리')
+EXPECTED = '줄\n바꿈 "인용" \\ / \t탭 é 😀 끝'
+
+
+def stream(chunks, field='question'):
+    parser = JSONFieldStream(field)
+    deltas = [parser.feed(chunk) for chunk in chunks]
+    return parser, ''.join(deltas)
+
+
+def test_whole_response():
+    parser, value = stream([RESPONSE])
+    assert value == EXPECTED == json.loads(RESPONSE[RESPONSE.index('{'):RESPONSE.rindex('}') + 1])['question']
+    assert parser.value == EXPECTED
+    assert parser.done
+
+
+def test_one_character_chunks():
+    parser, value = stream(list(RESPONSE))
+    assert value == EXPECTED
+    assert parser.done
+
+
+@pytest.mark.parametrize('size', [2, 3, 5, 7, 11])
+def test_fixed_size_chunks(size):
+    _, value = stream([RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)])
+    assert value == EXPECTED
+
+
+@pytest.mark.parametrize('marker', ['\\n', '\\"', '\\u00e9', '\\ud83d\\ude00'])
+def test_split_inside_escape(marker):
+    start = RESPONSE.index(marker)
+    for cut in range(start + 1, start + len(marker)):
+        parser, value = stream([RESPONSE[:cut], RESPONSE[cut:]])
+        assert value == EXPECTED, cut
+        assert parser.done
+
+
+def test_surrogate_pair_is_emitted_once_complete():
+    parser = JSONFieldStream('question')
+    assert parser.feed('{"question": "a\\ud83d') == 'a'
+    assert parser.feed('\\ude') == ''
+    assert parser.feed('00b"}') == '😀b'
+
+
+def test_missing_field_yields_nothing():
+    parser, value = stream(['{"other": "x", "nested": {"question": "y"}}'])
+    assert value == ''
+    assert parser.done
+
+
+def test_stops_after_field_value():
+    parser = JSONFieldStream('question')
+    assert parser.feed('{"question": "q"') == 'q'
+    assert parser.done
+    assert parser.feed(', "question": "again"}') == ''
+    assert parser.value == 'q'
+
+
+def test_sse_event_keeps_utf8():
+    assert sse_event('delta', {'text': '한글'}) == 'event: delta\ndata: {"text": "한글"}\n\n'
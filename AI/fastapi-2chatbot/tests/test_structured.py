@@ -0,0 +1,50 @@
+# 구조화 출력 테스트: repair_json 이 고치는 문법 오류, loads_tolerant 단계, ReportOutput 변환
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured import QuestionOutput, ReportOutput, json_fragment, loads_tolerant, repair_json
+
+
+@pytest.mark.parametrize('broken, expected', [
+    ('{"question": "첫 줄\n둘째\t줄"}', {'question': '첫 줄\n둘째\t줄'}),
+    ('{"a": [1, 2, ], "b": {"c": 1,},}', {'a': [1, 2], 'b': {'c': 1}}),
+    ('{"question": "잘린 질문', {'question': '잘린 질문'}),
+    ('{"a": {"b": [1, 2', {'a': {'b': [1, 2]}}),
+    ('{"a": "x\\"y", "b": "끝\\', {'a': 'x"y', 'b': '끝'}),
+    ('{"a": "쉼표, 괄호 } 는 문자열 안", ', {'a': '쉼표, 괄호 } 는 문자열 안'}),
+])
+def test_repair_json(broken, expected):
+    assert json.loads(repair_json(broken)) == expected
+
+
+def test_repair_json_keeps_valid_json():
+    valid = json.dumps({'a': ['x', {'b': 'y\n'}], 'c': 1}, ensure_ascii=False)
+    assert repair_json(valid) == valid
+
+
+def test_loads_tolerant_stages():
+    assert loads_tolerant('설명 {"question": "Q?"} 끝') == ({'question': 'Q?'}, 'fast')
+    assert loads_tolerant('{"question": "Q\n?",}') == ({'question': 'Q\n?'}, 'repaired')
+    assert loads_tolerant('JSON 없음') == (None, None)
+    assert loads_tolerant('{"question" "Q"}') == (None, None)
+
+
+def test_json_fragment_keeps_truncated_tail():
+    assert json_fragment('앞 {"a": 1} 뒤') == '{"a": 1}'
+    assert json_fragment('앞 {"a": "잘') == '{"a": "잘'
+
+
+def test_report_output_converts_numbers_and_requires_fields():
+    fields = {name: '80%, 설명' for name in ReportOutput.model_fields}
+    fields['overall_score'] = 85
+    assert ReportOutput.model_validate(fields).overall_score == '85'
+    fields.pop('encouragement')
+    with pytest.raises(ValueError):
+        ReportOutput.model_validate(fields)
+    with pytest.raises(ValueError):
+        QuestionOutput.model_validate({'question': ''})
@@ -0,0 +1,12 @@
+import math
+
+
+def estimate_tokens(text):
+    # 로컬 토큰 추정 (tokenizer 호출 없음): ASCII 는 4글자당 1, 한글 등은 글자당 1 로 넉넉하게 계산
+    # 추출 worker 프로세스에서도 쓰므로 다른 모듈(LLM client 등)을 import 하지 않음
+    if not text:
+        return 0
+    text = str(text)
+    # UTF-8 에서 ASCII 는 1 byte, 한글은 3 byte
+    non_ascii = (len(text.encode('utf-8')) - len(text)) // 2
+    return math.ceil((len(text) - non_ascii) / 4 + non_ascii)